@@ -5,7 +5,9 @@ import logging
 import voluptuous as vol
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant
-from .const import DOMAIN, PLATFORMS
+from .const import DOMAIN, PLATFORMS, CONF_DIAGNOSTIC_SENSORS, DEFAULT_DIAGNOSTIC_SENSORS
+from .coordinator import SmartMinisplitCoordinator
+from .services import async_load_thermal_models, async_setup_services
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -14,20 +16,35 @@ CONFIG_SCHEMA = vol.Schema({DOMAIN: vol.Schema({})}, extra=vol.ALLOW_EXTRA)
 async def async_setup(hass: HomeAssistant, config: dict):
     """Configuration de base de l'intégration"""
     hass.data.setdefault(DOMAIN, {})
+    async_setup_services(hass)
     return True
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
     """Configuration d'une entrée de configuration"""
+    # Les options enregistrées priment sur la configuration initiale
+    config = {**entry.data, **entry.options}
+
+    coordinator = SmartMinisplitCoordinator(hass, config, entry.entry_id)
+
+    # Reprendre les modèles thermiques ajustés au lieu de repartir de zéro
+    await async_load_thermal_models(hass, entry.entry_id, coordinator)
+
+    await coordinator.async_config_entry_first_refresh()
+
     hass.data[DOMAIN][entry.entry_id] = {
-        "config": entry.data,
-        "coordinator": None
+        "config": config,
+        "coordinator": coordinator,
+        "runtime": coordinator.runtime,
     }
     
     # Configurer les plateformes
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
+
+    # Réévaluer dès qu'une entrée change
+    entry.async_on_unload(coordinator.async_start())
     
     # Écouter les mises à jour d'options
-    entry.async_on_unload(entry.add_update_listener(async_reload_entry))
+    entry.async_on_unload(entry.add_update_listener(async_update_options))
     
     return True
 
@@ -40,6 +57,17 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry):
     
     return unload_ok
 
-async def async_reload_entry(hass: HomeAssistant, entry: ConfigEntry):
-    """Recharger l'entrée de configuration"""
-    await hass.config_entries.async_reload(entry.entry_id)
+async def async_update_options(hass: HomeAssistant, entry: ConfigEntry):
+    """Appliquer les options modifiées au contrôleur en cours"""
+    entry_data = hass.data[DOMAIN][entry.entry_id]
+    config = {**entry.data, **entry.options}
+
+    # Seuls les capteurs de diagnostic ajoutent ou retirent des entités
+    if config.get(CONF_DIAGNOSTIC_SENSORS, DEFAULT_DIAGNOSTIC_SENSORS) != entry_data["config"].get(
+        CONF_DIAGNOSTIC_SENSORS, DEFAULT_DIAGNOSTIC_SENSORS
+    ):
+        await hass.config_entries.async_reload(entry.entry_id)
+        return
+
+    entry_data["config"] = config
+    await entry_data["coordinator"].async_apply_options(config)
@@ -0,0 +1,104 @@
+"""Cache des commandes envoyées au mini-split pour HA Smart Minisplit"""
+
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+
+# Écart de consigne en dessous duquel deux consignes sont considérées égales
+TEMPERATURE_TOLERANCE = 0.5
+
+
+def same_command(hvac_mode, temperature, other_mode, other_temperature):
+    """Vrai si deux couples (mode, consigne) produisent le même effet"""
+    if hvac_mode != other_mode:
+        return False
+    if temperature is None:
+        return True
+    if other_temperature is None:
+        return False
+    return abs(float(other_temperature) - temperature) <= TEMPERATURE_TOLERANCE
+
+
+class CommandCache:
+    """Dernière commande acquittée par un mini-split et compteurs d'envoi"""
+
+    def __init__(self, reassert_ttl: timedelta):
+        self._reassert_ttl = reassert_ttl
+        self.hvac_mode = None
+        self.temperature = None
+        self.acknowledged_at: datetime | None = None
+        self.sent = 0
+        self.suppressed = 0
+
+    def acknowledge(self, hvac_mode, temperature, now: datetime):
+        """Mémoriser une commande confirmée par le mini-split"""
+        self.hvac_mode = hvac_mode
+        self.temperature = temperature
+        self.acknowledged_at = now
+
+    def invalidate(self):
+        """Oublier la dernière commande (mini-split modifié par ailleurs)"""
+        self.hvac_mode = None
+        self.temperature = None
+        self.acknowledged_at = None
+
+    def should_send(self, hvac_mode, temperature, live_mode, live_temperature, now: datetime):
+        """Décider si une commande changerait quelque chose"""
+        # L'état réel diffère de la demande : envoyer
+        if not same_command(hvac_mode, temperature, live_mode, live_temperature):
+            return True
+
+        # L'état réel correspond déjà, sans commande connue : l'adopter
+        if not same_command(hvac_mode, temperature, self.hvac_mode, self.temperature):
+            self.acknowledge(hvac_mode, temperature, now)
+            self.suppressed += 1
+            return False
+
+        # Réaffirmer périodiquement la commande acquittée
+        if now - self.acknowledged_at >= self._reassert_ttl:
+            return True
+
+        self.suppressed += 1
+        return False
+
+    def as_dict(self):
+        """Représentation pour les attributs d'état"""
+        return {
+            "commandes_envoyees": self.sent,
+            "commandes_supprimees": self.suppressed,
+        }
+
+
+class CircuitBreaker:
+    """Suspend les commandes vers un mini-split après des échecs répétés"""
+
+    def __init__(self, threshold, cooldown: timedelta):
+        self._threshold = threshold
+        self._cooldown = cooldown
+        self.failures = 0
+        self.opened_at: datetime | None = None
+
+    def is_open(self, now: datetime):
+        """Vrai pendant la pause ; ensuite une tentative est permise"""
+        return self.opened_at is not None and now - self.opened_at < self._cooldown
+
+    @property
+    def closes_at(self):
+        """Fin de la pause en cours, None si le disjoncteur est fermé"""
+        return None if self.opened_at is None else self.opened_at + self._cooldown
+
+    def record_success(self):
+        """Commande réussie : refermer le disjoncteur"""
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self, now: datetime):
+        """Commande en échec : ouvrir le disjoncteur au-delà du seuil"""
+        self.failures += 1
+        if self.failures >= self._threshold:
+            self.opened_at = now
+
+    @property
+    def state(self):
+        """État affiché : ferme ou ouvert"""
+        return "ferme" if self.opened_at is None else "ouvert"
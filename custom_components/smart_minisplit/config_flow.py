@@ -4,11 +4,32 @@ import voluptuous as vol
 from homeassistant import config_entries
 from homeassistant.core import callback
 from homeassistant.helpers import selector
+from homeassistant.util import slugify
 from .const import (
     DOMAIN, 
     DEFAULT_CONSIGNES,
     DEFAULT_HYSTERESIS,
     DEFAULT_OFFSET,
+    DEFAULT_NON_BLOCKING,
+    DEFAULT_MAX_CONCURRENCY,
+    DEFAULT_ANTICIPATION,
+    DEFAULT_DIAGNOSTIC_SENSORS,
+    DEFAULT_MIN_ON_TIME,
+    DEFAULT_MIN_OFF_TIME,
+    DEFAULT_MIN_HOLD_TIME,
+    DEFAULT_COMMAND_TIMEOUT,
+    DEFAULT_RUNNING_POWER,
+    DEFAULT_IDLE_POWER,
+    DEFAULT_AUTO_SEASON,
+    DEFAULT_SEASON_HEAT_BELOW,
+    DEFAULT_SEASON_COOL_ABOVE,
+    DEFAULT_SEASON_MIN_DWELL,
+    DEFAULT_TEMP_FILTER,
+    DEFAULT_FILTER_WINDOW,
+    DEFAULT_FILTER_MAX_RATE,
+    DEFAULT_STALE_AFTER,
+    DEFAULT_ROOM_GRACE,
+    DEFAULT_HOUSE_GRACE,
     CONF_MINI_SPLIT,
     CONF_TEMP_EXT,
     CONF_TEMP_PIECE,
@@ -16,6 +37,32 @@ from .const import (
     CONF_PRESENCE_MAISON,
     CONF_HYSTERESIS,
     CONF_OFFSET,
+    CONF_NON_BLOCKING,
+    CONF_MAX_CONCURRENCY,
+    CONF_ANTICIPATION,
+    CONF_DIAGNOSTIC_SENSORS,
+    CONF_MIN_ON_TIME,
+    CONF_MIN_OFF_TIME,
+    CONF_MIN_HOLD_TIME,
+    CONF_COMMAND_TIMEOUT,
+    CONF_SCHEDULE,
+    CONF_POWER_SENSOR,
+    CONF_RUNNING_POWER,
+    CONF_IDLE_POWER,
+    CONF_AUTO_SEASON,
+    CONF_SEASON_HEAT_BELOW,
+    CONF_SEASON_COOL_ABOVE,
+    CONF_SEASON_MIN_DWELL,
+    CONF_TEMP_FILTER,
+    CONF_FILTER_WINDOW,
+    CONF_FILTER_MAX_RATE,
+    CONF_TEMP_WEIGHTS,
+    CONF_STALE_AFTER,
+    CONF_ROOM_GRACE,
+    CONF_HOUSE_GRACE,
+    CONF_ZONES,
+    CONF_ZONE_NAME,
+    CONF_ADD_ZONE,
     CONF_CONSIGNE_ABSENCE_CHAUFFAGE,
     CONF_CONSIGNE_ECO_CHAUFFAGE,
     CONF_CONSIGNE_CONFORT_CHAUFFAGE,
@@ -23,6 +70,52 @@ from .const import (
     CONF_CONSIGNE_ECO_CLIMATISATION,
     CONF_CONSIGNE_CONFORT_CLIMATISATION,
 )
+from .filters import FILTERS, parse_weights
+from .schedule import WeeklySchedule
+
+FILTER_SELECTOR = selector.SelectSelector(selector.SelectSelectorConfig(options=list(FILTERS)))
+
+# Réglages propres à chaque zone ajoutée, modifiables dans les options
+ZONE_SETTINGS = {
+    CONF_HYSTERESIS: vol.All(vol.Coerce(float), vol.Range(min=0.5, max=5.0)),
+    CONF_OFFSET: vol.All(vol.Coerce(float), vol.Range(min=0.5, max=3.0)),
+}
+
+
+def zone_field(zone_name, key):
+    """Champ du formulaire d'options pour un réglage d'une zone ajoutée"""
+    return f"{slugify(zone_name)}_{key}"
+
+
+def _schedule_errors(user_input):
+    """Erreur de formulaire si le programme horaire est invalide"""
+    try:
+        WeeklySchedule.parse(user_input.get(CONF_SCHEDULE) or "")
+    except ValueError:
+        return {CONF_SCHEDULE: "invalid_schedule"}
+    return {}
+
+
+def _sensor_errors(user_input):
+    """Erreurs de formulaire d'une zone : programme horaire et poids des capteurs"""
+    errors = _schedule_errors(user_input)
+    if CONF_TEMP_PIECE in user_input:
+        entities = user_input[CONF_TEMP_PIECE]
+        try:
+            parse_weights([entities] if isinstance(entities, str) else entities, user_input.get(CONF_TEMP_WEIGHTS))
+        except ValueError:
+            errors[CONF_TEMP_WEIGHTS] = "invalid_weights"
+    return errors
+
+
+def _settings_errors(user_input):
+    """Erreurs de formulaire des réglages : zone principale et seuils de saison"""
+    errors = _sensor_errors(user_input)
+    if user_input.get(CONF_SEASON_HEAT_BELOW, DEFAULT_SEASON_HEAT_BELOW) >= user_input.get(
+        CONF_SEASON_COOL_ABOVE, DEFAULT_SEASON_COOL_ABOVE
+    ):
+        errors[CONF_SEASON_COOL_ABOVE] = "invalid_season_thresholds"
+    return errors
 
 # Correction : Retrait de ", domain=DOMAIN" et de la faute de frappe
 class SmartMinisplitConfigFlow(config_entries.ConfigFlow):
@@ -34,7 +127,8 @@ class SmartMinisplitConfigFlow(config_entries.ConfigFlow):
 
     async def async_step_user(self, user_input=None):
         """Étape de configuration initiale"""
-        if user_input is None:
+        errors = _settings_errors(user_input) if user_input is not None else {}
+        if user_input is None or errors:
             return self.async_show_form(
                 step_id="user",
                 data_schema=vol.Schema({
@@ -45,8 +139,9 @@ class SmartMinisplitConfigFlow(config_entries.ConfigFlow):
                         selector.EntitySelectorConfig(domain="sensor", device_class="temperature")
                     ),
                     vol.Required(CONF_TEMP_PIECE): selector.EntitySelector(
-                        selector.EntitySelectorConfig(domain="sensor", device_class="temperature")
+                        selector.EntitySelectorConfig(domain="sensor", device_class="temperature", multiple=True)
                     ),
+                    vol.Optional(CONF_TEMP_WEIGHTS, default=""): str,
                     vol.Optional(CONF_PRESENCE_PIECE): selector.EntitySelector(
                         selector.EntitySelectorConfig(domain=["binary_sensor", "input_boolean"])
                     ),
@@ -59,7 +154,62 @@ class SmartMinisplitConfigFlow(config_entries.ConfigFlow):
                     vol.Optional(CONF_OFFSET, default=DEFAULT_OFFSET): vol.All(
                         vol.Coerce(float), vol.Range(min=0.5, max=3.0)
                     ),
-                })
+                    vol.Optional(CONF_NON_BLOCKING, default=DEFAULT_NON_BLOCKING): bool,
+                    vol.Optional(CONF_MAX_CONCURRENCY, default=DEFAULT_MAX_CONCURRENCY): vol.All(
+                        vol.Coerce(int), vol.Range(min=1, max=32)
+                    ),
+                    vol.Optional(CONF_ANTICIPATION, default=DEFAULT_ANTICIPATION): bool,
+                    vol.Optional(CONF_MIN_ON_TIME, default=DEFAULT_MIN_ON_TIME): vol.All(
+                        vol.Coerce(int), vol.Range(min=0, max=60)
+                    ),
+                    vol.Optional(CONF_MIN_OFF_TIME, default=DEFAULT_MIN_OFF_TIME): vol.All(
+                        vol.Coerce(int), vol.Range(min=0, max=60)
+                    ),
+                    vol.Optional(CONF_MIN_HOLD_TIME, default=DEFAULT_MIN_HOLD_TIME): vol.All(
+                        vol.Coerce(int), vol.Range(min=0, max=60)
+                    ),
+                    vol.Optional(CONF_COMMAND_TIMEOUT, default=DEFAULT_COMMAND_TIMEOUT): vol.All(
+                        vol.Coerce(int), vol.Range(min=1, max=20)
+                    ),
+                    vol.Optional(CONF_DIAGNOSTIC_SENSORS, default=DEFAULT_DIAGNOSTIC_SENSORS): bool,
+                    vol.Optional(CONF_SCHEDULE, default=""): str,
+                    vol.Optional(CONF_POWER_SENSOR): selector.EntitySelector(
+                        selector.EntitySelectorConfig(domain="sensor", device_class="power")
+                    ),
+                    vol.Optional(CONF_RUNNING_POWER, default=DEFAULT_RUNNING_POWER): vol.All(
+                        vol.Coerce(int), vol.Range(min=0, max=10000)
+                    ),
+                    vol.Optional(CONF_IDLE_POWER, default=DEFAULT_IDLE_POWER): vol.All(
+                        vol.Coerce(int), vol.Range(min=0, max=500)
+                    ),
+                    vol.Optional(CONF_AUTO_SEASON, default=DEFAULT_AUTO_SEASON): bool,
+                    vol.Optional(CONF_SEASON_HEAT_BELOW, default=DEFAULT_SEASON_HEAT_BELOW): vol.All(
+                        vol.Coerce(float), vol.Range(min=-10.0, max=30.0)
+                    ),
+                    vol.Optional(CONF_SEASON_COOL_ABOVE, default=DEFAULT_SEASON_COOL_ABOVE): vol.All(
+                        vol.Coerce(float), vol.Range(min=0.0, max=40.0)
+                    ),
+                    vol.Optional(CONF_SEASON_MIN_DWELL, default=DEFAULT_SEASON_MIN_DWELL): vol.All(
+                        vol.Coerce(int), vol.Range(min=1, max=240)
+                    ),
+                    vol.Optional(CONF_TEMP_FILTER, default=DEFAULT_TEMP_FILTER): FILTER_SELECTOR,
+                    vol.Optional(CONF_FILTER_WINDOW, default=DEFAULT_FILTER_WINDOW): vol.All(
+                        vol.Coerce(int), vol.Range(min=2, max=20)
+                    ),
+                    vol.Optional(CONF_FILTER_MAX_RATE, default=DEFAULT_FILTER_MAX_RATE): vol.All(
+                        vol.Coerce(float), vol.Range(min=0.5, max=10.0)
+                    ),
+                    vol.Optional(CONF_STALE_AFTER, default=DEFAULT_STALE_AFTER): vol.All(
+                        vol.Coerce(int), vol.Range(min=5, max=720)
+                    ),
+                    vol.Optional(CONF_ROOM_GRACE, default=DEFAULT_ROOM_GRACE): vol.All(
+                        vol.Coerce(int), vol.Range(min=0, max=120)
+                    ),
+                    vol.Optional(CONF_HOUSE_GRACE, default=DEFAULT_HOUSE_GRACE): vol.All(
+                        vol.Coerce(int), vol.Range(min=0, max=240)
+                    ),
+                }),
+                errors=errors,
             )
 
         return await self.async_step_consignes(user_input)
@@ -96,15 +246,64 @@ class SmartMinisplitConfigFlow(config_entries.ConfigFlow):
                                  default=DEFAULT_CONSIGNES["confort"]["climatisation"]): vol.All(
                         vol.Coerce(float), vol.Range(min=20.0, max=30.0)
                     ),
+                    vol.Optional(CONF_ADD_ZONE, default=False): bool,
                 })
             )
         
         # Fusionner les données des deux étapes
-        final_data = {**self.context["step_data"], **user_input}
-        
+        add_zone = user_input.pop(CONF_ADD_ZONE, False)
+        self.context["step_data"] = {**self.context["step_data"], **user_input}
+
+        if add_zone:
+            return await self.async_step_zone()
+
+        return self._create_entry()
+
+    async def async_step_zone(self, user_input=None):
+        """Étape d'ajout d'une zone supplémentaire (mode flotte)"""
+        errors = {}
+        zones = self.context["step_data"].setdefault(CONF_ZONES, [])
+
+        if user_input is not None:
+            add_zone = user_input.pop(CONF_ADD_ZONE, False)
+            # Les zones sont identifiées par le slug de leur nom
+            slugs = [slugify(zone[CONF_ZONE_NAME]) for zone in zones]
+            errors = _sensor_errors(user_input)
+            if slugify(user_input[CONF_ZONE_NAME]) in slugs:
+                errors[CONF_ZONE_NAME] = "zone_exists"
+            if not errors:
+                zones.append(user_input)
+                if not add_zone:
+                    return self._create_entry()
+
+        return self.async_show_form(
+            step_id="zone",
+            data_schema=vol.Schema({
+                vol.Required(CONF_ZONE_NAME): str,
+                vol.Required(CONF_MINI_SPLIT): selector.EntitySelector(
+                    selector.EntitySelectorConfig(domain="climate")
+                ),
+                vol.Required(CONF_TEMP_PIECE): selector.EntitySelector(
+                    selector.EntitySelectorConfig(domain="sensor", device_class="temperature", multiple=True)
+                ),
+                vol.Optional(CONF_TEMP_WEIGHTS, default=""): str,
+                vol.Optional(CONF_PRESENCE_PIECE): selector.EntitySelector(
+                    selector.EntitySelectorConfig(domain=["binary_sensor", "input_boolean"])
+                ),
+                vol.Optional(CONF_SCHEDULE, default=""): str,
+                vol.Optional(CONF_POWER_SENSOR): selector.EntitySelector(
+                    selector.EntitySelectorConfig(domain="sensor", device_class="power")
+                ),
+                vol.Optional(CONF_ADD_ZONE, default=False): bool,
+            }),
+            errors=errors,
+        )
+
+    def _create_entry(self):
+        """Créer l'entrée avec les données de toutes les étapes"""
         return self.async_create_entry(
             title="Smart Minisplit",
-            data=final_data
+            data=self.context["step_data"]
         )
 
     @staticmethod
@@ -118,14 +317,16 @@ class SmartMinisplitOptionsFlow(config_entries.OptionsFlow):
 
     def __init__(self, config_entry):
         self.config_entry = config_entry
-        
+        self._options = {}
+
     async def async_step_init(self, user_input=None):
         """Étape d'initialisation des options (Consignes et Réglages)"""
         
         # Utiliser les données actuelles de l'entrée de configuration
-        data = self.config_entry.data
-        
-        if user_input is None:
+        data = {**self.config_entry.data, **self.config_entry.options}
+        errors = _settings_errors(user_input) if user_input is not None else {}
+
+        if user_input is None or errors:
             return self.async_show_form(
                 step_id="init",
                 data_schema=vol.Schema({
@@ -138,6 +339,86 @@ class SmartMinisplitOptionsFlow(config_entries.OptionsFlow):
                         CONF_OFFSET,
                         default=data.get(CONF_OFFSET, DEFAULT_OFFSET)
                     ): vol.All(vol.Coerce(float), vol.Range(min=0.5, max=3.0)),
+                    vol.Optional(
+                        CONF_NON_BLOCKING,
+                        default=data.get(CONF_NON_BLOCKING, DEFAULT_NON_BLOCKING)
+                    ): bool,
+                    vol.Optional(
+                        CONF_MAX_CONCURRENCY,
+                        default=data.get(CONF_MAX_CONCURRENCY, DEFAULT_MAX_CONCURRENCY)
+                    ): vol.All(vol.Coerce(int), vol.Range(min=1, max=32)),
+                    vol.Optional(
+                        CONF_ANTICIPATION,
+                        default=data.get(CONF_ANTICIPATION, DEFAULT_ANTICIPATION)
+                    ): bool,
+                    vol.Optional(
+                        CONF_MIN_ON_TIME,
+                        default=data.get(CONF_MIN_ON_TIME, DEFAULT_MIN_ON_TIME)
+                    ): vol.All(vol.Coerce(int), vol.Range(min=0, max=60)),
+                    vol.Optional(
+                        CONF_MIN_OFF_TIME,
+                        default=data.get(CONF_MIN_OFF_TIME, DEFAULT_MIN_OFF_TIME)
+                    ): vol.All(vol.Coerce(int), vol.Range(min=0, max=60)),
+                    vol.Optional(
+                        CONF_MIN_HOLD_TIME,
+                        default=data.get(CONF_MIN_HOLD_TIME, DEFAULT_MIN_HOLD_TIME)
+                    ): vol.All(vol.Coerce(int), vol.Range(min=0, max=60)),
+                    vol.Optional(
+                        CONF_COMMAND_TIMEOUT,
+                        default=data.get(CONF_COMMAND_TIMEOUT, DEFAULT_COMMAND_TIMEOUT)
+                    ): vol.All(vol.Coerce(int), vol.Range(min=1, max=20)),
+                    vol.Optional(
+                        CONF_DIAGNOSTIC_SENSORS,
+                        default=data.get(CONF_DIAGNOSTIC_SENSORS, DEFAULT_DIAGNOSTIC_SENSORS)
+                    ): bool,
+                    vol.Optional(
+                        CONF_RUNNING_POWER,
+                        default=data.get(CONF_RUNNING_POWER, DEFAULT_RUNNING_POWER)
+                    ): vol.All(vol.Coerce(int), vol.Range(min=0, max=10000)),
+                    vol.Optional(
+                        CONF_IDLE_POWER,
+                        default=data.get(CONF_IDLE_POWER, DEFAULT_IDLE_POWER)
+                    ): vol.All(vol.Coerce(int), vol.Range(min=0, max=500)),
+                    vol.Optional(
+                        CONF_AUTO_SEASON,
+                        default=data.get(CONF_AUTO_SEASON, DEFAULT_AUTO_SEASON)
+                    ): bool,
+                    vol.Optional(
+                        CONF_SEASON_HEAT_BELOW,
+                        default=data.get(CONF_SEASON_HEAT_BELOW, DEFAULT_SEASON_HEAT_BELOW)
+                    ): vol.All(vol.Coerce(float), vol.Range(min=-10.0, max=30.0)),
+                    vol.Optional(
+                        CONF_SEASON_COOL_ABOVE,
+                        default=data.get(CONF_SEASON_COOL_ABOVE, DEFAULT_SEASON_COOL_ABOVE)
+                    ): vol.All(vol.Coerce(float), vol.Range(min=0.0, max=40.0)),
+                    vol.Optional(
+                        CONF_SEASON_MIN_DWELL,
+                        default=data.get(CONF_SEASON_MIN_DWELL, DEFAULT_SEASON_MIN_DWELL)
+                    ): vol.All(vol.Coerce(int), vol.Range(min=1, max=240)),
+                    vol.Optional(
+                        CONF_TEMP_FILTER,
+                        default=data.get(CONF_TEMP_FILTER, DEFAULT_TEMP_FILTER)
+                    ): FILTER_SELECTOR,
+                    vol.Optional(
+                        CONF_FILTER_WINDOW,
+                        default=data.get(CONF_FILTER_WINDOW, DEFAULT_FILTER_WINDOW)
+                    ): vol.All(vol.Coerce(int), vol.Range(min=2, max=20)),
+                    vol.Optional(
+                        CONF_FILTER_MAX_RATE,
+                        default=data.get(CONF_FILTER_MAX_RATE, DEFAULT_FILTER_MAX_RATE)
+                    ): vol.All(vol.Coerce(float), vol.Range(min=0.5, max=10.0)),
+                    vol.Optional(
+                        CONF_STALE_AFTER,
+                        default=data.get(CONF_STALE_AFTER, DEFAULT_STALE_AFTER)
+                    ): vol.All(vol.Coerce(int), vol.Range(min=5, max=720)),
+                    vol.Optional(
+                        CONF_ROOM_GRACE,
+                        default=data.get(CONF_ROOM_GRACE, DEFAULT_ROOM_GRACE)
+                    ): vol.All(vol.Coerce(int), vol.Range(min=0, max=120)),
+                    vol.Optional(
+                        CONF_HOUSE_GRACE,
+                        default=data.get(CONF_HOUSE_GRACE, DEFAULT_HOUSE_GRACE)
+                    ): vol.All(vol.Coerce(int), vol.Range(min=0, max=240)),
 
                     # Consignes CHAUFFAGE
                     vol.Optional(
@@ -166,8 +447,44 @@ class SmartMinisplitOptionsFlow(config_entries.OptionsFlow):
                         CONF_CONSIGNE_CONFORT_CLIMATISATION,
                         default=data.get(CONF_CONSIGNE_CONFORT_CLIMATISATION, DEFAULT_CONSIGNES["confort"]["climatisation"])
                     ): vol.All(vol.Coerce(float), vol.Range(min=20.0, max=30.0)),
-                })
+
+                    # Programme horaire de la zone principale
+                    vol.Optional(
+                        CONF_SCHEDULE,
+                        default=data.get(CONF_SCHEDULE, "")
+                    ): str,
+                }),
+                errors=errors,
             )
         
+        self._options = user_input
+        if data.get(CONF_ZONES):
+            return await self.async_step_zones()
+
         # Enregistrer les options
         return self.async_create_entry(title="", data=user_input)
+
+    async def async_step_zones(self, user_input=None):
+        """Hystérésis et offset des zones ajoutées, ceux de la zone principale par défaut"""
+        data = {**self.config_entry.data, **self.config_entry.options}
+        zones = data[CONF_ZONES]
+
+        if user_input is None:
+            fields = {}
+            for zone_config in zones:
+                for key, validator in ZONE_SETTINGS.items():
+                    default = zone_config.get(key, self._options[key])
+                    fields[vol.Optional(zone_field(zone_config[CONF_ZONE_NAME], key), default=default)] = validator
+            return self.async_show_form(step_id="zones", data_schema=vol.Schema(fields))
+
+        # Un réglage égal à celui de la zone principale n'est pas gardé : la zone le suit
+        updated = []
+        for zone_config in zones:
+            zone_config = {key: value for key, value in zone_config.items() if key not in ZONE_SETTINGS}
+            for key in ZONE_SETTINGS:
+                value = user_input[zone_field(zone_config[CONF_ZONE_NAME], key)]
+                if value != self._options[key]:
+                    zone_config[key] = value
+            updated.append(zone_config)
+
+        return self.async_create_entry(title="", data={**self._options, CONF_ZONES: updated})
@@ -1,20 +1,58 @@
 """Constantes pour l'intégration HA Smart Minisplit"""
 
+from datetime import timedelta
+
 DOMAIN = "smart_minisplit"
 PLATFORMS = ["climate", "sensor", "switch"]
 DEFAULT_NAME = "Smart Minisplit"
 DEFAULT_HYSTERESIS = 0.5
 DEFAULT_OFFSET = 1.0
+DEFAULT_NON_BLOCKING = False
+DEFAULT_MAX_CONCURRENCY = 4
+DEFAULT_ANTICIPATION = True
+DEFAULT_DIAGNOSTIC_SENSORS = False
+DEFAULT_MIN_ON_TIME = 10  # minutes
+DEFAULT_MIN_OFF_TIME = 5  # minutes
+DEFAULT_MIN_HOLD_TIME = 5  # minutes
+DEFAULT_COMMAND_TIMEOUT = 8  # secondes
+DEFAULT_RUNNING_POWER = 900  # W, compresseur en marche
+DEFAULT_IDLE_POWER = 10  # W, mini-split allumé compresseur arrêté
+DEFAULT_AUTO_SEASON = False
+DEFAULT_SEASON_HEAT_BELOW = 15.0  # °C, moyenne extérieure sous laquelle on chauffe
+DEFAULT_SEASON_COOL_ABOVE = 22.0  # °C, moyenne extérieure au-dessus de laquelle on climatise
+DEFAULT_SEASON_MIN_DWELL = 48  # heures entre deux changements de saison
+DEFAULT_TEMP_FILTER = "aucun"
+DEFAULT_FILTER_WINDOW = 5  # mesures
+DEFAULT_FILTER_MAX_RATE = 2.0  # °C par heure
+DEFAULT_STALE_AFTER = 60  # minutes sans mesure avant d'écarter un capteur
+DEFAULT_ROOM_GRACE = 10  # minutes de pièce vide avant le mode ECO
+DEFAULT_HOUSE_GRACE = 20  # minutes de maison vide avant l'arrêt
 DEFAULT_CONSIGNES = {
     "absence": {"chauffage": 18.0, "climatisation": 26.0},
     "eco": {"chauffage": 20.0, "climatisation": 25.0},
     "confort": {"chauffage": 22.0, "climatisation": 24.0}
 }
 
+# Boucle de contrôle événementielle
+DEBOUNCE_COOLDOWN = 1.0  # secondes de regroupement des rafales d'événements
+WATCHDOG_INTERVAL = timedelta(minutes=5)  # réévaluation de sécurité
+COMMAND_REASSERT_TTL = timedelta(minutes=30)  # réaffirmation d'une commande déjà en place
+CONTROL_LOOP_BUDGET = 30.0  # secondes maximum pour les commandes d'un cycle
+SETTLING_WINDOW = timedelta(seconds=90)  # états du mini-split attribués à notre dernière commande
+STARTUP_TIMEOUT = 120.0  # secondes d'attente maximale d'entrées disponibles au démarrage
+
+# Commandes en échec
+COMMAND_RETRIES = 2  # nouvelles tentatives après un échec
+RETRY_BASE_DELAY = 0.5  # secondes, doublées à chaque tentative
+BREAKER_THRESHOLD = 3  # échecs consécutifs avant d'ouvrir le disjoncteur
+BREAKER_COOLDOWN = timedelta(minutes=5)  # pause des commandes disjoncteur ouvert
+
 # Modes
 MODE_ABSENCE = "absence"
 MODE_ECO = "eco"
 MODE_CONFORT = "confort"
+# Consigne de repli d'un mode, comptée à part dans les durées
+MODE_REPLI = "repli"
 
 # Saisons
 SEASON_CHAUFFAGE = "chauffage"
@@ -34,6 +72,34 @@ CONF_PRESENCE_PIECE = "presence_piece"
 CONF_PRESENCE_MAISON = "presence_maison"
 CONF_HYSTERESIS = "hysteresis"
 CONF_OFFSET = "offset"
+CONF_NON_BLOCKING = "commandes_non_bloquantes"
+CONF_MAX_CONCURRENCY = "commandes_simultanees"
+CONF_ANTICIPATION = "anticipation"
+CONF_DIAGNOSTIC_SENSORS = "capteurs_diagnostic"
+CONF_MIN_ON_TIME = "duree_min_marche"
+CONF_MIN_OFF_TIME = "duree_min_arret"
+CONF_MIN_HOLD_TIME = "duree_min_consigne"
+CONF_COMMAND_TIMEOUT = "delai_commande"
+CONF_SCHEDULE = "programme"
+CONF_POWER_SENSOR = "capteur_puissance"
+CONF_RUNNING_POWER = "puissance_marche"
+CONF_IDLE_POWER = "puissance_veille"
+CONF_AUTO_SEASON = "saison_auto"
+CONF_SEASON_HEAT_BELOW = "seuil_chauffage"
+CONF_SEASON_COOL_ABOVE = "seuil_climatisation"
+CONF_SEASON_MIN_DWELL = "duree_min_saison"
+CONF_TEMP_FILTER = "filtre_temperature"
+CONF_FILTER_WINDOW = "fenetre_filtre"
+CONF_FILTER_MAX_RATE = "pente_max_filtre"
+CONF_TEMP_WEIGHTS = "poids_capteurs"
+CONF_STALE_AFTER = "peremption_capteurs"
+CONF_ROOM_GRACE = "delai_absence_piece"
+CONF_HOUSE_GRACE = "delai_absence_maison"
+
+# Zones supplémentaires (mode flotte)
+CONF_ZONES = "zones"
+CONF_ZONE_NAME = "nom"
+CONF_ADD_ZONE = "ajouter_zone"
 CONF_CONSIGNE_ABSENCE_CHAUFFAGE = "consigne_absence_chauffage"
 CONF_CONSIGNE_ECO_CHAUFFAGE = "consigne_eco_chauffage"
 CONF_CONSIGNE_CONFORT_CHAUFFAGE = "consigne_confort_chauffage"
@@ -0,0 +1,503 @@
+"""Coordinateur pour HA Smart Minisplit"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections import deque
+from datetime import timedelta
+from functools import partial
+
+from homeassistant.const import (
+    ATTR_UNIT_OF_MEASUREMENT,
+    EVENT_HOMEASSISTANT_STARTED,
+    STATE_ON,
+    STATE_UNAVAILABLE,
+    STATE_UNKNOWN,
+    UnitOfPower,
+)
+from homeassistant.core import CoreState, callback
+from homeassistant.helpers.debounce import Debouncer
+from homeassistant.helpers.event import async_call_later, async_track_state_change_event
+from homeassistant.helpers.update_coordinator import DataUpdateCoordinator
+from homeassistant.util import dt as dt_util, slugify
+
+from .const import (
+    DOMAIN,
+    CONF_TEMP_EXT,
+    CONF_PRESENCE_MAISON,
+    CONF_PRESENCE_PIECE,
+    CONF_ZONES,
+    CONF_ZONE_NAME,
+    CONF_POWER_SENSOR,
+    CONF_MAX_CONCURRENCY,
+    CONF_AUTO_SEASON,
+    CONF_SEASON_HEAT_BELOW,
+    CONF_SEASON_COOL_ABOVE,
+    CONF_SEASON_MIN_DWELL,
+    CONF_HOUSE_GRACE,
+    DEFAULT_MAX_CONCURRENCY,
+    DEFAULT_AUTO_SEASON,
+    DEFAULT_SEASON_HEAT_BELOW,
+    DEFAULT_SEASON_COOL_ABOVE,
+    DEFAULT_SEASON_MIN_DWELL,
+    DEFAULT_HOUSE_GRACE,
+    DEBOUNCE_COOLDOWN,
+    CONTROL_LOOP_BUDGET,
+    STARTUP_TIMEOUT,
+    WATCHDOG_INTERVAL,
+)
+from .metrics import LATENCY_SAMPLES
+from .models import InputSnapshot, SmartMinisplitData, SmartMinisplitRuntime
+from .presence import PresenceGrace
+from .season import SeasonSelector
+from .zone import SmartMinisplitZone
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def _as_float(state):
+    """Convertir l'état d'une entité en float, None si indisponible"""
+    if state is None:
+        return None
+    try:
+        return float(state.state)
+    except (ValueError, TypeError):
+        return None
+
+
+def _measured_at(state):
+    """Instant de la dernière mesure publiée, même inchangée quand HA le fournit"""
+    if state is None:
+        return None
+    return getattr(state, "last_reported", None) or state.last_updated
+
+
+def _as_watts(state):
+    """Puissance mesurée en W, None si indisponible"""
+    value = _as_float(state)
+    if value is None:
+        return None
+    if state.attributes.get(ATTR_UNIT_OF_MEASUREMENT) == UnitOfPower.KILO_WATT:
+        return value * 1000
+    return value
+
+
+def zone_configs(config):
+    """Configuration de chaque zone : la zone principale puis les zones ajoutées"""
+    configs = {None: config}
+    for zone_config in config.get(CONF_ZONES, []):
+        zone_id = slugify(zone_config[CONF_ZONE_NAME])
+        # Le compteur de puissance et le détecteur de présence de la zone principale
+        # ne concernent que sa pièce
+        configs[zone_id] = {**config, CONF_POWER_SENSOR: None, CONF_PRESENCE_PIECE: None, **zone_config}
+    return configs
+
+
+def build_zones(hass, config, entry_id):
+    """Créer les zones d'une entrée"""
+    return [
+        SmartMinisplitZone(hass, entry_id, zone_id, zone_config)
+        for zone_id, zone_config in zone_configs(config).items()
+    ]
+
+
+def build_season_selector(config, selector=None):
+    """Sélecteur de saison configuré, en gardant les échantillons d'un sélecteur existant"""
+    if not config.get(CONF_AUTO_SEASON, DEFAULT_AUTO_SEASON):
+        return None
+    settings = (
+        config.get(CONF_SEASON_HEAT_BELOW, DEFAULT_SEASON_HEAT_BELOW),
+        config.get(CONF_SEASON_COOL_ABOVE, DEFAULT_SEASON_COOL_ABOVE),
+        timedelta(hours=config.get(CONF_SEASON_MIN_DWELL, DEFAULT_SEASON_MIN_DWELL)),
+    )
+    if selector is None:
+        return SeasonSelector(*settings)
+    selector.configure(*settings)
+    return selector
+
+
+class SmartMinisplitCoordinator(DataUpdateCoordinator[dict]):
+    """Lit les entrées une fois par cycle, décide et pilote les mini-splits"""
+
+    def __init__(self, hass, config, entry_id):
+        super().__init__(
+            hass,
+            _LOGGER,
+            name=f"{DOMAIN}_{entry_id}",
+            update_interval=WATCHDOG_INTERVAL,
+            request_refresh_debouncer=Debouncer(
+                hass, _LOGGER, cooldown=DEBOUNCE_COOLDOWN, immediate=True
+            ),
+        )
+        self._config = config
+        self._entry_id = entry_id
+
+        # État des switches, mis à jour directement par switch.py
+        self.runtime = SmartMinisplitRuntime()
+
+        self.zones = build_zones(hass, config, entry_id)
+        self._zones_by_mini_split = {
+            zone.mini_split_entity: zone for zone in self.zones if zone.mini_split_entity
+        }
+        self._zones_by_power_sensor = {
+            zone.power_sensor_entity: zone for zone in self.zones if zone.power_sensor_entity
+        }
+        for zone in self.zones:
+            zone.on_cycle_requested = self._async_cycle_requested
+
+        # Nombre maximal de commandes envoyées simultanément
+        self._command_slots = asyncio.Semaphore(
+            config.get(CONF_MAX_CONCURRENCY, DEFAULT_MAX_CONCURRENCY)
+        )
+
+        # Aucun pilotage avant le démarrage de HA et des entrées disponibles
+        self.control_started = False
+
+        # Durée des derniers cycles complets (toutes zones)
+        self.update_latencies = deque(maxlen=LATENCY_SAMPLES)
+
+        # Saison choisie d'après la température extérieure, si activée
+        self.season_selector = build_season_selector(config)
+
+        # Maison vide retenue après un délai de grâce, un minuteur pour toutes les zones
+        self.presence_grace = PresenceGrace(
+            timedelta(minutes=config.get(CONF_HOUSE_GRACE, DEFAULT_HOUSE_GRACE)),
+            partial(async_call_later, hass),
+            self._async_cycle_requested,
+        )
+
+    @property
+    def temp_ext_entity(self):
+        """Capteur de température extérieure commun aux zones"""
+        return self._config.get(CONF_TEMP_EXT)
+
+    async def async_apply_options(self, config):
+        """Appliquer des options modifiées aux zones en place, puis réévaluer une fois"""
+        self._config = config
+        now = dt_util.utcnow()
+        configs = zone_configs(config)
+        for zone in self.zones:
+            zone.apply_settings(configs[zone.zone_id], now)
+
+        # Les commandes en cours gardent l'ancien sémaphore jusqu'à leur fin
+        self._command_slots = asyncio.Semaphore(
+            config.get(CONF_MAX_CONCURRENCY, DEFAULT_MAX_CONCURRENCY)
+        )
+        self.season_selector = build_season_selector(config, self.season_selector)
+        self.presence_grace.configure(
+            timedelta(minutes=config.get(CONF_HOUSE_GRACE, DEFAULT_HOUSE_GRACE))
+        )
+        if self.season_selector is None:
+            self.runtime.season_override = False
+
+        _LOGGER.debug(f"{self.name} : options appliquées sans rechargement")
+        await self.async_request_refresh()
+
+    @callback
+    def async_start(self):
+        """Écouter les entrées et les mini-splits, retourne la désinscription"""
+        unsubs = []
+
+        inputs = self._input_entity_ids()
+        if inputs:
+            unsubs.append(
+                async_track_state_change_event(
+                    self.hass, inputs, self._async_input_changed
+                )
+            )
+
+        if self._zones_by_mini_split:
+            unsubs.append(
+                async_track_state_change_event(
+                    self.hass, list(self._zones_by_mini_split), self._async_mini_split_changed
+                )
+            )
+
+        if self._zones_by_power_sensor:
+            unsubs.append(
+                async_track_state_change_event(
+                    self.hass, list(self._zones_by_power_sensor), self._async_power_changed
+                )
+            )
+
+        unsubs.append(self._async_defer_first_control())
+
+        now = dt_util.utcnow()
+        for entity_id, zone in self._zones_by_power_sensor.items():
+            zone.energy.set_measured_power(now, _as_watts(self.hass.states.get(entity_id)))
+        for zone in self.zones:
+            zone.async_start_schedule(now)
+
+        @callback
+        def _async_stop():
+            for unsub in unsubs:
+                unsub()
+            self.presence_grace.cancel()
+            for zone in self.zones:
+                zone.async_shutdown()
+
+        return _async_stop
+
+    @callback
+    def _async_defer_first_control(self):
+        """Attendre le démarrage de HA et des entrées disponibles avant de piloter"""
+        watched = self._input_entity_ids() + list(self._zones_by_mini_split)
+        unsubs = []
+        remove_started = None
+
+        @callback
+        def _async_begin(_now=None):
+            if self.control_started:
+                return
+            for unsub in unsubs:
+                unsub()
+            unsubs.clear()
+            self.control_started = True
+            _LOGGER.debug(f"{self.name} : début du pilotage")
+            self.hass.async_create_task(self.async_request_refresh())
+
+        @callback
+        def _async_check_inputs(_event=None):
+            if all(self._is_available(entity_id) for entity_id in watched):
+                _async_begin()
+
+        @callback
+        def _async_ha_started(_event=None):
+            nonlocal remove_started
+            remove_started = None
+            unsubs.append(
+                async_track_state_change_event(self.hass, watched, _async_check_inputs)
+            )
+            # Ne pas attendre indéfiniment une entrée qui reste indisponible
+            unsubs.append(async_call_later(self.hass, STARTUP_TIMEOUT, _async_begin))
+            _async_check_inputs()
+
+        if self.hass.state is CoreState.running:
+            _async_ha_started()
+        else:
+            remove_started = self.hass.bus.async_listen_once(
+                EVENT_HOMEASSISTANT_STARTED, _async_ha_started
+            )
+
+        @callback
+        def _async_cancel():
+            if remove_started is not None:
+                remove_started()
+            for unsub in unsubs:
+                unsub()
+
+        return _async_cancel
+
+    def _is_available(self, entity_id):
+        """Vrai si l'entité a un état exploitable"""
+        state = self.hass.states.get(entity_id)
+        return state is not None and state.state not in (STATE_UNAVAILABLE, STATE_UNKNOWN)
+
+    def _input_entity_ids(self):
+        """Entités dont un changement d'état déclenche une réévaluation"""
+        entity_ids = {
+            self._config.get(CONF_TEMP_EXT),
+            self._config.get(CONF_PRESENCE_MAISON),
+        }
+        for zone in self.zones:
+            entity_ids.update(zone.temp_piece_entities)
+            entity_ids.add(zone.presence_piece_entity)
+        return [entity_id for entity_id in entity_ids if entity_id]
+
+    @callback
+    def _async_input_changed(self, event):
+        """Appelé quand une entrée de décision change"""
+        old_state = event.data.get("old_state")
+        new_state = event.data.get("new_state")
+
+        # Ignorer les changements d'attributs seuls
+        if (
+            old_state is not None
+            and new_state is not None
+            and old_state.state == new_state.state
+        ):
+            return
+
+        self.hass.async_create_task(self.async_request_refresh())
+
+    @callback
+    def _async_cycle_requested(self):
+        """Un minuteur de zone (commande reportée, programme horaire) demande un cycle"""
+        self.hass.async_create_task(self.async_request_refresh())
+
+    @callback
+    def _async_mini_split_changed(self, event):
+        """Appelé quand un mini-split réel change"""
+        zone = self._zones_by_mini_split.get(event.data.get("entity_id"))
+        new_state = event.data.get("new_state")
+
+        # Les durées et l'énergie sont comptées même sans pilotage
+        if zone is not None and new_state is not None:
+            zone.record_unit_state(new_state)
+
+        if (
+            zone is None
+            or new_state is None
+            or self.data is None
+            or not self.control_started
+            or not self.runtime.automation_enabled
+        ):
+            return
+
+        if zone.handle_minisplit_state(new_state, event.data.get("old_state")):
+            self.async_publish_zone(zone)
+
+    @callback
+    def _async_power_changed(self, event):
+        """Appelé quand le compteur de puissance d'une zone change"""
+        zone = self._zones_by_power_sensor.get(event.data.get("entity_id"))
+        new_state = event.data.get("new_state")
+        if zone is None or new_state is None:
+            return
+        zone.energy.set_measured_power(new_state.last_updated, _as_watts(new_state))
+
+    @callback
+    def async_publish_zone(self, zone):
+        """Publier la décision courante d'une zone sans nouveau cycle"""
+        if self.data is None:
+            return
+        self.async_set_updated_data(
+            {
+                **self.data,
+                zone.zone_id: SmartMinisplitData(
+                    self.data[zone.zone_id].snapshot, zone.decision()
+                ),
+            }
+        )
+
+    def _get_state(self, entity_id):
+        """État d'une entité optionnelle"""
+        if not entity_id:
+            return None
+        return self.hass.states.get(entity_id)
+
+    def _read_snapshots(self):
+        """Lire chaque entrée une seule fois pour ce cycle"""
+        runtime = self.runtime
+        now = dt_util.utcnow()
+
+        # Entrées communes à toutes les zones
+        temp_ext = _as_float(self._get_state(self._config.get(CONF_TEMP_EXT)))
+        presence_maison_entity = self._get_state(self._config.get(CONF_PRESENCE_MAISON))
+        presence_maison = STATE_ON if presence_maison_entity is None else self.presence_grace.state(
+            now, presence_maison_entity.state, presence_maison_entity.last_changed
+        )
+
+        self._select_season(now, temp_ext)
+
+        snapshots = {}
+        for zone in self.zones:
+            presence_piece_entity = self._get_state(zone.presence_piece_entity)
+            if not zone.presence_piece_entity:
+                # Pas de détecteur : le programme horaire (ou le confort) décide
+                presence_piece = None
+            elif presence_piece_entity is None:
+                presence_piece = STATE_ON
+            else:
+                presence_piece = zone.presence_grace.state(
+                    now, presence_piece_entity.state, presence_piece_entity.last_changed
+                )
+            mini_split_state = self._get_state(zone.mini_split_entity)
+            # Fusion des capteurs de la pièce, sans les mesures périmées
+            fusion = zone.temperature_fusion
+            for entity_id in zone.temp_piece_entities:
+                state = self._get_state(entity_id)
+                fusion.update(entity_id, _as_float(state), _measured_at(state))
+            temp_piece_raw = fusion.value(now)
+
+            snapshots[zone.zone_id] = InputSnapshot(
+                read_at=now,
+                temp_ext=temp_ext,
+                temp_piece=zone.filter_temperature(fusion.measured_at, temp_piece_raw),
+                temp_piece_raw=temp_piece_raw,
+                presence_maison=presence_maison,
+                presence_piece=presence_piece,
+                automation_enabled=runtime.automation_enabled,
+                use_presence_piece=runtime.use_presence_piece,
+                season=runtime.season,
+                minisplit_mode=mini_split_state.state if mini_split_state else None,
+                minisplit_target=mini_split_state.attributes.get("temperature") if mini_split_state else None,
+                minisplit_features=mini_split_state.attributes.get("supported_features", 0) if mini_split_state else 0,
+                minisplit_action=mini_split_state.attributes.get("hvac_action") if mini_split_state else None,
+            )
+        return snapshots
+
+    def _select_season(self, now, temp_ext):
+        """Échantillonner la température extérieure et changer de saison si besoin"""
+        selector = self.season_selector
+        if selector is None or not selector.add_sample(now, temp_ext):
+            return
+
+        runtime = self.runtime
+        if runtime.season_override:
+            # Le choix manuel tient jusqu'à ce que la météo lui donne raison
+            if selector.preferred() == runtime.season:
+                runtime.season_override = False
+                _LOGGER.info(f"{self.name} : saison automatique reprise ({runtime.season})")
+            return
+
+        season = selector.select(now, runtime.season)
+        if season != runtime.season:
+            _LOGGER.info(
+                f"{self.name} : passage automatique en {season} "
+                f"(moyenne extérieure {selector.mean:.1f}°C)"
+            )
+            runtime.season = season
+
+    async def _async_update_data(self):
+        """Un cycle : instantané des entrées, décision de toutes les zones, commandes"""
+        started = time.perf_counter()
+        snapshots = self._read_snapshots()
+
+        # Avant le premier pilotage : publier l'état restauré sans décider ni commander
+        if not self.control_started:
+            return self._publish(snapshots)
+
+        # Décider pour toutes les zones en une passe
+        for zone in self.zones:
+            zone.evaluate(snapshots[zone.zone_id])
+
+        # Envoyer les commandes en parallèle, avec une limite de simultanéité
+        tasks = {
+            self.hass.async_create_task(self._async_control(zone, snapshots[zone.zone_id])): zone
+            for zone in self.zones
+        }
+        done, pending = await asyncio.wait(tasks, timeout=CONTROL_LOOP_BUDGET)
+
+        # Le cycle ne dépasse jamais son budget, quel que soit l'état des mini-splits
+        for task in pending:
+            task.cancel()
+            _LOGGER.warning(f"[{tasks[task].name}] Commande abandonnée : budget de {CONTROL_LOOP_BUDGET} s dépassé")
+        for task in done:
+            # Une tâche annulée de l'extérieur (arrêt de Home Assistant) n'a pas d'exception
+            if task.cancelled():
+                _LOGGER.warning(f"[{tasks[task].name}] Commande annulée")
+                continue
+            error = task.exception()
+            if error is not None:
+                _LOGGER.error(f"[{tasks[task].name}] Échec de la commande du mini-split : {error}")
+
+        self.update_latencies.append(time.perf_counter() - started)
+        return self._publish(snapshots)
+
+    def _publish(self, snapshots):
+        """Données du cycle, les totaux d'énergie avancés jusqu'à maintenant"""
+        now = dt_util.utcnow()
+        for zone in self.zones:
+            zone.energy.advance(now)
+        return {
+            zone.zone_id: SmartMinisplitData(snapshots[zone.zone_id], zone.decision())
+            for zone in self.zones
+        }
+
+    async def _async_control(self, zone, snapshot):
+        """Commande d'une zone dans la limite de simultanéité"""
+        async with self._command_slots:
+            await zone.async_control(snapshot)
@@ -0,0 +1,43 @@
+"""Diagnostics pour HA Smart Minisplit"""
+
+from __future__ import annotations
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN
+from .metrics import latency_summary
+
+
+async def async_get_config_entry_diagnostics(hass: HomeAssistant, entry: ConfigEntry):
+    """Diagnostics d'une entrée : configuration, mesures et état de chaque zone"""
+    coordinator = hass.data[DOMAIN][entry.entry_id]["coordinator"]
+    runtime = coordinator.runtime
+
+    return {
+        "configuration": {**entry.data, **entry.options},
+        "runtime": {
+            "automation_active": runtime.automation_enabled,
+            "utiliser_presence_piece": runtime.use_presence_piece,
+            "saison": runtime.season,
+            "saison_forcee": runtime.season_override,
+            "moyenne_exterieure": None if coordinator.season_selector is None else coordinator.season_selector.mean,
+        },
+        "latence_mise_a_jour": latency_summary(coordinator.update_latencies),
+        "zones": {
+            zone.storage_key: {
+                "nom": zone.name,
+                "mini_split": zone.mini_split_entity,
+                "commandes": zone.command_stats,
+                "commande_en_attente": zone.pending_command,
+                "disjoncteur": {
+                    "etat": zone.circuit_breaker.state,
+                    "echecs_consecutifs": zone.circuit_breaker.failures,
+                    "ouvert_depuis": zone.circuit_breaker.opened_at,
+                },
+                "modele_thermique": zone.thermal_model.as_dict(),
+                **zone.metrics.as_dict(),
+            }
+            for zone in coordinator.zones
+        },
+    }
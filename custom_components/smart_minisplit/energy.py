@@ -0,0 +1,94 @@
+"""Comptage des durées et de l'énergie d'une zone pour HA Smart Minisplit
+
+Les totaux sont cumulés à chaque changement d'état (compresseur, mode de la
+zone, puissance mesurée) et à chaque cycle du coordinateur : l'intervalle
+écoulé depuis le point précédent est attribué à l'état qui était en vigueur,
+sans relire l'historique. Pendant une longue marche stable, les totaux
+progressent ainsi au moins à chaque réévaluation de sécurité.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime
+
+from .const import MODE_ABSENCE, MODE_ECO, MODE_CONFORT, MODE_REPLI
+
+# Totaux publiés : durées en heures, énergie en kWh
+ENERGY_TOTALS = (
+    "duree_compresseur",
+    f"duree_{MODE_CONFORT}",
+    f"duree_{MODE_ECO}",
+    f"duree_{MODE_ABSENCE}",
+    f"duree_{MODE_REPLI}",
+    "energie",
+)
+
+
+class EnergyMeter:
+    """Durées de marche, durées par mode et énergie estimée d'une zone"""
+
+    def __init__(self, running_power: float, idle_power: float):
+        # Modèle de puissance en W, remplacé par la mesure d'un compteur s'il y en a un
+        self._running_power = running_power
+        self._idle_power = idle_power
+        self.totals = dict.fromkeys(ENERGY_TOTALS, 0.0)
+
+        # État en vigueur depuis le dernier changement
+        self._since: datetime | None = None
+        self._running = False
+        self._unit_on = False
+        self._mode = None
+        self._measured_power: float | None = None
+
+    @property
+    def power(self):
+        """Puissance appelée actuellement (W)"""
+        if self._measured_power is not None:
+            return self._measured_power
+        if self._running:
+            return self._running_power
+        return self._idle_power if self._unit_on else 0.0
+
+    def advance(self, now: datetime):
+        """Attribuer l'intervalle écoulé à l'état en vigueur"""
+        if self._since is not None and now > self._since:
+            hours = (now - self._since).total_seconds() / 3600
+            totals = self.totals
+            if self._running:
+                totals["duree_compresseur"] += hours
+            if self._mode is not None:
+                totals[f"duree_{self._mode}"] += hours
+            totals["energie"] += self.power * hours / 1000
+        if self._since is None or now > self._since:
+            self._since = now
+
+    def set_unit_state(self, now: datetime, running: bool, unit_on: bool):
+        """Le compresseur ou le mini-split a changé d'état"""
+        if running == self._running and unit_on == self._unit_on:
+            return
+        self.advance(now)
+        self._running = running
+        self._unit_on = unit_on
+
+    def set_mode(self, now: datetime, mode):
+        """La zone a changé de mode (confort, eco, absence ou repli)"""
+        if mode == self._mode:
+            return
+        self.advance(now)
+        self._mode = mode
+
+    def set_measured_power(self, now: datetime, watts: float | None):
+        """Nouvelle mesure du compteur de puissance, None pour revenir au modèle"""
+        self.advance(now)
+        self._measured_power = watts
+
+    def set_power_model(self, now: datetime | None, running_power: float, idle_power: float):
+        """Changer les puissances du modèle ; l'intervalle écoulé garde les anciennes"""
+        if now is not None:
+            self.advance(now)
+        self._running_power = running_power
+        self._idle_power = idle_power
+
+    def restore(self, key, value):
+        """Reprendre un total publié avant le redémarrage"""
+        self.totals[key] += value
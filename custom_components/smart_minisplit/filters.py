@@ -0,0 +1,163 @@
+"""Filtrage de la température de la pièce pour HA Smart Minisplit
+
+Les capteurs bon marché sautent de quelques dixièmes de degré d'une mesure
+à l'autre ; sans filtre, le seuil de repli bascule et des commandes inutiles
+partent. Chaque filtre traite une mesure en temps constant, sur un état de
+taille fixe (au plus un tampon circulaire de la taille de la fenêtre).
+"""
+
+from __future__ import annotations
+
+import bisect
+from datetime import datetime, timedelta
+
+FILTER_NONE = "aucun"
+FILTER_EMA = "ema"
+FILTER_MEDIAN = "mediane"
+FILTER_RATE = "pente"
+FILTERS = (FILTER_NONE, FILTER_EMA, FILTER_MEDIAN, FILTER_RATE)
+
+
+class EmaFilter:
+    """Moyenne mobile exponentielle, de même retard qu'une moyenne sur la fenêtre"""
+
+    def __init__(self, window: int):
+        self._alpha = 2 / (window + 1)
+        self.value = None
+
+    def update(self, now: datetime, raw: float):
+        """Intégrer une mesure et retourner la valeur filtrée"""
+        if self.value is None:
+            self.value = raw
+        else:
+            self.value += self._alpha * (raw - self.value)
+        return self.value
+
+
+class MedianFilter:
+    """Médiane glissante sur les dernières mesures"""
+
+    def __init__(self, window: int):
+        # Tampon circulaire dans l'ordre d'arrivée, copie triée pour la médiane
+        self._ring = [None] * window
+        self._index = 0
+        self._sorted = []
+        self.value = None
+
+    def update(self, now: datetime, raw: float):
+        """Intégrer une mesure et retourner la valeur filtrée"""
+        oldest = self._ring[self._index]
+        if oldest is not None:
+            del self._sorted[bisect.bisect_left(self._sorted, oldest)]
+        self._ring[self._index] = raw
+        self._index = (self._index + 1) % len(self._ring)
+        bisect.insort(self._sorted, raw)
+
+        count = len(self._sorted)
+        middle = count // 2
+        if count % 2:
+            self.value = self._sorted[middle]
+        else:
+            self.value = (self._sorted[middle - 1] + self._sorted[middle]) / 2
+        return self.value
+
+
+class RateLimitFilter:
+    """Limite la vitesse de variation à ce qu'une pièce peut physiquement suivre"""
+
+    def __init__(self, max_rate: float):
+        # °C par heure
+        self._max_rate = max_rate
+        self._last_at = None
+        self.value = None
+
+    def update(self, now: datetime, raw: float):
+        """Intégrer une mesure et retourner la valeur filtrée"""
+        if self.value is None:
+            self.value = raw
+        else:
+            hours = max((now - self._last_at).total_seconds(), 0) / 3600
+            step = self._max_rate * hours
+            self.value += min(max(raw - self.value, -step), step)
+        self._last_at = now
+        return self.value
+
+
+def build_filter(kind, window: int, max_rate: float):
+    """Filtre configuré, None pour utiliser la mesure brute"""
+    if kind == FILTER_EMA:
+        return EmaFilter(window)
+    if kind == FILTER_MEDIAN:
+        return MedianFilter(window)
+    if kind == FILTER_RATE:
+        return RateLimitFilter(max_rate)
+    return None
+
+
+class TemperatureFusion:
+    """Moyenne pondérée des capteurs de la pièce, sans les mesures périmées
+
+    La somme pondérée et le poids total sont ajustés à chaque nouvelle mesure
+    ou capteur écarté, sans recalculer la moyenne sur tous les capteurs.
+    """
+
+    def __init__(self, weights: dict, stale_after: timedelta):
+        self._weights = weights
+        self._stale_after = stale_after
+        # Mesure retenue par capteur : (valeur, instant de la mesure)
+        self._samples = {}
+        self._weighted_sum = 0.0
+        self._total_weight = 0.0
+
+    @property
+    def sensors(self):
+        """Nombre de capteurs dont la mesure est retenue"""
+        return len(self._samples)
+
+    @property
+    def measured_at(self):
+        """Instant de la mesure la plus récente retenue"""
+        return max((at for _, at in self._samples.values()), default=None)
+
+    def _drop(self, entity_id):
+        """Retirer la mesure d'un capteur"""
+        value, _ = self._samples.pop(entity_id)
+        weight = self._weights[entity_id]
+        self._weighted_sum -= weight * value
+        self._total_weight -= weight
+        if not self._samples:
+            # Repartir de zéro exact plutôt que d'un résidu d'arrondi
+            self._weighted_sum = self._total_weight = 0.0
+
+    def update(self, entity_id, value, measured_at: datetime | None):
+        """Nouvelle mesure d'un capteur, None s'il est indisponible"""
+        sample = self._samples.get(entity_id)
+        if sample is not None:
+            if value is not None and sample == (value, measured_at):
+                return
+            self._drop(entity_id)
+        if value is None or measured_at is None:
+            return
+        weight = self._weights[entity_id]
+        self._samples[entity_id] = (value, measured_at)
+        self._weighted_sum += weight * value
+        self._total_weight += weight
+
+    def value(self, now: datetime):
+        """Température fusionnée à cet instant, None si aucune mesure n'est récente"""
+        for entity_id, (_, measured_at) in list(self._samples.items()):
+            if now - measured_at > self._stale_after:
+                self._drop(entity_id)
+        if self._total_weight <= 0:
+            return None
+        return self._weighted_sum / self._total_weight
+
+
+def parse_weights(entity_ids, text):
+    """Poids des capteurs, dans leur ordre (`2, 1`) ; égaux si le texte est vide"""
+    if not (text or "").strip():
+        return dict.fromkeys(entity_ids, 1.0)
+    weights = [float(weight) for weight in text.split(",")]
+    if len(weights) != len(entity_ids) or any(weight <= 0 for weight in weights):
+        raise ValueError(text)
+    return dict(zip(entity_ids, weights))
@@ -0,0 +1,192 @@
+"""Ajustement hors ligne du modèle thermique depuis la base du recorder
+
+Les historiques de la pièce, de l'extérieur et du mini-split sont lus par
+fenêtres de temps successives dans les tables `states` (et `statistics`
+quand les états ont été purgés), rééchantillonnés sur une grille commune,
+puis accumulés dans les équations normales du modèle de `thermal.py`.
+Seules les matrices 4×4 et la fenêtre en cours sont gardées en mémoire,
+quelle que soit la durée analysée.
+
+Ce module est exécuté dans un thread (executor) : il n'utilise pas la
+boucle asyncio de Home Assistant.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+from dataclasses import dataclass
+
+import numpy as np
+
+from .history import STATES_QUERY, STATISTICS_QUERY, connect, read_rows
+from .thermal import PARAMETERS
+
+_LOGGER = logging.getLogger(__name__)
+
+# Durée d'une fenêtre de lecture (secondes)
+WINDOW_SECONDS = 7 * 24 * 3600
+# Âge maximal d'une valeur propagée sur la grille (secondes)
+MAX_VALUE_AGE = 2 * 3600
+
+
+@dataclass
+class FitResult:
+    """Paramètres ajustés pour une zone"""
+
+    theta: list[float]
+    samples: int
+    residual: float
+
+    def as_dict(self):
+        """Représentation enregistrée et renvoyée par le service"""
+        return {
+            "theta": self.theta,
+            "samples": self.samples,
+            "residual": self.residual,
+            **{name: round(value, 4) for name, value in zip(PARAMETERS, self.theta)},
+        }
+
+
+def _numeric(value):
+    """État numérique, NaN si indisponible"""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def _compressor(state, shared_attrs):
+    """Code compresseur : +1 chauffe, -1 climatisation, 0 arrêt, NaN inconnu"""
+    if state in (None, "unavailable", "unknown"):
+        return np.nan
+    action = None
+    if shared_attrs:
+        try:
+            action = json.loads(shared_attrs).get("hvac_action")
+        except ValueError:
+            action = None
+    if action is None:
+        action = {"heat": "heating", "cool": "cooling"}.get(state, "off")
+    return {"heating": 1.0, "cooling": -1.0}.get(action, 0.0)
+
+
+class _Series:
+    """Une entité lue fenêtre par fenêtre, avec report de la dernière valeur"""
+
+    def __init__(self, connection, entity_id, decode, use_statistics):
+        self._connection = connection
+        self._entity_id = entity_id
+        self._decode = decode
+        self._use_statistics = use_statistics
+        self._last = None
+
+    def _fetch(self, query, start, end, decode):
+        """Lire une fenêtre par paquets"""
+        times, values = [], []
+        for row in read_rows(self._connection, query, self._entity_id, start, end):
+            times.append(row[0])
+            values.append(decode(*row[1:]))
+        return np.asarray(times, dtype=float), np.asarray(values, dtype=float)
+
+    def window(self, start, end):
+        """Horodatages et valeurs de la fenêtre, précédés de la dernière valeur connue"""
+        times, values = self._fetch(STATES_QUERY, start, end, self._decode)
+        if not len(times) and self._use_statistics:
+            # États purgés : moyennes horaires, datées au milieu de l'heure
+            times, values = self._fetch(
+                STATISTICS_QUERY, start, end, lambda mean: _numeric(mean)
+            )
+            times = times + 1800
+
+        if self._last is not None:
+            times = np.concatenate(([self._last[0]], times))
+            values = np.concatenate(([self._last[1]], values))
+        if len(times):
+            self._last = (times[-1], values[-1])
+        return times, values
+
+
+def _resample(times, values, grid):
+    """Valeur en vigueur à chaque point de la grille (NaN si trop ancienne)"""
+    if not len(times):
+        return np.full(grid.shape, np.nan)
+    index = np.searchsorted(times, grid, side="right") - 1
+    clipped = np.clip(index, 0, None)
+    resampled = values[clipped]
+    stale = (index < 0) | (grid - times[clipped] > MAX_VALUE_AGE)
+    resampled[stale] = np.nan
+    return resampled
+
+
+def fit_zone(db_path, temp_piece, temp_ext, mini_split, start_ts, end_ts, step_seconds=300):
+    """Ajuster le modèle thermique d'une zone sur l'historique du recorder"""
+    connection = connect(db_path)
+    try:
+        series = (
+            _Series(connection, temp_piece, lambda state, _: _numeric(state), True),
+            _Series(connection, temp_ext, lambda state, _: _numeric(state), True),
+            _Series(connection, mini_split, _compressor, False),
+        )
+
+        size = len(PARAMETERS)
+        xtx = np.zeros((size, size))
+        xty = np.zeros(size)
+        yty = 0.0
+        samples = 0
+        hours = step_seconds / 3600
+
+        # Grille continue d'une fenêtre à l'autre ; le dernier point d'une fenêtre
+        # ouvre la suivante pour garder la pente qui chevauche la limite
+        next_point = start_ts
+        carried = None
+        window_start = start_ts
+        while window_start < end_ts:
+            window_end = min(window_start + WINDOW_SECONDS, end_ts)
+            grid = np.arange(next_point, window_end, step_seconds, dtype=float)
+            t_in, t_ext, compressor = (
+                _resample(*item.window(window_start, window_end), grid) for item in series
+            )
+            window_start = window_end
+            if not len(grid):
+                continue
+            next_point = grid[-1] + step_seconds
+            if carried is not None:
+                t_in, t_ext, compressor = (
+                    np.concatenate(([last], values))
+                    for last, values in zip(carried, (t_in, t_ext, compressor))
+                )
+            carried = (t_in[-1], t_ext[-1], compressor[-1])
+            if len(t_in) < 2:
+                continue
+
+            # Pente mesurée entre deux points de grille consécutifs
+            slope = np.diff(t_in) / hours
+            phi = np.column_stack((
+                t_ext[:-1] - t_in[:-1],
+                (compressor[:-1] > 0).astype(float),
+                -(compressor[:-1] < 0).astype(float),
+                np.ones(len(slope)),
+            ))
+            valid = np.isfinite(slope) & np.isfinite(phi).all(axis=1) & np.isfinite(compressor[:-1])
+            phi = phi[valid]
+            slope = slope[valid]
+
+            xtx += phi.T @ phi
+            xty += phi.T @ slope
+            yty += float(slope @ slope)
+            samples += len(slope)
+    finally:
+        connection.close()
+
+    if samples < size:
+        return None
+
+    theta, *_ = np.linalg.lstsq(xtx, xty, rcond=None)
+    residual = (yty - 2 * theta @ xty + theta @ xtx @ theta) / samples
+    _LOGGER.debug(f"{temp_piece} : {samples} échantillons, paramètres {theta}")
+    return FitResult(
+        theta=[float(value) for value in theta],
+        samples=samples,
+        residual=float(max(residual, 0.0)),
+    )
@@ -0,0 +1,44 @@
+"""Lecture de l'historique dans la base SQLite du recorder
+
+Requêtes et lecture par paquets partagées par l'ajustement du modèle
+thermique (`fitting`) et le rejeu (`replay`). La base est ouverte en lecture
+seule, dans un thread (executor) ou hors de Home Assistant.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+
+# Lignes lues par appel à fetchmany
+CHUNK_ROWS = 20_000
+
+# Changements d'état d'une entité : horodatage, état, attributs
+STATES_QUERY = """
+    SELECT s.last_updated_ts, s.state, a.shared_attrs
+    FROM states s
+    JOIN states_meta m ON s.metadata_id = m.metadata_id
+    LEFT JOIN state_attributes a ON s.attributes_id = a.attributes_id
+    WHERE m.entity_id = ? AND s.last_updated_ts >= ? AND s.last_updated_ts < ?
+    ORDER BY s.last_updated_ts
+"""
+
+# Moyennes horaires d'une entité, gardées après la purge des états
+STATISTICS_QUERY = """
+    SELECT st.start_ts, st.mean
+    FROM statistics st
+    JOIN statistics_meta sm ON st.metadata_id = sm.id
+    WHERE sm.statistic_id = ? AND st.start_ts >= ? AND st.start_ts < ?
+    ORDER BY st.start_ts
+"""
+
+
+def connect(db_path):
+    """Connexion en lecture seule à la base du recorder"""
+    return sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+
+
+def read_rows(connection, query, entity_id, start_ts, end_ts):
+    """Lignes d'une entité entre deux horodatages, lues par paquets de CHUNK_ROWS"""
+    cursor = connection.execute(query, (entity_id, start_ts, end_ts))
+    while rows := cursor.fetchmany(CHUNK_ROWS):
+        yield from rows
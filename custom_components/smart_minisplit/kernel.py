@@ -0,0 +1,190 @@
+"""Noyau de décision d'une zone pour HA Smart Minisplit
+
+Le choix du mode (absence, eco, confort), de la consigne et la logique
+d'hystérésis avec repli sont une fonction pure : des entrées et l'état
+précédent donnent un nouvel état et une décision, sans lecture de
+Home Assistant, sans appel de service ni message de journal.
+`SmartMinisplitZone` adapte ce noyau à Home Assistant ; `kernel_batch`
+en évalue des tableaux entiers de zones ou d'instants avec NumPy.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, replace
+
+from homeassistant.components.climate.const import HVACMode
+from homeassistant.const import STATE_OFF
+
+from .const import (
+    MODE_ABSENCE,
+    MODE_ECO,
+    MODE_CONFORT,
+    SEASON_CHAUFFAGE,
+)
+from .thermal import predict, time_to_reach
+
+# Motif d'une décision, traduit en message par la zone
+REASON_DISABLED = "desactive"
+REASON_MANUAL = "manuel"
+REASON_HOUSE_EMPTY = "maison_vide"
+REASON_FAIL_SAFE = "securite"
+REASON_RESUME = "reprise"
+REASON_SETBACK = "repli"
+REASON_ANTICIPATION = "anticipation"
+REASON_MODE_CHANGE = "changement_mode"
+
+
+@dataclass(frozen=True)
+class KernelSettings:
+    """Réglages d'une zone, reconstruits quand les options changent"""
+
+    hysteresis: float
+    offset: float
+    # Consigne par (saison, mode)
+    setpoints: dict
+    # Un programme horaire choisit le mode quand la pièce est vide
+    schedule: bool = False
+
+
+@dataclass(frozen=True)
+class KernelInputs:
+    """Entrées d'une évaluation"""
+
+    season: str
+    presence_maison: str
+    # None sans détecteur dans la pièce
+    presence_piece: str | None
+    automation_enabled: bool = True
+    use_presence_piece: bool = True
+    temp_piece: float | None = None
+    temp_ext: float | None = None
+    # Mode du programme horaire à cet instant, None hors plage
+    scheduled_mode: str | None = None
+    # Paramètres du modèle thermique si l'anticipation est active et le modèle prêt
+    theta: tuple | None = None
+
+
+@dataclass(frozen=True)
+class KernelState:
+    """État du contrôleur conservé d'une évaluation à la suivante"""
+
+    mode: str = MODE_ABSENCE
+    hvac_mode: str = HVACMode.OFF
+    target_temperature: float | None = None
+    manual_mode: bool = False
+    fail_safe: bool = False
+
+
+@dataclass(frozen=True)
+class KernelDecision:
+    """Résultat d'une évaluation"""
+
+    state: KernelState
+    # Une commande doit être envoyée au mini-split
+    command: bool = False
+    # La commande en place est maintenue : une commande reportée est abandonnée
+    hold: bool = False
+    # Motif principal, None si rien de notable (le message précédent reste valable)
+    reason: str | None = None
+    # Le mode manuel vient d'être levé par la maison vide
+    manual_cleared: bool = False
+
+
+def anticipates(theta, heating: bool, consigne, hysteresis, temp_piece, temp_ext):
+    """Vrai si la pièce sortira de la bande plus vite que le mini-split ne la rattrape"""
+    if theta is None or temp_ext is None:
+        return False
+    if heating:
+        threshold = consigne - hysteresis
+        if temp_piece >= consigne:
+            return False
+    else:
+        threshold = consigne + hysteresis
+        if temp_piece <= consigne:
+            return False
+
+    # Durée pour revenir du seuil à la consigne, mini-split en marche
+    recovery = time_to_reach(theta, threshold, consigne, temp_ext, heating=heating, cooling=not heating)
+    if recovery is None:
+        return False
+
+    # Température atteinte sans intervention pendant cette durée
+    drift = predict(theta, temp_piece, temp_ext, recovery)
+    return drift < threshold if heating else drift > threshold
+
+
+def select_mode(settings: KernelSettings, inputs: KernelInputs):
+    """Mode de la zone quand la maison est occupée"""
+    sensing = inputs.use_presence_piece and inputs.presence_piece is not None
+    if sensing and inputs.presence_piece != STATE_OFF:
+        # Présence dans la pièce : le confort prime sur le programme
+        return MODE_CONFORT
+    if settings.schedule:
+        # Pièce vide ou sans détecteur : le programme horaire choisit, ECO hors plage
+        return inputs.scheduled_mode or MODE_ECO
+    if sensing:
+        return MODE_ECO
+    return MODE_CONFORT
+
+
+def decide(settings: KernelSettings, inputs: KernelInputs, state: KernelState):
+    """Évaluer une zone : nouvel état et décision, sans effet de bord"""
+    if not inputs.automation_enabled:
+        return KernelDecision(state, hold=True, reason=REASON_DISABLED)
+
+    # Désactiver le mode manuel si la maison est vide
+    manual_cleared = inputs.presence_maison == STATE_OFF and state.manual_mode
+    if manual_cleared:
+        state = replace(state, manual_mode=False)
+
+    # Si mode manuel, ne pas modifier la consigne
+    if state.manual_mode:
+        return KernelDecision(state, hold=True, reason=REASON_MANUAL)
+
+    if inputs.presence_maison == STATE_OFF:
+        return KernelDecision(
+            KernelState(MODE_ABSENCE, HVACMode.OFF, None, False, False),
+            command=True,
+            reason=REASON_HOUSE_EMPTY,
+            manual_cleared=manual_cleared,
+        )
+
+    # Aucune température récente : maintenir la commande en place plutôt que d'en inventer une
+    temp_piece = inputs.temp_piece
+    if temp_piece is None:
+        return KernelDecision(replace(state, fail_safe=True), hold=True, reason=REASON_FAIL_SAFE)
+
+    mode = select_mode(settings, inputs)
+    heating = inputs.season == SEASON_CHAUFFAGE
+    consigne = settings.setpoints[(inputs.season, mode)]
+    target = consigne
+    hysteresis = settings.hysteresis
+    offset = settings.offset
+
+    # Hystérésis avec repli, autour de la consigne du mode
+    command = True
+    if heating and temp_piece < consigne - hysteresis or not heating and temp_piece > consigne + hysteresis:
+        # Hors de la bande : consigne normale
+        reason = REASON_RESUME
+    elif heating and temp_piece >= consigne + offset:
+        # Consigne atteinte + offset : repli pour économie d'énergie
+        target = consigne - offset
+        reason = REASON_SETBACK
+    elif not heating and temp_piece <= consigne - offset:
+        target = consigne + offset
+        reason = REASON_SETBACK
+    elif anticipates(inputs.theta, heating, consigne, hysteresis, temp_piece, inputs.temp_ext):
+        # La pièce sortira de la bande avant de pouvoir être rattrapée
+        reason = REASON_ANTICIPATION
+    else:
+        command = False
+        reason = None
+
+    if mode != state.mode:
+        reason = REASON_MODE_CHANGE
+
+    return KernelDecision(
+        KernelState(mode, HVACMode.HEAT if heating else HVACMode.COOL, target, False, False),
+        command=command,
+        reason=reason,
+    )
@@ -0,0 +1,298 @@
+"""Noyau de décision évalué sur des tableaux NumPy
+
+Mêmes règles que `kernel.decide`, codées en entiers et appliquées à des
+tableaux entiers au lieu d'un appel Python par évaluation :
+
+  - `decide_batch` évalue des lignes indépendantes (zones d'une flotte,
+    jeux de réglages), chacune avec son état précédent ;
+  - `decide_series` enchaîne les instants d'une ou plusieurs zones (le temps
+    sur le premier axe) : l'état conservé d'un instant au suivant (mode
+    manuel, commande maintenue en sécurité) est reporté par des cumuls
+    plutôt que par une boucle.
+
+Les présences sont des booléens (`état != "off"`), `has_presence_piece`
+indique les zones qui ont un détecteur dans la pièce, les modes des indices
+dans MODES, HVAC_MODES et SEASONS, une température absente vaut NaN.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+import numpy as np
+from homeassistant.components.climate.const import HVACMode
+
+from .const import (
+    MODE_ABSENCE,
+    MODE_ECO,
+    MODE_CONFORT,
+    SEASON_CHAUFFAGE,
+    SEASON_CLIMATISATION,
+)
+from .kernel import (
+    REASON_DISABLED,
+    REASON_MANUAL,
+    REASON_HOUSE_EMPTY,
+    REASON_FAIL_SAFE,
+    REASON_RESUME,
+    REASON_SETBACK,
+    REASON_ANTICIPATION,
+    REASON_MODE_CHANGE,
+)
+
+MODES = (MODE_ABSENCE, MODE_ECO, MODE_CONFORT)
+HVAC_MODES = (HVACMode.OFF, HVACMode.HEAT, HVACMode.COOL)
+SEASONS = (SEASON_CHAUFFAGE, SEASON_CLIMATISATION)
+REASONS = (
+    None,
+    REASON_DISABLED,
+    REASON_MANUAL,
+    REASON_HOUSE_EMPTY,
+    REASON_FAIL_SAFE,
+    REASON_RESUME,
+    REASON_SETBACK,
+    REASON_ANTICIPATION,
+    REASON_MODE_CHANGE,
+)
+# Hors plage du programme horaire
+NO_SCHEDULED_MODE = -1
+
+_ABSENCE, _ECO, _CONFORT = range(len(MODES))
+_OFF, _HEAT, _COOL = range(len(HVAC_MODES))
+(
+    _NONE,
+    _DISABLED,
+    _MANUAL,
+    _HOUSE_EMPTY,
+    _FAIL_SAFE,
+    _RESUME,
+    _SETBACK,
+    _ANTICIPATION,
+    _MODE_CHANGE,
+) = range(len(REASONS))
+
+
+@dataclass
+class BatchDecision:
+    """Décisions d'un lot, un élément par évaluation"""
+
+    mode: np.ndarray
+    hvac_mode: np.ndarray
+    target_temperature: np.ndarray
+    manual_mode: np.ndarray
+    fail_safe: np.ndarray
+    command: np.ndarray
+    hold: np.ndarray
+    reason: np.ndarray
+
+
+def setpoint_table(setpoints):
+    """Tableau (saison, mode) des consignes d'une zone, dans l'ordre de SEASONS et MODES"""
+    return np.array([[setpoints[(season, mode)] for mode in MODES] for season in SEASONS], dtype=float)
+
+
+def _anticipates(theta, heating, consigne, hysteresis, temp_piece, temp_ext):
+    """Version tableau de `kernel.anticipates` (NaN dans theta : pas d'anticipation)"""
+    a, b_chauffe, b_clim, c = np.moveaxis(np.asarray(theta, dtype=float), -1, 0)
+    threshold = np.where(heating, consigne - hysteresis, consigne + hysteresis)
+    inside = np.where(heating, temp_piece < consigne, temp_piece > consigne)
+    small = a <= 1e-6
+
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        # Durée pour revenir du seuil à la consigne, mini-split en marche
+        slope = a * (temp_ext - threshold) + b_chauffe * heating - b_clim * ~heating + c
+        forcing = slope + a * threshold
+        equilibrium = forcing / a
+        ratio = (consigne - equilibrium) / (threshold - equilibrium)
+        recovery = np.where(
+            small,
+            (consigne - threshold) / (forcing - a * threshold),
+            -np.log(ratio) / a,
+        )
+        reachable = ((consigne - threshold) * slope > 0) & (small | (ratio > 0))
+        recovery = np.where(consigne == threshold, 0.0, recovery)
+        reachable |= consigne == threshold
+
+        # Température atteinte sans intervention pendant cette durée
+        forcing = a * (temp_ext - temp_piece) + c + a * temp_piece
+        equilibrium = forcing / a
+        drift = np.where(
+            small,
+            temp_piece + (forcing - a * temp_piece) * recovery,
+            equilibrium + (temp_piece - equilibrium) * np.exp(-a * recovery),
+        )
+        crossed = np.where(heating, drift < threshold, drift > threshold)
+
+    known = np.isfinite(a) & np.isfinite(b_chauffe) & np.isfinite(b_clim) & np.isfinite(c)
+    return known & ~np.isnan(temp_ext) & inside & reachable & crossed
+
+
+def decide_batch(
+    hysteresis,
+    offset,
+    setpoints,
+    *,
+    heating_season,
+    presence_maison,
+    presence_piece,
+    temp_piece,
+    temp_ext=np.nan,
+    automation_enabled=True,
+    use_presence_piece=True,
+    has_presence_piece=True,
+    schedule=False,
+    scheduled_mode=NO_SCHEDULED_MODE,
+    theta=None,
+    mode=_ABSENCE,
+    hvac_mode=_OFF,
+    target_temperature=np.nan,
+    manual_mode=False,
+    fail_safe=False,
+):
+    """Évaluer des lignes indépendantes ; `setpoints` est de forme (2, 3) ou (N, 2, 3)"""
+    heating = np.asarray(heating_season, dtype=bool)
+    temp = np.asarray(temp_piece, dtype=float)
+    temp_ext = np.asarray(temp_ext, dtype=float)
+    hysteresis = np.asarray(hysteresis, dtype=float)
+    offset = np.asarray(offset, dtype=float)
+    previous_mode = np.asarray(mode)
+    manual_in = np.asarray(manual_mode, dtype=bool)
+
+    # Branches de kernel.decide, dans le même ordre
+    disabled = ~np.asarray(automation_enabled, dtype=bool)
+    house_empty = ~np.asarray(presence_maison, dtype=bool)
+    manual_hold = ~disabled & manual_in & ~house_empty
+    active = ~disabled & ~manual_hold
+    empty = active & house_empty
+    missing = active & ~house_empty & np.isnan(temp)
+    running = active & ~house_empty & ~np.isnan(temp)
+
+    # Mode quand la maison est occupée
+    sensing = np.asarray(use_presence_piece, dtype=bool) & np.asarray(has_presence_piece, dtype=bool)
+    scheduled = np.asarray(scheduled_mode)
+    new_mode = np.where(
+        sensing & np.asarray(presence_piece, dtype=bool),
+        _CONFORT,
+        np.where(
+            np.asarray(schedule, dtype=bool),
+            np.where(scheduled >= 0, scheduled, _ECO),
+            np.where(sensing, _ECO, _CONFORT),
+        ),
+    )
+
+    table = np.asarray(setpoints, dtype=float)
+    season = np.where(heating, 0, 1)
+    if table.ndim == 2:
+        consigne = table[season, new_mode]
+    else:
+        consigne = table[np.arange(len(table)), season, new_mode]
+
+    # Hystérésis avec repli, autour de la consigne du mode
+    resume = np.where(heating, temp < consigne - hysteresis, temp > consigne + hysteresis)
+    setback = ~resume & np.where(heating, temp >= consigne + offset, temp <= consigne - offset)
+    target = np.where(setback, np.where(heating, consigne - offset, consigne + offset), consigne)
+    if theta is None:
+        anticipation = np.zeros_like(resume)
+    else:
+        anticipation = ~resume & ~setback & _anticipates(
+            theta, heating, consigne, hysteresis, temp, temp_ext
+        )
+    reason = np.where(
+        resume, _RESUME, np.where(setback, _SETBACK, np.where(anticipation, _ANTICIPATION, _NONE))
+    )
+    reason = np.where(new_mode != previous_mode, _MODE_CHANGE, reason)
+
+    held = disabled | manual_hold | missing
+    return BatchDecision(
+        mode=np.select([held, empty], [previous_mode, _ABSENCE], new_mode),
+        hvac_mode=np.select([held, empty], [hvac_mode, _OFF], np.where(heating, _HEAT, _COOL)),
+        target_temperature=np.select([held, empty], [target_temperature, np.nan], target),
+        manual_mode=np.where(disabled, manual_in, manual_hold),
+        fail_safe=np.select([disabled | manual_hold, missing], [fail_safe, True], False),
+        command=empty | running & (resume | setback | anticipation),
+        hold=held,
+        reason=np.select(
+            [disabled, manual_hold, empty, missing],
+            [_DISABLED, _MANUAL, _HOUSE_EMPTY, _FAIL_SAFE],
+            reason,
+        ),
+    )
+
+
+def _carry(values, determined, initial):
+    """Valeur en vigueur après chaque instant : la dernière déterminée, l'initiale avant"""
+    steps = np.arange(len(values)).reshape((-1,) + (1,) * (values.ndim - 1))
+    index = np.maximum.accumulate(np.where(determined, steps, -1), axis=0)
+    carried = np.take_along_axis(values, np.maximum(index, 0), axis=0)
+    return np.where(index >= 0, carried, initial)
+
+
+def _previous(values, initial):
+    """Valeur de l'instant précédent, l'initiale au premier instant"""
+    initial = np.broadcast_to(initial, values.shape[1:]).astype(values.dtype)
+    return np.concatenate([initial[np.newaxis], values[:-1]])
+
+
+def decide_series(
+    hysteresis,
+    offset,
+    setpoints,
+    *,
+    heating_season,
+    presence_maison,
+    presence_piece,
+    temp_piece,
+    temp_ext=np.nan,
+    automation_enabled=True,
+    use_presence_piece=True,
+    has_presence_piece=True,
+    schedule=False,
+    scheduled_mode=NO_SCHEDULED_MODE,
+    theta=None,
+    mode=_ABSENCE,
+    hvac_mode=_OFF,
+    target_temperature=np.nan,
+    manual_mode=False,
+    fail_safe=False,
+):
+    """Enchaîner les instants (premier axe) à partir de l'état initial donné"""
+    inputs = dict(
+        heating_season=heating_season,
+        presence_maison=presence_maison,
+        presence_piece=presence_piece,
+        temp_piece=temp_piece,
+        temp_ext=temp_ext,
+        automation_enabled=automation_enabled,
+        use_presence_piece=use_presence_piece,
+        has_presence_piece=has_presence_piece,
+        schedule=schedule,
+        scheduled_mode=scheduled_mode,
+    )
+    shape = np.broadcast_shapes(*(np.shape(value) for value in inputs.values()))
+    inputs = {key: np.broadcast_to(value, shape) for key, value in inputs.items()}
+
+    # Le mode manuel n'est levé que par la maison vide, automatisation active
+    cleared = np.logical_or.accumulate(
+        inputs["automation_enabled"] & ~inputs["presence_maison"].astype(bool), axis=0
+    )
+    manual_in = np.asarray(manual_mode, dtype=bool) & ~_previous(cleared, False)
+
+    # Premier passage : valeurs déterminées à chaque instant, indépendamment de l'état
+    first = decide_batch(
+        hysteresis, offset, setpoints, **inputs, theta=theta, manual_mode=manual_in
+    )
+    determined = ~first.hold
+    kept = first.reason == _FAIL_SAFE
+    state = {
+        "mode": _previous(_carry(first.mode, determined, mode), mode),
+        "hvac_mode": _previous(_carry(first.hvac_mode, determined, hvac_mode), hvac_mode),
+        "target_temperature": _previous(
+            _carry(first.target_temperature, determined, target_temperature), target_temperature
+        ),
+        "fail_safe": _previous(_carry(first.fail_safe, determined | kept, fail_safe), fail_safe),
+    }
+
+    # Second passage : chaque instant avec l'état laissé par le précédent
+    return decide_batch(
+        hysteresis, offset, setpoints, **inputs, theta=theta, manual_mode=manual_in, **state
+    )
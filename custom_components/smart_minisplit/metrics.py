@@ -0,0 +1,111 @@
+"""Mesures de la boucle de contrôle pour HA Smart Minisplit
+
+Les durées sont gardées dans des tampons circulaires de taille fixe
+(`collections.deque` avec `maxlen`) : un enregistrement coûte un ajout,
+et les statistiques ne sont calculées qu'à la lecture (diagnostics,
+capteurs de diagnostic).
+"""
+
+from __future__ import annotations
+
+from collections import deque
+
+# Nombre de mesures gardées par tampon
+LATENCY_SAMPLES = 256
+# Nombre de décisions gardées par zone
+DECISION_HISTORY = 20
+# Bornes des classes de l'histogramme des appels de service (secondes)
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def percentile(values, fraction):
+    """Percentile par rang le plus proche, None sans mesure"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+
+def latency_summary(values):
+    """Percentiles d'une série de durées, en millisecondes"""
+    summary = {"mesures": len(values)}
+    for name, fraction in (("p50", 0.5), ("p95", 0.95), ("p99", 0.99)):
+        value = percentile(values, fraction)
+        summary[f"{name}_ms"] = None if value is None else round(value * 1000, 1)
+    summary["max_ms"] = round(max(values) * 1000, 1) if values else None
+    return summary
+
+
+def histogram(values, buckets=LATENCY_BUCKETS):
+    """Nombre de mesures par classe de durée"""
+    counts = {f"<={bound}s": 0 for bound in buckets}
+    counts[f">{buckets[-1]}s"] = 0
+    for value in values:
+        for bound in buckets:
+            if value <= bound:
+                counts[f"<={bound}s"] += 1
+                break
+        else:
+            counts[f">{buckets[-1]}s"] += 1
+    return counts
+
+
+class ZoneMetrics:
+    """Durées de cycle, appels de service et dernières décisions d'une zone"""
+
+    def __init__(self):
+        self.cycle_latencies = deque(maxlen=LATENCY_SAMPLES)
+        self.service_latencies: dict[str, deque] = {}
+        self.service_failures = 0
+        self.cycles = 0
+        self.cycles_skipped = 0
+        self.decisions = deque(maxlen=DECISION_HISTORY)
+
+    def record_service(self, service, seconds):
+        """Durée d'un appel de service au mini-split"""
+        latencies = self.service_latencies.get(service)
+        if latencies is None:
+            latencies = self.service_latencies[service] = deque(maxlen=LATENCY_SAMPLES)
+        latencies.append(seconds)
+
+    def record_cycle(self, seconds, sent, decision_entry):
+        """Fin d'un cycle de la zone ; `decision_entry` est un tuple brut"""
+        self.cycles += 1
+        if not sent:
+            self.cycles_skipped += 1
+        self.cycle_latencies.append(seconds)
+        self.decisions.append(decision_entry)
+
+    def service_summary(self):
+        """Percentiles de latence de tous les appels de service"""
+        return latency_summary(
+            [value for latencies in self.service_latencies.values() for value in latencies]
+        )
+
+    def as_dict(self):
+        """Représentation complète pour les diagnostics"""
+        return {
+            "cycles": self.cycles,
+            "cycles_sans_commande": self.cycles_skipped,
+            "echecs_commande": self.service_failures,
+            "latence_cycle": latency_summary(self.cycle_latencies),
+            "latence_services": {
+                service: {
+                    **latency_summary(latencies),
+                    "histogramme": histogram(latencies),
+                }
+                for service, latencies in self.service_latencies.items()
+            },
+            "dernieres_decisions": [
+                {
+                    "instant": read_at.isoformat(),
+                    "mode_actuel": mode_actuel,
+                    "hvac_mode": str(hvac_mode),
+                    "consigne": target_temperature,
+                    "commande_envoyee": sent,
+                    "action": last_action,
+                }
+                for read_at, mode_actuel, hvac_mode, target_temperature, sent, last_action in self.decisions
+            ],
+        }
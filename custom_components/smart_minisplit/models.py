@@ -0,0 +1,60 @@
+"""Structures de données partagées pour HA Smart Minisplit"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime
+
+from homeassistant.components.climate.const import HVACMode
+
+from .const import SEASON_CHAUFFAGE
+
+
+@dataclass(frozen=True)
+class InputSnapshot:
+    """Instantané immuable des entrées d'une zone lues pendant un cycle"""
+
+    read_at: datetime
+    temp_ext: float | None
+    temp_piece: float | None
+    temp_piece_raw: float | None
+    presence_maison: str
+    # None si la zone n'a pas de détecteur de présence
+    presence_piece: str | None
+    automation_enabled: bool
+    use_presence_piece: bool
+    season: str
+    minisplit_mode: str | None
+    minisplit_target: float | None
+    minisplit_features: int
+    minisplit_action: str | None
+
+
+@dataclass(frozen=True)
+class Decision:
+    """Décision de contrôle appliquée à une zone pendant un cycle"""
+
+    mode_actuel: str
+    hvac_mode: HVACMode
+    target_temperature: float | None
+    manual_mode: bool
+    last_action: str
+
+
+@dataclass(frozen=True)
+class SmartMinisplitData:
+    """Données d'une zone publiées à ses entités"""
+
+    snapshot: InputSnapshot
+    decision: Decision
+
+
+@dataclass
+class SmartMinisplitRuntime:
+    """État des switches d'une entrée, partagé en mémoire avec le coordinateur"""
+
+    automation_enabled: bool = True
+    use_presence_piece: bool = True
+    season: str = SEASON_CHAUFFAGE
+    # Saison choisie à la main alors que la saison automatique est active
+    season_override: bool = False
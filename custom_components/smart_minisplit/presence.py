@@ -0,0 +1,73 @@
+"""Délais d'absence des capteurs de présence pour HA Smart Minisplit
+
+Un détecteur de mouvement repasse à « off » quelques secondes dès que
+personne ne bouge ; sans délai, chaque coupure change le mode et envoie une
+rafale de commandes. L'absence n'est retenue qu'après un délai de grâce
+compté depuis le passage à « off » ; la présence, elle, est prise en compte
+immédiatement.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+
+from homeassistant.const import STATE_OFF, STATE_ON
+from homeassistant.core import callback
+
+
+class PresenceGrace:
+    """Présence d'un capteur, l'absence confirmée après le délai de grâce
+
+    Un seul minuteur par capteur, armé au début de l'absence et annulé dès que
+    la présence revient ; à son expiration, un nouveau cycle est demandé.
+    """
+
+    def __init__(self, grace: timedelta, call_later, on_expired):
+        self.grace = grace
+        self._call_later = call_later
+        self._on_expired = on_expired
+        self._timer = None
+        # Début de l'absence pour laquelle le minuteur est armé
+        self._armed_for: datetime | None = None
+
+    @property
+    def pending(self):
+        """Vrai si une absence est en cours de confirmation"""
+        return self._timer is not None
+
+    def configure(self, grace: timedelta):
+        """Changer le délai ; une absence en cours sera recomptée au prochain cycle"""
+        if grace != self.grace:
+            self.grace = grace
+            self.cancel()
+
+    def cancel(self):
+        """Annuler le minuteur en cours"""
+        if self._timer is not None:
+            self._timer()
+            self._timer = None
+        self._armed_for = None
+
+    def state(self, now: datetime, raw, changed_at: datetime):
+        """État retenu : `off` seulement si le capteur l'est depuis au moins le délai"""
+        if raw != STATE_OFF or self.grace <= timedelta(0):
+            self.cancel()
+            return raw
+
+        elapsed = now - changed_at
+        if elapsed >= self.grace:
+            self.cancel()
+            return STATE_OFF
+
+        # Absence pas encore confirmée : un minuteur vers la fin du délai
+        if self._timer is None or self._armed_for != changed_at:
+            self.cancel()
+            self._armed_for = changed_at
+            self._timer = self._call_later((self.grace - elapsed).total_seconds(), self._expired)
+        return STATE_ON
+
+    @callback
+    def _expired(self, _now):
+        """Fin du délai : réévaluer avec l'absence confirmée"""
+        self._timer = None
+        self._on_expired()
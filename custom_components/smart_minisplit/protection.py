@@ -0,0 +1,60 @@
+"""Protection anti-cycles courts du compresseur pour HA Smart Minisplit"""
+
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+
+from .commands import same_command
+
+
+class ShortCycleGuard:
+    """Durées minimales de marche, d'arrêt et de maintien d'une consigne"""
+
+    def __init__(self, min_on: timedelta, min_off: timedelta, min_hold: timedelta):
+        self.set_durations(min_on, min_off, min_hold)
+        # Dernière commande appliquée et instants des dernières transitions
+        self.hvac_mode = None
+        self.temperature = None
+        self.on_since: datetime | None = None
+        self.off_since: datetime | None = None
+        self.setpoint_since: datetime | None = None
+
+    def set_durations(self, min_on: timedelta, min_off: timedelta, min_hold: timedelta):
+        """Changer les durées minimales, sans oublier les dernières transitions"""
+        self._min_on = min_on
+        self._min_off = min_off
+        self._min_hold = min_hold
+
+    def record(self, hvac_mode, temperature, now: datetime):
+        """Mémoriser une commande envoyée au mini-split"""
+        if hvac_mode == "off":
+            if self.hvac_mode != "off":
+                self.off_since = now
+        else:
+            if self.hvac_mode in (None, "off"):
+                self.on_since = now
+            if not same_command(hvac_mode, temperature, self.hvac_mode, self.temperature):
+                self.setpoint_since = now
+        self.hvac_mode = hvac_mode
+        self.temperature = temperature
+
+    def release_at(self, hvac_mode, temperature, now: datetime):
+        """Instant à partir duquel la transition est permise, None si elle l'est déjà"""
+        if self.hvac_mode is None:
+            return None
+
+        if hvac_mode == "off":
+            # Arrêt : respecter la durée minimale de marche
+            if self.hvac_mode == "off":
+                return None
+            until = self.on_since + self._min_on
+        elif self.hvac_mode == "off":
+            # Démarrage : respecter la durée minimale d'arrêt
+            until = self.off_since + self._min_off
+        elif same_command(hvac_mode, temperature, self.hvac_mode, self.temperature):
+            return None
+        else:
+            # Changement de consigne ou de mode : respecter la durée de maintien
+            until = self.setpoint_since + self._min_hold
+
+        return None if now >= until else until
@@ -0,0 +1,511 @@
+"""Rejeu d'historiques enregistrés à travers la logique de HA Smart Minisplit
+
+Les entrées enregistrées (température de la pièce et extérieure, présences,
+switches) sont rejouées dans l'ordre à travers la logique réelle d'une zone
+(`SmartMinisplitZone.evaluate`, le noyau `kernel.decide`,
+`_control_minisplit`) sur une horloge virtuelle, sans aucune attente : un
+mois de mesures à la minute se rejoue en quelques secondes. Avec `--noyau`,
+seules les décisions du noyau sont évaluées, d'un bloc, par `kernel_batch`.
+Le rejeu est en
+boucle ouverte : les commandes n'agissent pas sur les températures
+enregistrées ; le thermostat interne du mini-split factice estime la marche
+du compresseur.
+
+Sources acceptées :
+  - CSV ou Parquet « large » : une colonne `instant` et une colonne par entrée
+    (`temperature_piece`, `temperature_exterieure`, `presence_maison`,
+    `presence_piece`, `automation`, `utiliser_presence_piece`, `saison`),
+    une cellule vide signifiant « inchangé » ;
+  - CSV exporté de l'historique (`entity_id,state,last_changed`) ou base du
+    recorder, avec la correspondance des entités donnée en option.
+
+Plusieurs fichiers (une zone chacun) et plusieurs jeux de paramètres sont
+répartis sur un pool de processus :
+
+    python -m custom_components.smart_minisplit.replay salon.csv \\
+        --hysteresis 0.5 1.0 --offset 1 2 --commandes commandes.csv
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import csv
+import itertools
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+
+from homeassistant.components.climate.const import ClimateEntityFeature
+from homeassistant.const import STATE_ON, STATE_OFF
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.util import dt as dt_util
+
+from .const import (
+    DEFAULT_HYSTERESIS,
+    DEFAULT_OFFSET,
+    SEASON_CHAUFFAGE,
+    SEASON_CLIMATISATION,
+    CONF_MINI_SPLIT,
+    CONF_HYSTERESIS,
+    CONF_OFFSET,
+    CONF_TEMP_PIECE,
+    CONF_TEMP_EXT,
+    CONF_PRESENCE_MAISON,
+    CONF_PRESENCE_PIECE,
+    CONF_SCHEDULE,
+    CONF_HOUSE_GRACE,
+    DEFAULT_HOUSE_GRACE,
+    WATCHDOG_INTERVAL,
+)
+from .history import STATES_QUERY, connect, read_rows
+from .models import InputSnapshot
+from .presence import PresenceGrace
+from .simulation import (
+    FakeClimateEntity,
+    SimulatedHass,
+    SimulationReport,
+    VirtualTimers,
+    _comfort_violated,
+)
+from .schedule import WeeklySchedule
+from .zone import SmartMinisplitZone, build_setpoints
+
+# Entrées rejouées : colonnes du format large
+ROLE_AUTOMATION = "automation"
+ROLE_USE_PRESENCE = "utiliser_presence_piece"
+ROLE_SEASON = "saison"
+ROLES = (
+    CONF_TEMP_PIECE,
+    CONF_TEMP_EXT,
+    CONF_PRESENCE_MAISON,
+    CONF_PRESENCE_PIECE,
+    ROLE_AUTOMATION,
+    ROLE_USE_PRESENCE,
+    ROLE_SEASON,
+)
+_TEMPERATURES = (CONF_TEMP_PIECE, CONF_TEMP_EXT)
+
+# Valeurs avant le premier enregistrement d'une entrée
+_INITIAL_INPUTS = {
+    CONF_TEMP_PIECE: None,
+    CONF_TEMP_EXT: None,
+    CONF_PRESENCE_MAISON: STATE_ON,
+    # Pas de détecteur dans la pièce tant que la trace n'en enregistre pas
+    CONF_PRESENCE_PIECE: None,
+    ROLE_AUTOMATION: True,
+    ROLE_USE_PRESENCE: True,
+    ROLE_SEASON: SEASON_CHAUFFAGE,
+}
+
+
+def _parse_instant(text):
+    """Horodatage ISO 8601 ou secondes Unix, en UTC si sans fuseau"""
+    try:
+        return datetime.fromtimestamp(float(text), timezone.utc)
+    except ValueError:
+        instant = datetime.fromisoformat(text.strip().replace("Z", "+00:00"))
+        return instant if instant.tzinfo else instant.replace(tzinfo=timezone.utc)
+
+
+def _parse_value(role, text):
+    """Valeur d'une entrée lue en texte, None si indisponible"""
+    text = str(text).strip()
+    if role in _TEMPERATURES:
+        try:
+            return float(text)
+        except ValueError:
+            return None
+    if role in (ROLE_AUTOMATION, ROLE_USE_PRESENCE):
+        return text.lower() in (STATE_ON, "true", "1")
+    if role == ROLE_SEASON:
+        # Switch de saison : ON = chauffage
+        if text in (SEASON_CHAUFFAGE, SEASON_CLIMATISATION):
+            return text
+        return SEASON_CHAUFFAGE if text.lower() in (STATE_ON, "true", "1") else SEASON_CLIMATISATION
+    return text
+
+
+@dataclass
+class ReplayTrace:
+    """Changements des entrées d'une zone, triés dans le temps"""
+
+    name: str
+    events: list = field(default_factory=list)
+
+    def add(self, instant, role, text):
+        """Ajouter un changement enregistré"""
+        self.events.append((instant, ROLES.index(role), _parse_value(role, text)))
+
+    def sort(self):
+        """Trier les changements (stable : l'ordre du fichier départage)"""
+        self.events.sort(key=lambda event: event[0])
+        return self
+
+    @classmethod
+    def from_rows(cls, name, rows):
+        """Format large : une ligne par instant, une colonne par entrée"""
+        trace = cls(name)
+        for row in rows:
+            instant = _parse_instant(row["instant"])
+            for role in ROLES:
+                value = row.get(role)
+                if value not in (None, ""):
+                    trace.add(instant, role, value)
+        return trace.sort()
+
+    @classmethod
+    def from_history(cls, name, rows, entities):
+        """Export de l'historique : une ligne par changement d'état d'une entité"""
+        trace = cls(name)
+        for row in rows:
+            role = entities.get(row["entity_id"])
+            if role is not None:
+                trace.add(_parse_instant(row["last_changed"]), role, row["state"])
+        return trace.sort()
+
+
+def load_csv(path, entities=None):
+    """Lire un CSV large ou un export d'historique"""
+    with open(path, newline="", encoding="utf-8") as handle:
+        reader = csv.DictReader(handle)
+        if "entity_id" in (reader.fieldnames or []):
+            if not entities:
+                raise ValueError(f"{path} : correspondance des entités requise pour un export d'historique")
+            return ReplayTrace.from_history(str(path), reader, entities)
+        return ReplayTrace.from_rows(str(path), reader)
+
+
+def load_parquet(path):
+    """Lire un fichier Parquet au format large (pandas et pyarrow requis)"""
+    try:
+        import pandas as pd
+    except ImportError as err:
+        raise ValueError(f"pandas est requis pour lire {path} : {err}") from err
+    frame = pd.read_parquet(path)
+    frame["instant"] = frame["instant"].astype(str)
+    rows = (
+        {key: ("" if pd.isna(value) else value) for key, value in row.items()}
+        for row in frame.to_dict("records")
+    )
+    return ReplayTrace.from_rows(str(path), rows)
+
+
+def load_recorder(db_path, entities, start: datetime, end: datetime):
+    """Lire les changements d'état dans la base SQLite du recorder"""
+    trace = ReplayTrace(str(db_path))
+    connection = connect(db_path)
+    try:
+        for entity_id, role in entities.items():
+            rows = read_rows(connection, STATES_QUERY, entity_id, start.timestamp(), end.timestamp())
+            for timestamp, state, _ in rows:
+                trace.add(datetime.fromtimestamp(timestamp, timezone.utc), role, state)
+    finally:
+        connection.close()
+    return trace.sort()
+
+
+def load_trace(path, entities=None):
+    """Lire une trace selon l'extension du fichier"""
+    if str(path).endswith(".parquet"):
+        return load_parquet(path)
+    return load_csv(path, entities)
+
+
+@dataclass
+class ReplayResult:
+    """Commandes qui auraient été envoyées et résumé du rejeu"""
+
+    name: str
+    config: dict
+    report: SimulationReport
+    commands: list
+
+
+async def async_replay(trace: ReplayTrace, config=None, unit=None):
+    """Rejouer une trace avec la logique réelle d'une zone"""
+    config = {CONF_HYSTERESIS: DEFAULT_HYSTERESIS, CONF_OFFSET: DEFAULT_OFFSET, **(config or {})}
+    settings = dict(config)
+    unit = unit or FakeClimateEntity(latency=0.0)
+    config[CONF_MINI_SPLIT] = unit.entity_id
+
+    events = trace.events
+    report = SimulationReport()
+    if not events:
+        return ReplayResult(trace.name, settings, report, [])
+
+    now = events[0][0]
+    hass = SimulatedHass(lambda: now, [unit])
+    zone = SmartMinisplitZone(hass, "replay", None, config)
+    timers = VirtualTimers(lambda: now)
+    released = []
+    zone.call_later = timers.call_later
+    zone.on_cycle_requested = lambda: released.append(now)
+    unit.listener = zone.handle_minisplit_state
+    zone.async_start_schedule(now)
+    house_grace = PresenceGrace(
+        timedelta(minutes=config.get(CONF_HOUSE_GRACE, DEFAULT_HOUSE_GRACE)),
+        timers.call_later,
+        lambda: released.append(now),
+    )
+
+    inputs = list(_INITIAL_INPUTS[role] for role in ROLES)
+    # Instant du dernier changement de chaque entrée
+    changed_at = [now] * len(ROLES)
+    temp_piece_at = None
+    previous = now
+    last_evaluation = None
+    index = 0
+    end = events[-1][0]
+
+    while True:
+        # Intervalle écoulé depuis le réveil précédent, avec l'état qui y était en vigueur
+        hours = (now - previous).total_seconds() / 3600
+        if hours > 0:
+            if unit.running:
+                report.compressor_hours += hours
+                report.energy_kwh += unit.power_kw * hours
+            temp_piece = inputs[0]
+            occupied = inputs[2] == STATE_ON and inputs[3] != STATE_OFF
+            if occupied and temp_piece is not None and _comfort_violated(config, inputs[6], temp_piece):
+                report.comfort_violation_minutes += hours * 60
+            if zone.decision().manual_mode:
+                report.manual_mode_minutes += hours * 60
+        previous = now
+
+        # Changements enregistrés à cet instant
+        changed = False
+        while index < len(events) and events[index][0] <= now:
+            _, role, value = events[index]
+            index += 1
+            if inputs[role] != value:
+                inputs[role] = value
+                changed_at[role] = now
+                changed = True
+                if role == 0:
+                    temp_piece_at = now
+
+        timers.run_due(now)
+        if inputs[0] is not None:
+            unit.regulate(inputs[0])
+
+        if (
+            released
+            or changed
+            or last_evaluation is None
+            or now - last_evaluation >= WATCHDOG_INTERVAL
+        ):
+            released.clear()
+            last_evaluation = now
+            snapshot = InputSnapshot(
+                read_at=now,
+                temp_ext=inputs[1],
+                temp_piece=zone.filter_temperature(temp_piece_at, inputs[0]),
+                temp_piece_raw=inputs[0],
+                presence_maison=house_grace.state(now, inputs[2], changed_at[2]),
+                presence_piece=zone.presence_grace.state(now, inputs[3], changed_at[3]),
+                automation_enabled=inputs[4],
+                use_presence_piece=inputs[5],
+                season=inputs[6],
+                minisplit_mode=unit.hvac_mode,
+                minisplit_target=unit.target_temperature,
+                minisplit_features=int(ClimateEntityFeature.TARGET_TEMPERATURE),
+                minisplit_action=unit.hvac_action,
+            )
+            zone.evaluate(snapshot)
+            try:
+                await zone.async_control(snapshot)
+            except (TimeoutError, HomeAssistantError):
+                report.command_failures += 1
+            report.evaluations += 1
+
+        if now >= end and index >= len(events):
+            break
+
+        # Prochain réveil : changement enregistré, minuteur de la zone ou réévaluation de sécurité
+        wake = [last_evaluation + WATCHDOG_INTERVAL]
+        if index < len(events):
+            wake.append(events[index][0])
+        if timers.next_due is not None:
+            wake.append(timers.next_due)
+        now = min(min(wake), end)
+
+    house_grace.cancel()
+    zone.async_shutdown()
+    report.service_calls = len(unit.calls)
+    for call in unit.calls:
+        report.calls_by_service[call.service] = report.calls_by_service.get(call.service, 0) + 1
+    report.compressor_cycles = unit.cycles
+    report.commands_deferred = zone.commands_deferred
+    return ReplayResult(trace.name, settings, report, unit.calls)
+
+
+def kernel_timeline(trace: ReplayTrace, config=None):
+    """Décisions du noyau à chaque instant de la trace, évaluées d'un bloc avec NumPy
+
+    Ni filtre, ni anticipation, ni délais d'absence, ni protections des
+    commandes (cache, durées minimales) : compte ce que la logique de
+    décision demanderait.
+    """
+    import numpy as np
+
+    from .kernel_batch import MODES, decide_series, setpoint_table
+
+    config = {CONF_HYSTERESIS: DEFAULT_HYSTERESIS, CONF_OFFSET: DEFAULT_OFFSET, **(config or {})}
+
+    # Entrées en vigueur à chaque instant de la trace
+    instants, rows = [], []
+    inputs = list(_INITIAL_INPUTS[role] for role in ROLES)
+    for instant, role, value in trace.events:
+        inputs[role] = value
+        if instants and instants[-1] == instant:
+            rows[-1] = tuple(inputs)
+        else:
+            instants.append(instant)
+            rows.append(tuple(inputs))
+    columns = list(zip(*rows)) if rows else [()] * len(ROLES)
+
+    schedule = WeeklySchedule.parse(config[CONF_SCHEDULE]) if config.get(CONF_SCHEDULE) else None
+    scheduled = [
+        MODES.index(mode) if (mode := schedule.mode_at(dt_util.as_local(instant))) else -1
+        for instant in instants
+    ] if schedule is not None else -1
+
+    decisions = decide_series(
+        config[CONF_HYSTERESIS],
+        config[CONF_OFFSET],
+        setpoint_table(build_setpoints(config)),
+        heating_season=np.array(columns[6], dtype=object) == SEASON_CHAUFFAGE,
+        presence_maison=np.array(columns[2], dtype=object) != STATE_OFF,
+        presence_piece=np.array(columns[3], dtype=object) != STATE_OFF,
+        has_presence_piece=np.array([value is not None for value in columns[3]], dtype=bool),
+        temp_piece=np.array([np.nan if value is None else value for value in columns[0]], dtype=float),
+        temp_ext=np.array([np.nan if value is None else value for value in columns[1]], dtype=float),
+        automation_enabled=np.array(columns[4], dtype=bool),
+        use_presence_piece=np.array(columns[5], dtype=bool),
+        schedule=schedule is not None,
+        scheduled_mode=np.asarray(scheduled),
+    )
+    return instants, decisions
+
+
+def _replay_job(job):
+    """Rejeu dans un processus du pool"""
+    trace, config = job
+    return asyncio.run(async_replay(trace, config))
+
+
+def replay_many(jobs, workers=None):
+    """Rejouer des couples (trace, configuration), en parallèle s'il y en a plusieurs"""
+    if len(jobs) <= 1 or workers == 1:
+        return [_replay_job(job) for job in jobs]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_replay_job, jobs))
+
+
+def write_commands(path, results):
+    """Écrire les commandes de chaque rejeu dans un CSV"""
+    with open(path, "w", newline="", encoding="utf-8") as handle:
+        writer = csv.writer(handle)
+        writer.writerow(["trace", "hysteresis", "offset", "instant", "service", "hvac_mode", "temperature"])
+        for result in results:
+            for call in result.commands:
+                writer.writerow([
+                    result.name,
+                    result.config[CONF_HYSTERESIS],
+                    result.config[CONF_OFFSET],
+                    call.at.isoformat(),
+                    call.service,
+                    call.data.get("hvac_mode", ""),
+                    call.data.get("temperature", ""),
+                ])
+
+
+def print_kernel_timelines(jobs):
+    """Résumer les décisions du noyau pour chaque couple (trace, configuration)"""
+    import numpy as np
+
+    from .kernel_batch import MODES
+
+    print(f"{'trace':<24} {'hyst.':>5} {'offset':>6} {'instants':>8} {'commandes':>9} " + " ".join(f"{mode + ' h':>10}" for mode in MODES))
+    for trace, config in jobs:
+        instants, decisions = kernel_timeline(trace, config)
+        # Chaque décision vaut jusqu'à l'instant suivant
+        seconds = np.array([instant.timestamp() for instant in instants])
+        hours = np.append(np.diff(seconds), 0.0) / 3600
+        by_mode = np.bincount(decisions.mode, weights=hours, minlength=len(MODES))
+        print(
+            f"{trace.name[-24:]:<24} {config[CONF_HYSTERESIS]:>5} {config[CONF_OFFSET]:>6} "
+            f"{len(instants):>8} {int(decisions.command.sum()):>9} " + " ".join(f"{value:>10.1f}" for value in by_mode)
+        )
+
+
+def main():
+    """Point d'entrée en ligne de commande"""
+    parser = argparse.ArgumentParser(description="Rejeu d'historiques Smart Minisplit")
+    parser.add_argument("fichiers", nargs="*", help="traces CSV ou Parquet, une par zone")
+    parser.add_argument("--recorder", help="base SQLite du recorder, à la place des fichiers")
+    parser.add_argument("--jours", type=float, default=30.0, help="durée lue dans le recorder")
+    parser.add_argument("--piece", help="capteur de température de la pièce (export ou recorder)")
+    parser.add_argument("--exterieur", help="capteur de température extérieure")
+    parser.add_argument("--presence-maison")
+    parser.add_argument("--presence-piece")
+    parser.add_argument("--automation", help="switch d'automatisation")
+    parser.add_argument("--saison", help="switch de saison (ON = chauffage)")
+    parser.add_argument("--hysteresis", type=float, nargs="+", default=[DEFAULT_HYSTERESIS])
+    parser.add_argument("--offset", type=float, nargs="+", default=[DEFAULT_OFFSET])
+    parser.add_argument("--processus", type=int, default=None, help="taille du pool (défaut : tous les cœurs)")
+    parser.add_argument("--commandes", help="CSV des commandes qui auraient été envoyées")
+    parser.add_argument(
+        "--noyau", action="store_true",
+        help="décisions du noyau seules, évaluées d'un bloc avec NumPy (sans protections des commandes)",
+    )
+    args = parser.parse_args()
+
+    entities = {
+        entity_id: role
+        for entity_id, role in (
+            (args.piece, CONF_TEMP_PIECE),
+            (args.exterieur, CONF_TEMP_EXT),
+            (args.presence_maison, CONF_PRESENCE_MAISON),
+            (args.presence_piece, CONF_PRESENCE_PIECE),
+            (args.automation, ROLE_AUTOMATION),
+            (args.saison, ROLE_SEASON),
+        )
+        if entity_id
+    }
+    try:
+        if args.recorder:
+            end = datetime.now(timezone.utc)
+            traces = [load_recorder(args.recorder, entities, end - timedelta(days=args.jours), end)]
+        else:
+            traces = [load_trace(path, entities) for path in args.fichiers]
+    except (OSError, ValueError, sqlite3.Error) as err:
+        parser.error(str(err))
+    if not traces:
+        parser.error("aucune trace à rejouer")
+
+    jobs = [
+        (trace, {CONF_HYSTERESIS: hysteresis, CONF_OFFSET: offset})
+        for trace, hysteresis, offset in itertools.product(traces, args.hysteresis, args.offset)
+    ]
+    if args.noyau:
+        print_kernel_timelines(jobs)
+        return
+    results = replay_many(jobs, args.processus)
+
+    print(f"{'trace':<24} {'hyst.':>5} {'offset':>6} {'appels':>6} {'cycles':>6} {'marche h':>8} {'kWh':>7} {'inconfort min':>13}")
+    for result in results:
+        report = result.report
+        print(
+            f"{result.name[-24:]:<24} {result.config[CONF_HYSTERESIS]:>5} {result.config[CONF_OFFSET]:>6} "
+            f"{report.service_calls:>6} {report.compressor_cycles:>6} {report.compressor_hours:>8.1f} "
+            f"{report.energy_kwh:>7.1f} {report.comfort_violation_minutes:>13.0f}"
+        )
+    if args.commandes:
+        write_commands(args.commandes, results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""Programmes horaires hebdomadaires pour HA Smart Minisplit
+
+Un programme s'écrit sous forme de texte, par groupes de jours séparés par
+des points-virgules :
+
+    lun-ven 06:30-08:00 confort, 18:00-22:30 confort; sam,dim 08:00-23:00
+
+Chaque plage `HH:MM-HH:MM` peut être suivie d'un mode (confort, eco ou
+absence, confort par défaut) et peut passer minuit. Le programme est compilé
+une fois en une table triée des changements de mode de la semaine ; trouver
+le mode courant ou le prochain changement est une recherche dichotomique.
+"""
+
+from __future__ import annotations
+
+import bisect
+from datetime import datetime, timedelta
+
+from .const import MODE_ABSENCE, MODE_ECO, MODE_CONFORT
+
+DAYS = ("lun", "mar", "mer", "jeu", "ven", "sam", "dim")
+MINUTES_PER_DAY = 24 * 60
+MINUTES_PER_WEEK = 7 * MINUTES_PER_DAY
+SCHEDULE_MODES = (MODE_CONFORT, MODE_ECO, MODE_ABSENCE)
+
+
+def _parse_days(text):
+    """Jours d'un groupe : `lun-ven`, `sam,dim` ou `tous`"""
+    if text == "tous":
+        return list(range(7))
+    days = []
+    for part in text.split(","):
+        first, _, last = part.partition("-")
+        start = DAYS.index(first)
+        end = DAYS.index(last) if last else start
+        days.extend(day % 7 for day in range(start, end + 1 if end >= start else end + 8))
+    return days
+
+
+def _parse_time(text):
+    """`HH:MM` en minutes depuis minuit"""
+    hours, minutes = text.split(":")
+    hours, minutes = int(hours), int(minutes)
+    if not (0 <= hours <= 24 and 0 <= minutes < 60) or hours * 60 + minutes > MINUTES_PER_DAY:
+        raise ValueError(text)
+    return hours * 60 + minutes
+
+
+class WeeklySchedule:
+    """Programme compilé : changements de mode triés par minute de la semaine"""
+
+    def __init__(self, transitions, constant=None):
+        self._minutes = [minute for minute, _ in transitions]
+        self._modes = [mode for _, mode in transitions]
+        # Mode de toute la semaine quand il n'y a aucun changement
+        self._constant = constant
+
+    @classmethod
+    def parse(cls, text):
+        """Compiler un programme texte, ValueError s'il est invalide"""
+        week = [None] * MINUTES_PER_WEEK
+        for group in filter(None, (group.strip() for group in text.lower().split(";"))):
+            days_text, _, slots_text = group.partition(" ")
+            days = _parse_days(days_text)
+            for slot in filter(None, (slot.strip() for slot in slots_text.split(","))):
+                range_text, _, mode = slot.partition(" ")
+                mode = mode.strip() or MODE_CONFORT
+                if mode not in SCHEDULE_MODES:
+                    raise ValueError(mode)
+                start_text, _, end_text = range_text.partition("-")
+                start, end = _parse_time(start_text), _parse_time(end_text)
+                length = (end - start) % MINUTES_PER_DAY or MINUTES_PER_DAY
+                for day in days:
+                    first = day * MINUTES_PER_DAY + start
+                    for minute in range(first, first + length):
+                        week[minute % MINUTES_PER_WEEK] = mode
+
+        # Ne garder que les minutes où le mode change
+        transitions = [
+            (minute, mode)
+            for minute, mode in enumerate(week)
+            if mode != week[minute - 1]
+        ]
+        return cls(transitions, week[0])
+
+    def _week_minute(self, now: datetime):
+        """Minute de la semaine (lundi 00:00 = 0)"""
+        return now.weekday() * MINUTES_PER_DAY + now.hour * 60 + now.minute
+
+    def mode_at(self, now: datetime):
+        """Mode programmé à l'instant local donné, None hors plage"""
+        if not self._minutes:
+            return self._constant
+        # Avant le premier changement de la semaine : mode du dernier (semaine précédente)
+        index = bisect.bisect_right(self._minutes, self._week_minute(now)) - 1
+        return self._modes[index]
+
+    def next_transition(self, now: datetime):
+        """Instant local du prochain changement de mode, None s'il n'y en a pas"""
+        if not self._minutes:
+            return None
+        minute = self._week_minute(now)
+        index = bisect.bisect_right(self._minutes, minute)
+        target = self._minutes[index] if index < len(self._minutes) else self._minutes[0] + MINUTES_PER_WEEK
+
+        week_start = datetime.combine(
+            (now - timedelta(days=now.weekday())).date(), datetime.min.time()
+        )
+        return (week_start + timedelta(minutes=target)).replace(tzinfo=now.tzinfo)
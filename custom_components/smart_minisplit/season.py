@@ -0,0 +1,139 @@
+"""Choix automatique de la saison pour HA Smart Minisplit
+
+La température extérieure est échantillonnée à intervalle fixe dans un tampon
+circulaire de taille fixe ; la moyenne glissante est tenue à jour à chaque
+échantillon sans reparcourir le tampon. La saison change quand la moyenne
+sort de la bande entre les deux seuils, au plus une fois par durée minimale.
+Les échantillons et le dernier changement sont conservés au redémarrage par
+le switch de saison.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+
+from homeassistant.util import dt as dt_util
+
+from .const import SEASON_CHAUFFAGE, SEASON_CLIMATISATION
+
+# 48 échantillons à 30 minutes : moyenne sur les dernières 24 heures
+SEASON_WINDOW = 48
+SEASON_SAMPLE_INTERVAL = timedelta(minutes=30)
+
+
+class SeasonSelector:
+    """Saison préférée d'après la moyenne glissante de la température extérieure"""
+
+    def __init__(
+        self,
+        heat_below: float,
+        cool_above: float,
+        min_dwell: timedelta,
+        size: int = SEASON_WINDOW,
+        interval: timedelta = SEASON_SAMPLE_INTERVAL,
+    ):
+        self.configure(heat_below, cool_above, min_dwell)
+        self._interval = interval
+
+        # Tampon circulaire et somme courante
+        self._samples = [0.0] * size
+        self._index = 0
+        self._count = 0
+        self._sum = 0.0
+        self._last_sample_at: datetime | None = None
+
+        # Dernier changement de saison automatique
+        self.changed_at: datetime | None = None
+
+    def configure(self, heat_below: float, cool_above: float, min_dwell: timedelta):
+        """Changer les seuils et la durée minimale, en gardant les échantillons"""
+        self._heat_below = heat_below
+        self._cool_above = cool_above
+        self._min_dwell = min_dwell
+
+    @property
+    def mean(self):
+        """Moyenne glissante, None tant que la fenêtre n'est pas pleine"""
+        if self._count < len(self._samples):
+            return None
+        return self._sum / self._count
+
+    def add_sample(self, now: datetime, temperature):
+        """Ajouter une mesure, vrai si elle entre dans la fenêtre"""
+        if temperature is None:
+            return False
+        if self._last_sample_at is not None and now - self._last_sample_at < self._interval:
+            return False
+        self._last_sample_at = now
+        self._push(temperature)
+        return True
+
+    def _push(self, temperature):
+        """Ajouter un échantillon au tampon et tenir la somme à jour"""
+        size = len(self._samples)
+        oldest = self._samples[self._index]
+        self._samples[self._index] = temperature
+        self._index = (self._index + 1) % size
+        if self._count < size:
+            self._count += 1
+            self._sum += temperature
+        elif self._index == 0:
+            # Recalcul complet une fois par tour, pour ne pas accumuler d'erreur d'arrondi
+            self._sum = sum(self._samples)
+        else:
+            self._sum += temperature - oldest
+
+    def _history(self):
+        """Échantillons du plus ancien au plus récent"""
+        if self._count < len(self._samples):
+            return self._samples[:self._count]
+        return self._samples[self._index:] + self._samples[:self._index]
+
+    def as_dict(self):
+        """État conservé au redémarrage"""
+        return {
+            "echantillons": self._history(),
+            "dernier_echantillon": None if self._last_sample_at is None else self._last_sample_at.isoformat(),
+            "changement": None if self.changed_at is None else self.changed_at.isoformat(),
+        }
+
+    def restore(self, data, now: datetime):
+        """Reprendre l'état d'avant le redémarrage, avant les échantillons déjà pris"""
+        last_sample_at = dt_util.parse_datetime(data.get("dernier_echantillon") or "")
+        changed_at = dt_util.parse_datetime(data.get("changement") or "")
+        if changed_at is not None and (self.changed_at is None or changed_at > self.changed_at):
+            self.changed_at = changed_at
+
+        # Échantillons trop anciens pour la fenêtre : repartir de ceux d'après le redémarrage
+        window = self._interval * len(self._samples)
+        if last_sample_at is None or now - last_sample_at > window:
+            return
+        samples = [float(value) for value in data.get("echantillons", [])] + self._history()
+        self._samples = [0.0] * len(self._samples)
+        self._index = self._count = 0
+        self._sum = 0.0
+        for temperature in samples[-len(self._samples):]:
+            self._push(temperature)
+        if self._last_sample_at is None:
+            self._last_sample_at = last_sample_at
+
+    def preferred(self):
+        """Saison indiquée par la moyenne, None dans la bande entre les seuils"""
+        mean = self.mean
+        if mean is None:
+            return None
+        if mean < self._heat_below:
+            return SEASON_CHAUFFAGE
+        if mean > self._cool_above:
+            return SEASON_CLIMATISATION
+        return None
+
+    def select(self, now: datetime, current):
+        """Saison à appliquer, la saison courante tant que la durée minimale n'est pas écoulée"""
+        preferred = self.preferred()
+        if preferred is None or preferred == current:
+            return current
+        if self.changed_at is not None and now - self.changed_at < self._min_dwell:
+            return current
+        self.changed_at = now
+        return preferred
@@ -1,40 +1,68 @@
 """Capteur de statut pour HA Smart Minisplit"""
 
 import logging
-from homeassistant.components.sensor import SensorEntity
-from homeassistant.const import STATE_ON, STATE_OFF
+from typing import NamedTuple
+
+from homeassistant.components.sensor import (
+    RestoreSensor,
+    SensorDeviceClass,
+    SensorEntity,
+    SensorStateClass,
+)
+from homeassistant.const import STATE_OFF, EntityCategory, UnitOfEnergy, UnitOfTime
+from homeassistant.core import callback
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
 
 from .const import (
     DOMAIN,
     MODE_ABSENCE,
     MODE_ECO,
-    MODE_CONFORT,
     SEASON_CHAUFFAGE,
-    SEASON_CLIMATISATION,
-    CONF_TEMP_EXT,
-    CONF_TEMP_PIECE,
-    CONF_PRESENCE_PIECE,
-    CONF_PRESENCE_MAISON,
+    CONF_DIAGNOSTIC_SENSORS,
+    DEFAULT_DIAGNOSTIC_SENSORS,
 )
+from .metrics import latency_summary
 
 _LOGGER = logging.getLogger(__name__)
 
+# Aucun statut encore calculé
+_UNSET = object()
+
 async def async_setup_entry(hass, config_entry, async_add_entities):
     """Configuration du capteur de statut"""
-    config = config_entry.data
-    async_add_entities([SmartMinisplitStatusSensor(hass, config, config_entry.entry_id)], True)
+    entry_data = hass.data[DOMAIN][config_entry.entry_id]
+    coordinator = entry_data["coordinator"]
+    entities = [SmartMinisplitStatusSensor(coordinator, zone) for zone in coordinator.zones]
+
+    # Durées et énergie cumulées de chaque zone
+    entities += [
+        SmartMinisplitEnergySensor(coordinator, zone, *description)
+        for zone in coordinator.zones
+        for description in ENERGY_SENSORS
+    ]
+
+    # Capteurs de diagnostic optionnels
+    if entry_data["config"].get(CONF_DIAGNOSTIC_SENSORS, DEFAULT_DIAGNOSTIC_SENSORS):
+        entities += [
+            SmartMinisplitDiagnosticSensor(coordinator, zone, *description)
+            for zone in coordinator.zones
+            for description in DIAGNOSTIC_SENSORS
+        ]
 
-class SmartMinisplitStatusSensor(SensorEntity):
+    async_add_entities(entities)
+
+class SmartMinisplitStatusSensor(CoordinatorEntity, SensorEntity):
     """Capteur de statut détaillé pour Smart Minisplit"""
 
-    def __init__(self, hass, config, entry_id):
-        self.hass = hass
-        self._config = config
-        self._entry_id = entry_id
-        self._attr_name = "Smart Minisplit Status"
-        self._attr_unique_id = f"{DOMAIN}_{entry_id}_status"
+    def __init__(self, coordinator, zone):
+        super().__init__(coordinator)
+        self._zone = zone
+        self._attr_name = zone.entity_name("Status")
+        self._attr_unique_id = zone.unique_id("status")
         self._state = "Initialisation"
         self._attributes = {}
+        self._status_key = _UNSET
+        self._update_from_data()
 
     @property
     def state(self):
@@ -51,106 +79,234 @@ class SmartMinisplitStatusSensor(SensorEntity):
         """Attributs supplémentaires"""
         return self._attributes
 
-    async def async_update(self):
-        """Mise à jour du statut"""
-        # Récupérer l'entité climate pour obtenir les informations
-        climate_entity_id = f"climate.{DOMAIN}_{self._entry_id}_climate"
-        climate_entity = self.hass.states.get(climate_entity_id)
-        
-        if not climate_entity:
-            self._state = "Contrôleur non disponible"
+    @callback
+    def _handle_coordinator_update(self):
+        """Nouvelle décision publiée par le coordinateur"""
+        if self._update_from_data():
+            self.async_write_ha_state()
+
+    def _update_from_data(self):
+        """Mettre à jour le statut, vrai si l'état publié change"""
+        data = (self.coordinator.data or {}).get(self._zone.zone_id)
+        inputs = None if data is None else _status_inputs(data)
+
+        # Mêmes entrées : même texte, rien à formater ni à écrire
+        key = (self.available, inputs)
+        if key == self._status_key:
+            return False
+        available_changed = self._status_key is _UNSET or key[0] != self._status_key[0]
+        self._status_key = key
+
+        state, attributes = _render_status(inputs)
+        if state == self._state and attributes == self._attributes and not available_changed:
+            return False
+
+        self._state = state
+        self._attributes = attributes
+        return True
+
+
+class StatusInputs(NamedTuple):
+    """Entrées compactes dont dépend le texte de statut"""
+
+    automation_active: bool
+    manual_mode: bool
+    mode_actuel: str
+    target_temp: float | None
+    last_action: str
+    season: str
+    use_presence_piece: bool
+    maison_vide: bool
+    piece_vide: bool
+    temp_ext: float | None
+    temp_piece: float | None
+
+
+def _status_inputs(data):
+    """Extraire les entrées du statut à partir de la décision du cycle"""
+    snapshot = data.snapshot
+    decision = data.decision
+    return StatusInputs(
+        automation_active=snapshot.automation_enabled,
+        manual_mode=decision.manual_mode,
+        mode_actuel=decision.mode_actuel,
+        target_temp=decision.target_temperature,
+        last_action=decision.last_action,
+        season=snapshot.season,
+        use_presence_piece=snapshot.use_presence_piece,
+        # Mêmes règles de présence que la décision
+        maison_vide=snapshot.presence_maison == STATE_OFF,
+        piece_vide=snapshot.presence_piece == STATE_OFF,
+        # Arrondies à l'affichage : le bruit du capteur ne change pas le texte
+        temp_ext=None if snapshot.temp_ext is None else round(snapshot.temp_ext, 1),
+        temp_piece=None if snapshot.temp_piece is None else round(snapshot.temp_piece, 1),
+    )
+
+
+def _render_status(inputs):
+    """Construire le texte de statut et ses attributs"""
+    if inputs is None:
+        return "Contrôleur non disponible", {}
+
+    manual_mode = inputs.manual_mode
+    mode_actuel = inputs.mode_actuel
+    target_temp = inputs.target_temp
+    last_action = inputs.last_action
+
+    season_mode = "Chauffage" if inputs.season == SEASON_CHAUFFAGE else "Climatisation"
+    temp_ext = "N/A" if inputs.temp_ext is None else f"{inputs.temp_ext:.1f}°C"
+    temp_piece = "N/A" if inputs.temp_piece is None else f"{inputs.temp_piece:.1f}°C"
+    presence_maison = "Vide" if inputs.maison_vide else "Présente"
+    presence_piece = "Vide" if inputs.piece_vide else "Présente"
+
+    # Construire le message de statut détaillé
+    if not inputs.automation_active:
+        state = "⏸️ GESTION AUTOMATIQUE DÉSACTIVÉE - Le mini-split n'est pas contrôlé automatiquement"
+        attributes = {
+            "automation": "Désactivée",
+            "action": "Aucune - Contrôle manuel uniquement",
+        }
+    elif manual_mode:
+        state = f"🖐️ MODE MANUEL ACTIF - Dernière action: {last_action}"
+        attributes = {
+            "automation": "Active (en pause)",
+            "mode_manuel": "Actif",
+            "raison": "L'utilisateur a modifié manuellement le mini-split",
+            "note": "Le mode manuel se désactivera automatiquement quand la maison sera vide",
+        }
+    else:
+        # Construire le message selon le contexte
+        if presence_maison == "Vide":
+            state = f"🏠 MAISON VIDE - Mini-split arrêté pour économie d'énergie"
+            raison = "Personne n'est à la maison"
+        elif inputs.temp_piece is None:
+            state = "⚠️ SÉCURITÉ - Aucune température de pièce récente, commande maintenue"
+            raison = "Capteurs de température de la pièce indisponibles ou sans mesure récente"
+        elif mode_actuel == MODE_ABSENCE:
+            state = f"💤 MODE ABSENCE - Mini-split arrêté"
+            raison = "Mode absence activé"
+        elif mode_actuel == MODE_ECO:
+            consigne = f"{target_temp}°C" if target_temp else "N/A"
+            state = f"🌱 MODE ECO - {season_mode} à {consigne} (pièce vide)"
+            raison = f"Pièce vide détectée, passage en mode économique"
+        else:  # MODE_CONFORT
+            consigne = f"{target_temp}°C" if target_temp else "N/A"
+            state = f"🏡 MODE CONFORT - {season_mode} à {consigne} (pièce occupée)"
+            raison = f"Présence détectée dans la pièce, confort maximal"
+
+        attributes = {
+            "automation": "Active",
+            "mode_actuel": mode_actuel.upper(),
+            "saison": season_mode,
+            "temperature_exterieure": temp_ext,
+            "temperature_piece": temp_piece,
+            "consigne_actuelle": f"{target_temp}°C" if target_temp else "N/A",
+            "presence_maison": presence_maison,
+            "presence_piece": presence_piece,
+            "utilise_presence_piece": "Oui" if inputs.use_presence_piece else "Non",
+            "derniere_action": last_action,
+            "raison": raison,
+        }
+
+    # Ajouter des informations générales
+    attributes["mode_manuel"] = "Actif" if manual_mode else "Inactif"
+    return state, attributes
+
+
+# (clé, nom, unité, classe d'état, valeur lue sur la zone)
+DIAGNOSTIC_SENSORS = (
+    (
+        "latence_cycle",
+        "Latence cycle p95",
+        UnitOfTime.MILLISECONDS,
+        SensorStateClass.MEASUREMENT,
+        lambda zone: latency_summary(zone.metrics.cycle_latencies)["p95_ms"],
+    ),
+    (
+        "latence_commande",
+        "Latence commande p95",
+        UnitOfTime.MILLISECONDS,
+        SensorStateClass.MEASUREMENT,
+        lambda zone: zone.metrics.service_summary()["p95_ms"],
+    ),
+    (
+        "commandes_envoyees",
+        "Commandes envoyées",
+        None,
+        SensorStateClass.TOTAL_INCREASING,
+        lambda zone: zone.command_stats["commandes_envoyees"],
+    ),
+    (
+        "cycles_sans_commande",
+        "Cycles sans commande",
+        None,
+        SensorStateClass.TOTAL_INCREASING,
+        lambda zone: zone.metrics.cycles_skipped,
+    ),
+)
+
+
+class SmartMinisplitDiagnosticSensor(CoordinatorEntity, SensorEntity):
+    """Mesure numérique de la boucle de contrôle d'une zone"""
+
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+
+    def __init__(self, coordinator, zone, key, name, unit, state_class, value):
+        super().__init__(coordinator)
+        self._zone = zone
+        self._value = value
+        self._attr_name = zone.entity_name(name)
+        self._attr_unique_id = zone.unique_id(key)
+        self._attr_native_unit_of_measurement = unit
+        self._attr_state_class = state_class
+        if unit is not None:
+            self._attr_device_class = SensorDeviceClass.DURATION
+
+    @property
+    def native_value(self):
+        """Valeur mesurée depuis le démarrage"""
+        return self._value(self._zone)
+
+
+# (clé du total, nom, unité, classe d'appareil, icône)
+ENERGY_SENSORS = (
+    ("duree_compresseur", "Durée compresseur", UnitOfTime.HOURS, SensorDeviceClass.DURATION, "mdi:heat-pump-outline"),
+    ("duree_confort", "Durée confort", UnitOfTime.HOURS, SensorDeviceClass.DURATION, "mdi:sofa-outline"),
+    ("duree_eco", "Durée eco", UnitOfTime.HOURS, SensorDeviceClass.DURATION, "mdi:leaf"),
+    ("duree_absence", "Durée absence", UnitOfTime.HOURS, SensorDeviceClass.DURATION, "mdi:home-export-outline"),
+    ("duree_repli", "Durée repli", UnitOfTime.HOURS, SensorDeviceClass.DURATION, "mdi:thermometer-chevron-down"),
+    ("energie", "Énergie", UnitOfEnergy.KILO_WATT_HOUR, SensorDeviceClass.ENERGY, "mdi:lightning-bolt"),
+)
+
+
+class SmartMinisplitEnergySensor(CoordinatorEntity, RestoreSensor):
+    """Total cumulé d'une zone, conservé au redémarrage pour les statistiques"""
+
+    _attr_state_class = SensorStateClass.TOTAL_INCREASING
+    _attr_suggested_display_precision = 2
+
+    def __init__(self, coordinator, zone, key, name, unit, device_class, icon):
+        super().__init__(coordinator)
+        self._zone = zone
+        self._key = key
+        self._attr_name = zone.entity_name(name)
+        self._attr_unique_id = zone.unique_id(key)
+        self._attr_native_unit_of_measurement = unit
+        self._attr_device_class = device_class
+        self._attr_icon = icon
+
+    async def async_added_to_hass(self):
+        """Reprendre le total publié avant le redémarrage"""
+        await super().async_added_to_hass()
+        last_data = await self.async_get_last_sensor_data()
+        if last_data is None or last_data.native_value is None:
             return
+        try:
+            self._zone.energy.restore(self._key, float(last_data.native_value))
+        except (ValueError, TypeError):
+            _LOGGER.warning(f"[{self._zone.name}] Total {self._key} enregistré illisible, repart de zéro")
 
-        # Récupérer les attributs du climate
-        attrs = climate_entity.attributes
-        automation_enabled = attrs.get("automation_active", False)
-        manual_mode = attrs.get("mode_manuel", False)
-        mode_actuel = attrs.get("mode_actuel", MODE_ABSENCE)
-        saison = attrs.get("saison", SEASON_CHAUFFAGE)
-        target_temp = attrs.get("temperature")
-        current_temp = climate_entity.state
-        last_action = attrs.get("derniere_action", "Aucune action")
-        
-        # Récupérer les états des switches
-        automation_switch = self.hass.states.get(f"switch.{DOMAIN}_automation")
-        presence_piece_switch = self.hass.states.get(f"switch.{DOMAIN}_use_presence_piece")
-        season_switch = self.hass.states.get(f"switch.{DOMAIN}_season")
-        
-        automation_active = automation_switch.state == STATE_ON if automation_switch else False
-        use_presence_piece = presence_piece_switch.state == STATE_ON if presence_piece_switch else False
-        season_mode = "Chauffage" if (season_switch and season_switch.state == STATE_ON) else "Climatisation"
-        
-        # Récupérer les températures
-        temp_ext_entity = self.hass.states.get(self._config.get(CONF_TEMP_EXT))
-        temp_piece_entity = self.hass.states.get(self._config.get(CONF_TEMP_PIECE))
-        
-        temp_ext = "N/A"
-        temp_piece = "N/A"
-        
-        if temp_ext_entity:
-            try:
-                temp_ext = f"{float(temp_ext_entity.state):.1f}°C"
-            except (ValueError, TypeError):
-                pass
-                
-        if temp_piece_entity:
-            try:
-                temp_piece = f"{float(temp_piece_entity.state):.1f}°C"
-            except (ValueError, TypeError):
-                pass
-        
-        # Récupérer les états de présence
-        presence_maison_entity = self.hass.states.get(self._config.get(CONF_PRESENCE_MAISON))
-        presence_piece_entity = self.hass.states.get(self._config.get(CONF_PRESENCE_PIECE))
-        
-        presence_maison = "Présente" if (presence_maison_entity is None or presence_maison_entity.state == STATE_ON) else "Vide"
-        presence_piece = "Présente" if (presence_piece_entity is None or presence_piece_entity.state == STATE_ON) else "Vide"
-        
-        # Construire le message de statut détaillé
-        if not automation_active:
-            self._state = "⏸️ GESTION AUTOMATIQUE DÉSACTIVÉE - Le mini-split n'est pas contrôlé automatiquement"
-            self._attributes = {
-                "automation": "Désactivée",
-                "action": "Aucune - Contrôle manuel uniquement",
-            }
-        elif manual_mode:
-            self._state = f"🖐️ MODE MANUEL ACTIF - Dernière action: {last_action}"
-            self._attributes = {
-                "automation": "Active (en pause)",
-                "mode_manuel": "Actif",
-                "raison": "L'utilisateur a modifié manuellement le mini-split",
-                "note": "Le mode manuel se désactivera automatiquement quand la maison sera vide",
-            }
-        else:
-            # Construire le message selon le contexte
-            if presence_maison == "Vide":
-                self._state = f"🏠 MAISON VIDE - Mini-split arrêté pour économie d'énergie"
-                raison = "Personne n'est à la maison"
-            elif mode_actuel == MODE_ABSENCE:
-                self._state = f"💤 MODE ABSENCE - Mini-split arrêté"
-                raison = "Mode absence activé"
-            elif mode_actuel == MODE_ECO:
-                consigne = f"{target_temp}°C" if target_temp else "N/A"
-                self._state = f"🌱 MODE ECO - {season_mode} à {consigne} (pièce vide)"
-                raison = f"Pièce vide détectée, passage en mode économique"
-            else:  # MODE_CONFORT
-                consigne = f"{target_temp}°C" if target_temp else "N/A"
-                self._state = f"🏡 MODE CONFORT - {season_mode} à {consigne} (pièce occupée)"
-                raison = f"Présence détectée dans la pièce, confort maximal"
-            
-            self._attributes = {
-                "automation": "Active",
-                "mode_actuel": mode_actuel.upper(),
-                "saison": season_mode,
-                "temperature_exterieure": temp_ext,
-                "temperature_piece": temp_piece,
-                "consigne_actuelle": f"{target_temp}°C" if target_temp else "N/A",
-                "presence_maison": presence_maison,
-                "presence_piece": presence_piece,
-                "utilise_presence_piece": "Oui" if use_presence_piece else "Non",
-                "derniere_action": last_action,
-                "raison": raison,
-            }
-        
-        # Ajouter des informations générales
-        self._attributes["mode_manuel"] = "Actif" if manual_mode else "Inactif"
+    @property
+    def native_value(self):
+        """Total cumulé jusqu'au dernier cycle ou changement d'état"""
+        return round(self._zone.energy.totals[self._key], 4)
@@ -0,0 +1,259 @@
+"""Services pour HA Smart Minisplit"""
+
+from __future__ import annotations
+
+import logging
+from datetime import timedelta
+
+import voluptuous as vol
+from homeassistant.core import HomeAssistant, ServiceCall, SupportsResponse
+from homeassistant.data_entry_flow import FlowResultType
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers import config_validation as cv
+from homeassistant.helpers.storage import Store
+from homeassistant.util import dt as dt_util, slugify
+
+from .const import (
+    DOMAIN,
+    CONF_HYSTERESIS,
+    CONF_OFFSET,
+    CONF_TEMP_PIECE,
+    CONF_TEMP_EXT,
+    CONF_PRESENCE_MAISON,
+    CONF_PRESENCE_PIECE,
+    CONF_ZONES,
+    CONF_ZONE_NAME,
+)
+from .config_flow import zone_field
+from .coordinator import zone_configs
+from .thermal import ThermalModel
+
+_LOGGER = logging.getLogger(__name__)
+
+SERVICE_FIT_THERMAL_MODEL = "fit_thermal_model"
+SERVICE_TUNE_PARAMETERS = "tune_parameters"
+
+ATTR_ENTRY_ID = "entry_id"
+ATTR_DAYS = "days"
+ATTR_STEP = "step"
+ATTR_APPLY = "apply"
+
+STORAGE_VERSION = 1
+STORAGE_KEY = f"{DOMAIN}.thermal_models"
+
+FIT_THERMAL_MODEL_SCHEMA = vol.Schema({
+    vol.Optional(ATTR_ENTRY_ID): cv.string,
+    vol.Optional(ATTR_DAYS, default=365): vol.All(vol.Coerce(int), vol.Range(min=1, max=730)),
+    vol.Optional(ATTR_STEP, default=300): vol.All(vol.Coerce(int), vol.Range(min=60, max=3600)),
+})
+
+TUNE_PARAMETERS_SCHEMA = vol.Schema({
+    vol.Optional(ATTR_ENTRY_ID): cv.string,
+    vol.Optional(ATTR_DAYS, default=7): vol.All(vol.Coerce(int), vol.Range(min=1, max=60)),
+    vol.Optional(ATTR_APPLY, default=False): cv.boolean,
+})
+
+
+def _store(hass):
+    """Stockage des paramètres thermiques ajustés"""
+    return Store(hass, STORAGE_VERSION, STORAGE_KEY)
+
+
+async def async_load_thermal_models(hass: HomeAssistant, entry_id, coordinator):
+    """Initialiser les modèles des zones avec les paramètres enregistrés"""
+    stored = await _store(hass).async_load() or {}
+    for zone in coordinator.zones:
+        fitted = stored.get(entry_id, {}).get(zone.storage_key)
+        if fitted:
+            zone.thermal_model = ThermalModel.from_fit(fitted["theta"], fitted["samples"])
+            _LOGGER.debug(f"[{zone.name}] Modèle thermique chargé : {zone.thermal_model.as_dict()}")
+
+
+def _recorder_db_path(hass):
+    """Chemin de la base SQLite du recorder"""
+    from homeassistant.components.recorder import get_instance
+
+    db_url = get_instance(hass).db_url
+    if not db_url.startswith("sqlite:///"):
+        raise HomeAssistantError("Seule la base SQLite du recorder est prise en charge")
+    return db_url[len("sqlite:///"):]
+
+
+async def _async_fit_thermal_model(hass: HomeAssistant, call: ServiceCall):
+    """Ajuster les modèles thermiques sur l'historique du recorder"""
+    try:
+        from .fitting import fit_zone
+    except ImportError as err:
+        raise HomeAssistantError(f"NumPy est requis pour l'ajustement : {err}") from err
+
+    entries = hass.data.get(DOMAIN, {})
+    entry_ids = [call.data[ATTR_ENTRY_ID]] if ATTR_ENTRY_ID in call.data else list(entries)
+    db_path = _recorder_db_path(hass)
+
+    end = dt_util.utcnow()
+    start = end - timedelta(days=call.data[ATTR_DAYS])
+
+    store = _store(hass)
+    stored = await store.async_load() or {}
+    results = {}
+
+    for entry_id in entry_ids:
+        if entry_id not in entries:
+            raise HomeAssistantError(f"Entrée inconnue : {entry_id}")
+        coordinator = entries[entry_id]["coordinator"]
+
+        for zone in coordinator.zones:
+            fit = await hass.async_add_executor_job(
+                fit_zone,
+                db_path,
+                zone.temp_piece_entity,
+                coordinator.temp_ext_entity,
+                zone.mini_split_entity,
+                start.timestamp(),
+                end.timestamp(),
+                call.data[ATTR_STEP],
+            )
+            if fit is None:
+                _LOGGER.warning(f"[{zone.name}] Historique insuffisant pour ajuster le modèle thermique")
+                continue
+
+            zone.thermal_model = ThermalModel.from_fit(fit.theta, fit.samples)
+            stored.setdefault(entry_id, {})[zone.storage_key] = fit.as_dict()
+            results.setdefault(entry_id, {})[zone.storage_key] = fit.as_dict()
+            _LOGGER.info(f"[{zone.name}] Modèle thermique ajusté sur {fit.samples} échantillons")
+
+    await store.async_save(stored)
+    return results
+
+
+def _tune_zones(db_path, zones, start, end, season):
+    """Régler les zones d'une entrée, dans l'exécuteur avec un seul pool plafonné"""
+    # Imports lourds (NumPy, multiprocessing) hors de la boucle d'événements
+    from .replay import load_recorder
+    from .simulation import RoomModel
+    from .tuning import room_from_model, scenario_from_trace, service_workers, tune, tuning_pool
+
+    results = {}
+    with tuning_pool(service_workers()) as pool:
+        for zone_id, name, model, entities, config in zones:
+            # Extérieur et présences réels, pièce simulée avec le modèle thermique de la zone
+            trace = load_recorder(db_path, entities, start, end)
+            room = room_from_model(model)
+            if room is None:
+                _LOGGER.warning(f"[{name}] Modèle thermique pas encore appris, pièce simulée par défaut")
+            try:
+                scenario = scenario_from_trace(trace, room or RoomModel(), season)
+            except ValueError as err:
+                _LOGGER.warning(f"[{name}] Réglage impossible : {err}")
+                continue
+            results[zone_id] = (tune(scenario, config, pool=pool), room is not None)
+    return results
+
+
+async def _async_apply_tuning(hass: HomeAssistant, entry_id, config, recommendations):
+    """Soumettre le réglage au formulaire d'options, comme depuis l'interface"""
+    manager = hass.config_entries.options
+    result = await manager.async_init(entry_id)
+
+    # Les champs non fournis gardent leur valeur actuelle (défauts du formulaire)
+    main = recommendations.get(None)
+    user_input = {} if main is None else {CONF_HYSTERESIS: main.hysteresis, CONF_OFFSET: main.offset}
+    result = await manager.async_configure(result["flow_id"], user_input)
+
+    if result["type"] == FlowResultType.FORM and result["step_id"] == "zones":
+        zone_input = {}
+        for zone_config in config.get(CONF_ZONES, []):
+            name = zone_config[CONF_ZONE_NAME]
+            best = recommendations.get(slugify(name))
+            if best is not None:
+                zone_input[zone_field(name, CONF_HYSTERESIS)] = best.hysteresis
+                zone_input[zone_field(name, CONF_OFFSET)] = best.offset
+        result = await manager.async_configure(result["flow_id"], zone_input)
+
+    if result["type"] != FlowResultType.CREATE_ENTRY:
+        manager.async_abort(result["flow_id"])
+        raise HomeAssistantError(f"Réglage refusé par le formulaire d'options : {result.get('errors')}")
+
+
+async def _async_tune_parameters(hass: HomeAssistant, call: ServiceCall):
+    """Rechercher l'hystérésis et l'offset de chaque zone par simulation"""
+    entries = hass.data.get(DOMAIN, {})
+    entry_ids = [call.data[ATTR_ENTRY_ID]] if ATTR_ENTRY_ID in call.data else list(entries)
+    db_path = _recorder_db_path(hass)
+
+    end = dt_util.utcnow()
+    start = end - timedelta(days=call.data[ATTR_DAYS])
+    results = {}
+
+    for entry_id in entry_ids:
+        if entry_id not in entries:
+            raise HomeAssistantError(f"Entrée inconnue : {entry_id}")
+        coordinator = entries[entry_id]["coordinator"]
+        config = entries[entry_id]["config"]
+        configs = zone_configs(config)
+        recommendations = {}
+
+        zones = []
+        for zone in coordinator.zones:
+            roles = {
+                coordinator.temp_ext_entity: CONF_TEMP_EXT,
+                config.get(CONF_PRESENCE_MAISON): CONF_PRESENCE_MAISON,
+                zone.presence_piece_entity: CONF_PRESENCE_PIECE,
+                zone.temp_piece_entity: CONF_TEMP_PIECE,
+            }
+            entities = {entity_id: role for entity_id, role in roles.items() if entity_id}
+            zones.append((zone.zone_id, zone.name, zone.thermal_model, entities, configs[zone.zone_id]))
+
+        try:
+            tuned = await hass.async_add_executor_job(
+                _tune_zones, db_path, zones, start, end, coordinator.runtime.season
+            )
+        except ImportError as err:
+            raise HomeAssistantError(f"NumPy est requis pour le réglage : {err}") from err
+
+        for zone in coordinator.zones:
+            if zone.zone_id not in tuned:
+                continue
+            ranked, modelled = tuned[zone.zone_id]
+            best = ranked[0]
+            recommendations[zone.zone_id] = best
+            results.setdefault(entry_id, {})[zone.storage_key] = {
+                **best.as_dict(),
+                "actuel": {CONF_HYSTERESIS: zone.hysteresis, CONF_OFFSET: zone.offset},
+                "modele_thermique": modelled,
+            }
+            _LOGGER.info(
+                f"[{zone.name}] Réglage recommandé : hystérésis {best.hysteresis}, offset {best.offset} "
+                f"({len(ranked)} candidats simulés)"
+            )
+
+        if call.data[ATTR_APPLY] and recommendations:
+            # Par le formulaire d'options : visible et modifiable ensuite, appliqué sans rechargement
+            await _async_apply_tuning(hass, entry_id, config, recommendations)
+
+    return results
+
+
+def async_setup_services(hass: HomeAssistant):
+    """Enregistrer les services de l'intégration"""
+
+    async def _handle_fit(call: ServiceCall):
+        return await _async_fit_thermal_model(hass, call)
+
+    async def _handle_tune(call: ServiceCall):
+        return await _async_tune_parameters(hass, call)
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_FIT_THERMAL_MODEL,
+        _handle_fit,
+        schema=FIT_THERMAL_MODEL_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_TUNE_PARAMETERS,
+        _handle_tune,
+        schema=TUNE_PARAMETERS_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
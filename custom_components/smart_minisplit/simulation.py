@@ -0,0 +1,481 @@
+"""Simulation d'une pièce pour évaluer la boucle de contrôle de HA Smart Minisplit
+
+La logique réelle d'une zone (`SmartMinisplitZone.evaluate`, le noyau
+`kernel.decide`, `_control_minisplit`) est exécutée contre
+une pièce simulée et un mini-split factice, sur une horloge virtuelle :
+une journée se simule en une fraction de seconde et deux exécutions avec
+les mêmes paramètres donnent le même résultat.
+
+    python -m custom_components.smart_minisplit.simulation --jours 1
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import bisect
+import heapq
+import math
+import random
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+
+from homeassistant.components.climate.const import ClimateEntityFeature
+from homeassistant.const import STATE_ON, STATE_OFF
+from homeassistant.core import State
+from homeassistant.exceptions import HomeAssistantError
+
+from .const import (
+    DEFAULT_CONSIGNES,
+    DEFAULT_HYSTERESIS,
+    DEFAULT_OFFSET,
+    SEASON_CHAUFFAGE,
+    CONF_MINI_SPLIT,
+    CONF_HYSTERESIS,
+    CONF_OFFSET,
+    CONF_TEMP_FILTER,
+    CONF_FILTER_WINDOW,
+    DEFAULT_TEMP_FILTER,
+    DEFAULT_FILTER_WINDOW,
+    CONF_CONSIGNE_CONFORT_CHAUFFAGE,
+    CONF_CONSIGNE_CONFORT_CLIMATISATION,
+    CONF_ROOM_GRACE,
+    CONF_HOUSE_GRACE,
+    CONF_SCHEDULE,
+    DEFAULT_ROOM_GRACE,
+    DEFAULT_HOUSE_GRACE,
+    WATCHDOG_INTERVAL,
+)
+from .filters import FILTERS
+from .models import InputSnapshot
+from .presence import PresenceGrace
+from .zone import SmartMinisplitZone
+
+SIMULATED_ENTITY = "climate.mini_split_simule"
+
+
+class Trace:
+    """Série temporelle scriptée : points (heures depuis le début, valeur)"""
+
+    def __init__(self, points, interpolate=False):
+        self._hours = [hours for hours, _ in points]
+        self._values = [value for _, value in points]
+        self._interpolate = interpolate
+
+    def value_at(self, hours):
+        """Valeur à l'instant donné (maintenue ou interpolée)"""
+        index = bisect.bisect_right(self._hours, hours) - 1
+        if index < 0:
+            return self._values[0]
+        if not self._interpolate or index + 1 >= len(self._hours):
+            return self._values[index]
+        h0, h1 = self._hours[index], self._hours[index + 1]
+        v0, v1 = self._values[index], self._values[index + 1]
+        return v0 + (v1 - v0) * (hours - h0) / (h1 - h0)
+
+
+@dataclass
+class RoomModel:
+    """Pièce du premier ordre, mêmes équations que `thermal.ThermalModel`"""
+
+    temperature: float = 19.0
+    a: float = 0.15
+    b_chauffe: float = 6.0
+    b_clim: float = 5.0
+    c: float = 0.2
+
+    def step(self, hours, t_ext, heating, cooling):
+        """Avancer la température de `hours` heures (intégration exacte)"""
+        forcing = self.a * t_ext + self.b_chauffe * heating - self.b_clim * cooling + self.c
+        equilibrium = forcing / self.a
+        self.temperature = equilibrium + (self.temperature - equilibrium) * math.exp(-self.a * hours)
+
+
+@dataclass
+class ServiceCallRecord:
+    """Appel de service reçu par le mini-split factice"""
+
+    at: datetime
+    service: str
+    data: dict
+    latency: float
+
+
+class FakeClimateEntity:
+    """Mini-split factice : enregistre les appels et régule sur sa consigne"""
+
+    def __init__(self, entity_id=SIMULATED_ENTITY, latency=0.5, deadband=0.3, power_kw=0.9):
+        self.entity_id = entity_id
+        self.latency = latency
+        self.deadband = deadband
+        self.power_kw = power_kw
+        self.hvac_mode = "off"
+        self.target_temperature = None
+        self.running = False
+        self.cycles = 0
+        self.calls: list[ServiceCallRecord] = []
+        self.context = None
+        self.previous_state = None
+        self.listener = None
+
+    def handle(self, now, service, data, context=None):
+        """Appliquer set_hvac_mode / set_temperature"""
+        self.calls.append(ServiceCallRecord(now, service, dict(data), self.latency))
+        self.context = context
+        if "hvac_mode" in data:
+            self.hvac_mode = data["hvac_mode"]
+        if "temperature" in data:
+            self.target_temperature = data["temperature"]
+        self._publish(now)
+
+    def _publish(self, now):
+        """Notifier le nouvel état, comme un événement state_changed"""
+        state = self.state(now)
+        old_state, self.previous_state = self.previous_state, state
+        if self.listener is not None:
+            self.listener(state, old_state)
+
+    def regulate(self, room_temperature):
+        """Thermostat interne du mini-split, retourne (chauffe, refroidit)"""
+        was_running = self.running
+        target = self.target_temperature
+        if self.hvac_mode == "off" or target is None:
+            self.running = False
+        elif self.hvac_mode == "heat":
+            if room_temperature < target - self.deadband:
+                self.running = True
+            elif room_temperature >= target + self.deadband:
+                self.running = False
+        elif self.hvac_mode == "cool":
+            if room_temperature > target + self.deadband:
+                self.running = True
+            elif room_temperature <= target - self.deadband:
+                self.running = False
+
+        if self.running and not was_running:
+            self.cycles += 1
+        return (
+            self.running and self.hvac_mode == "heat",
+            self.running and self.hvac_mode == "cool",
+        )
+
+    @property
+    def hvac_action(self):
+        """Action en cours, comme l'attribut hvac_action d'un climate"""
+        if self.hvac_mode == "off":
+            return "off"
+        if not self.running:
+            return "idle"
+        return "heating" if self.hvac_mode == "heat" else "cooling"
+
+    def state(self, now):
+        """État Home Assistant équivalent"""
+        return State(
+            self.entity_id,
+            self.hvac_mode,
+            {
+                "temperature": self.target_temperature,
+                "hvac_action": self.hvac_action,
+                "supported_features": int(ClimateEntityFeature.TARGET_TEMPERATURE),
+            },
+            last_updated=now,
+            context=self.context,
+        )
+
+
+class VirtualTimers:
+    """Minuteurs sur l'horloge virtuelle, à la manière de async_call_later"""
+
+    def __init__(self, clock):
+        self._clock = clock
+        self._queue = []
+        self._sequence = 0
+
+    def call_later(self, delay, action):
+        """Programmer `action(now)` dans `delay` secondes, retourne l'annulation"""
+        entry = [self._clock() + timedelta(seconds=delay), self._sequence, action]
+        self._sequence += 1
+        heapq.heappush(self._queue, entry)
+
+        def cancel():
+            entry[2] = None
+
+        return cancel
+
+    @property
+    def next_due(self):
+        """Échéance du prochain minuteur actif, None s'il n'y en a pas"""
+        while self._queue and self._queue[0][2] is None:
+            heapq.heappop(self._queue)
+        return self._queue[0][0] if self._queue else None
+
+    def run_due(self, now):
+        """Exécuter les minuteurs arrivés à échéance"""
+        while self._queue and self._queue[0][0] <= now:
+            _, _, action = heapq.heappop(self._queue)
+            if action is not None:
+                action(now)
+
+
+class _SimulatedServices:
+    """Registre de services réduit au domaine climate du mini-split factice"""
+
+    def __init__(self, clock, entities):
+        self._clock = clock
+        self._entities = {entity.entity_id: entity for entity in entities}
+
+    async def async_call(self, domain, service, service_data=None, blocking=False, **kwargs):
+        """Transmettre l'appel au mini-split factice"""
+        data = dict(service_data or {})
+        entity = self._entities[data.pop("entity_id")]
+        entity.handle(self._clock(), service, data, kwargs.get("context"))
+
+
+class SimulatedHass:
+    """Sous-ensemble de Home Assistant utilisé par SmartMinisplitZone"""
+
+    def __init__(self, clock, entities):
+        self.services = _SimulatedServices(clock, entities)
+
+
+@dataclass
+class Scenario:
+    """Conditions d'une simulation"""
+
+    start: datetime
+    days: float
+    outdoor: Trace
+    presence_maison: Trace
+    # None pour une zone sans détecteur dans la pièce
+    presence_piece: Trace | None
+    season: str = SEASON_CHAUFFAGE
+    step: timedelta = timedelta(minutes=1)
+    room: RoomModel = field(default_factory=RoomModel)
+    # Bruit uniforme du capteur de la pièce (± °C), tiré d'une graine fixe
+    sensor_noise: float = 0.0
+    seed: int = 0
+    # Écart toléré sous (ou au-dessus) du confort, l'hystérésis évaluée si None
+    comfort_band: float | None = None
+    # Probabilité qu'un détecteur de présence lise « off » pendant un pas alors que
+    # la pièce (ou la maison) est occupée, tirée d'une graine fixe
+    presence_dropouts: float = 0.0
+
+
+def default_scenario(days=1.0):
+    """Journée d'hiver type : maison vide en journée, pièce occupée matin et soir"""
+    outdoor, maison, piece = [], [], []
+    for day in range(math.ceil(days)):
+        base = day * 24
+        outdoor += [(base + hour, 4 + 5 * math.sin((hour - 9) / 24 * 2 * math.pi)) for hour in range(24)]
+        maison += [(base, STATE_ON), (base + 8.5, STATE_OFF), (base + 17.5, STATE_ON)]
+        piece += [
+            (base, STATE_OFF),
+            (base + 6.5, STATE_ON),
+            (base + 8.0, STATE_OFF),
+            (base + 18.0, STATE_ON),
+            (base + 22.5, STATE_OFF),
+        ]
+    return Scenario(
+        start=datetime(2026, 1, 5, tzinfo=timezone.utc),
+        days=days,
+        outdoor=Trace(outdoor, interpolate=True),
+        presence_maison=Trace(maison),
+        presence_piece=Trace(piece),
+    )
+
+
+@dataclass
+class SimulationReport:
+    """Résultats d'une simulation"""
+
+    evaluations: int = 0
+    service_calls: int = 0
+    calls_by_service: dict = field(default_factory=dict)
+    command_latency: float = 0.0
+    compressor_cycles: int = 0
+    compressor_hours: float = 0.0
+    comfort_violation_minutes: float = 0.0
+    energy_kwh: float = 0.0
+    manual_mode_minutes: float = 0.0
+    commands_deferred: int = 0
+    command_failures: int = 0
+
+    def lines(self):
+        """Résumé lisible"""
+        return [
+            f"Évaluations            : {self.evaluations}",
+            f"Appels de service      : {self.service_calls} {self.calls_by_service}",
+            f"Latence cumulée        : {self.command_latency:.1f} s",
+            f"Cycles compresseur     : {self.compressor_cycles}",
+            f"Marche compresseur     : {self.compressor_hours:.2f} h",
+            f"Inconfort (occupé)     : {self.comfort_violation_minutes:.0f} min",
+            f"Énergie modélisée      : {self.energy_kwh:.2f} kWh",
+            f"Mode manuel            : {self.manual_mode_minutes:.0f} min",
+            f"Commandes reportées    : {self.commands_deferred}",
+            f"Commandes en échec     : {self.command_failures}",
+        ]
+
+
+def _comfort_violated(config, season, temperature, band=None):
+    """Vrai si la température sort de la bande de confort"""
+    if band is None:
+        band = config.get(CONF_HYSTERESIS, DEFAULT_HYSTERESIS)
+    if season == SEASON_CHAUFFAGE:
+        confort = config.get(CONF_CONSIGNE_CONFORT_CHAUFFAGE, DEFAULT_CONSIGNES["confort"]["chauffage"])
+        return temperature < confort - band
+    confort = config.get(CONF_CONSIGNE_CONFORT_CLIMATISATION, DEFAULT_CONSIGNES["confort"]["climatisation"])
+    return temperature > confort + band
+
+
+async def run_simulation(scenario: Scenario, config=None, unit=None):
+    """Simuler un scénario avec la logique réelle d'une zone"""
+    config = {CONF_HYSTERESIS: DEFAULT_HYSTERESIS, CONF_OFFSET: DEFAULT_OFFSET, **(config or {})}
+    unit = unit or FakeClimateEntity()
+    config[CONF_MINI_SPLIT] = unit.entity_id
+
+    now = scenario.start
+    hass = SimulatedHass(lambda: now, [unit])
+    zone = SmartMinisplitZone(hass, "simulation", None, config)
+    timers = VirtualTimers(lambda: now)
+    released = []
+    zone.call_later = timers.call_later
+    zone.on_cycle_requested = lambda: released.append(now)
+    zone.async_start_schedule(now)
+    # Délai d'absence de la maison, tenu par le coordinateur pour toutes les zones
+    house_grace = PresenceGrace(
+        timedelta(minutes=config.get(CONF_HOUSE_GRACE, DEFAULT_HOUSE_GRACE)),
+        timers.call_later,
+        lambda: released.append(now),
+    )
+    # Changements d'état du mini-split, comme les événements reçus par le coordinateur
+    unit.listener = zone.handle_minisplit_state
+    room = scenario.room
+    report = SimulationReport()
+
+    step_hours = scenario.step.total_seconds() / 3600
+    steps = int(scenario.days * 24 / step_hours)
+    last_inputs = None
+    last_evaluation = None
+    noise = random.Random(scenario.seed)
+    last_reading = None
+    reading_at = None
+    dropouts = random.Random(scenario.seed + 1)
+    # État publié par chaque détecteur et instant de son dernier changement
+    detectors = {"maison": (None, None), "piece": (None, None)}
+
+    def detect(name, occupied):
+        """État publié par un détecteur, avec ses coupures"""
+        value = occupied
+        if occupied == STATE_ON and scenario.presence_dropouts and dropouts.random() < scenario.presence_dropouts:
+            value = STATE_OFF
+        if value != detectors[name][0]:
+            detectors[name] = (value, now)
+        return value
+
+    for index in range(steps):
+        now = scenario.start + index * scenario.step
+        hours = index * step_hours
+        t_ext = scenario.outdoor.value_at(hours)
+        presence_maison = scenario.presence_maison.value_at(hours)
+        presence_piece = scenario.presence_piece.value_at(hours) if scenario.presence_piece else None
+
+        # Physique de la pièce
+        heating, cooling = unit.regulate(room.temperature)
+        room.step(step_hours, t_ext, heating, cooling)
+        if unit.running:
+            report.compressor_hours += step_hours
+            report.energy_kwh += unit.power_kw * step_hours
+
+        # Le capteur publie au dixième de degré : seuls ses changements déclenchent un cycle
+        reading = round(room.temperature + noise.uniform(-1, 1) * scenario.sensor_noise, 1)
+        if reading != last_reading:
+            last_reading = reading
+            reading_at = now
+        sensed_maison = detect("maison", presence_maison)
+        sensed_piece = detect("piece", presence_piece)
+        inputs = (reading, round(t_ext, 1), sensed_maison, sensed_piece)
+        timers.run_due(now)
+        if released or inputs != last_inputs or now - last_evaluation >= WATCHDOG_INTERVAL:
+            released.clear()
+            last_inputs = inputs
+            last_evaluation = now
+            snapshot = InputSnapshot(
+                read_at=now,
+                temp_ext=round(t_ext, 1),
+                temp_piece=zone.filter_temperature(reading_at, reading),
+                temp_piece_raw=reading,
+                presence_maison=house_grace.state(now, sensed_maison, detectors["maison"][1]),
+                presence_piece=zone.presence_grace.state(now, sensed_piece, detectors["piece"][1]),
+                automation_enabled=True,
+                use_presence_piece=True,
+                season=scenario.season,
+                minisplit_mode=unit.hvac_mode,
+                minisplit_target=unit.target_temperature,
+                minisplit_features=int(ClimateEntityFeature.TARGET_TEMPERATURE),
+                minisplit_action=unit.hvac_action,
+            )
+            zone.evaluate(snapshot)
+            try:
+                await zone.async_control(snapshot)
+            except (TimeoutError, HomeAssistantError):
+                # Le coordinateur journalise l'échec et passe au cycle suivant
+                report.command_failures += 1
+            report.evaluations += 1
+
+        occupied = presence_maison == STATE_ON and presence_piece != STATE_OFF
+        if occupied and _comfort_violated(config, scenario.season, room.temperature, scenario.comfort_band):
+            report.comfort_violation_minutes += step_hours * 60
+        if zone.decision().manual_mode:
+            report.manual_mode_minutes += step_hours * 60
+
+    report.service_calls = len(unit.calls)
+    for call in unit.calls:
+        report.calls_by_service[call.service] = report.calls_by_service.get(call.service, 0) + 1
+    report.command_latency = sum(call.latency for call in unit.calls)
+    report.compressor_cycles = unit.cycles
+    report.commands_deferred = zone.commands_deferred
+    return report
+
+
+def main():
+    """Point d'entrée en ligne de commande"""
+    parser = argparse.ArgumentParser(description="Simulation Smart Minisplit")
+    parser.add_argument("--jours", type=float, default=1.0)
+    parser.add_argument("--hysteresis", type=float, default=DEFAULT_HYSTERESIS)
+    parser.add_argument("--offset", type=float, default=DEFAULT_OFFSET)
+    parser.add_argument("--latence", type=float, default=0.5, help="latence d'un appel (s)")
+    parser.add_argument("--bruit", type=float, default=0.0, help="bruit du capteur de la pièce (± °C)")
+    parser.add_argument("--coupures", type=float, default=0.0, help="probabilité de coupure d'un détecteur par minute")
+    parser.add_argument("--delai-piece", type=int, default=DEFAULT_ROOM_GRACE, help="minutes de pièce vide avant ECO")
+    parser.add_argument("--delai-maison", type=int, default=DEFAULT_HOUSE_GRACE, help="minutes de maison vide avant arrêt")
+    parser.add_argument("--programme", help="programme horaire de la zone")
+    parser.add_argument("--sans-detecteur", action="store_true", help="zone sans détecteur de présence dans la pièce")
+    parser.add_argument("--filtre", choices=FILTERS, default=DEFAULT_TEMP_FILTER)
+    parser.add_argument("--fenetre", type=int, default=DEFAULT_FILTER_WINDOW, help="mesures filtrées")
+    args = parser.parse_args()
+
+    scenario = default_scenario(args.jours)
+    scenario.sensor_noise = args.bruit
+    scenario.presence_dropouts = args.coupures
+    if args.sans_detecteur:
+        scenario.presence_piece = None
+    report = asyncio.run(
+        run_simulation(
+            scenario,
+            {
+                CONF_HYSTERESIS: args.hysteresis,
+                CONF_OFFSET: args.offset,
+                CONF_TEMP_FILTER: args.filtre,
+                CONF_FILTER_WINDOW: args.fenetre,
+                CONF_ROOM_GRACE: args.delai_piece,
+                CONF_HOUSE_GRACE: args.delai_maison,
+                CONF_SCHEDULE: args.programme,
+            },
+            FakeClimateEntity(latency=args.latence),
+        )
+    )
+    print("\n".join(report.lines()))
+
+
+if __name__ == "__main__":
+    main()
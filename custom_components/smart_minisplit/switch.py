@@ -2,7 +2,9 @@
 
 import logging
 from homeassistant.components.switch import SwitchEntity
-from homeassistant.const import STATE_ON
+from homeassistant.const import STATE_ON, STATE_OFF
+from homeassistant.helpers.restore_state import RestoreEntity, RestoredExtraData
+from homeassistant.util import dt as dt_util
 
 from .const import DOMAIN, SEASON_CHAUFFAGE, SEASON_CLIMATISATION
 
@@ -10,22 +12,38 @@ _LOGGER = logging.getLogger(__name__)
 
 async def async_setup_entry(hass, config_entry, async_add_entities):
     """Configuration des switches"""
+    coordinator = hass.data[DOMAIN][config_entry.entry_id]["coordinator"]
     switches = [
-        SmartMinisplitAutomationSwitch(hass, config_entry.entry_id),
-        SmartMinisplitPresencePieceSwitch(hass, config_entry.entry_id),
-        SmartMinisplitSeasonSwitch(hass, config_entry.entry_id),
+        SmartMinisplitAutomationSwitch(coordinator, config_entry.entry_id),
+        SmartMinisplitPresencePieceSwitch(coordinator, config_entry.entry_id),
+        SmartMinisplitSeasonSwitch(coordinator, config_entry.entry_id),
     ]
-    async_add_entities(switches, True)
+    async_add_entities(switches)
 
-class SmartMinisplitAutomationSwitch(SwitchEntity):
+class SmartMinisplitAutomationSwitch(SwitchEntity, RestoreEntity):
     """Switch pour activer/désactiver la gestion automatique"""
 
-    def __init__(self, hass, entry_id):
-        self.hass = hass
+    _attr_should_poll = False
+
+    def __init__(self, coordinator, entry_id):
+        self._coordinator = coordinator
+        self._runtime = coordinator.runtime
         self._entry_id = entry_id
         self._attr_name = "Smart Minisplit Automation"
         self._attr_unique_id = f"{DOMAIN}_{entry_id}_automation"
-        self._is_on = True
+
+    async def async_added_to_hass(self):
+        """Restaurer l'état d'avant le redémarrage"""
+        await super().async_added_to_hass()
+        last_state = await self.async_get_last_state()
+        if last_state is None or last_state.state not in (STATE_ON, STATE_OFF):
+            return
+        self._runtime.automation_enabled = last_state.state == STATE_ON
+
+    @property
+    def _is_on(self):
+        """État lu dans les données d'exécution de l'entrée"""
+        return self._runtime.automation_enabled
 
     @property
     def is_on(self):
@@ -47,25 +65,42 @@ class SmartMinisplitAutomationSwitch(SwitchEntity):
 
     async def async_turn_on(self, **kwargs):
         """Activer la gestion automatique"""
-        self._is_on = True
+        self._runtime.automation_enabled = True
         self.async_write_ha_state()
+        await self._coordinator.async_request_refresh()
         _LOGGER.info("Gestion automatique activée")
 
     async def async_turn_off(self, **kwargs):
         """Désactiver la gestion automatique"""
-        self._is_on = False
+        self._runtime.automation_enabled = False
         self.async_write_ha_state()
+        await self._coordinator.async_request_refresh()
         _LOGGER.info("Gestion automatique désactivée - Le mini-split ne sera pas modifié")
 
-class SmartMinisplitPresencePieceSwitch(SwitchEntity):
+class SmartMinisplitPresencePieceSwitch(SwitchEntity, RestoreEntity):
     """Switch pour activer/désactiver l'utilisation de la présence pièce"""
 
-    def __init__(self, hass, entry_id):
-        self.hass = hass
+    _attr_should_poll = False
+
+    def __init__(self, coordinator, entry_id):
+        self._coordinator = coordinator
+        self._runtime = coordinator.runtime
         self._entry_id = entry_id
         self._attr_name = "Smart Minisplit Use Presence Piece"
         self._attr_unique_id = f"{DOMAIN}_{entry_id}_use_presence_piece"
-        self._is_on = True
+
+    async def async_added_to_hass(self):
+        """Restaurer l'état d'avant le redémarrage"""
+        await super().async_added_to_hass()
+        last_state = await self.async_get_last_state()
+        if last_state is None or last_state.state not in (STATE_ON, STATE_OFF):
+            return
+        self._runtime.use_presence_piece = last_state.state == STATE_ON
+
+    @property
+    def _is_on(self):
+        """État lu dans les données d'exécution de l'entrée"""
+        return self._runtime.use_presence_piece
 
     @property
     def is_on(self):
@@ -87,25 +122,56 @@ class SmartMinisplitPresencePieceSwitch(SwitchEntity):
 
     async def async_turn_on(self, **kwargs):
         """Activer l'utilisation de la présence pièce"""
-        self._is_on = True
+        self._runtime.use_presence_piece = True
         self.async_write_ha_state()
+        await self._coordinator.async_request_refresh()
         _LOGGER.info("Utilisation de la présence pièce activée")
 
     async def async_turn_off(self, **kwargs):
         """Désactiver l'utilisation de la présence pièce"""
-        self._is_on = False
+        self._runtime.use_presence_piece = False
         self.async_write_ha_state()
+        await self._coordinator.async_request_refresh()
         _LOGGER.info("Utilisation de la présence pièce désactivée - Mode CONFORT permanent")
 
-class SmartMinisplitSeasonSwitch(SwitchEntity):
+class SmartMinisplitSeasonSwitch(SwitchEntity, RestoreEntity):
     """Switch pour sélectionner la saison (Chauffage/Climatisation)"""
 
-    def __init__(self, hass, entry_id):
-        self.hass = hass
+    _attr_should_poll = False
+
+    def __init__(self, coordinator, entry_id):
+        self._coordinator = coordinator
+        self._runtime = coordinator.runtime
         self._entry_id = entry_id
         self._attr_name = "Smart Minisplit Season"
         self._attr_unique_id = f"{DOMAIN}_{entry_id}_season"
-        self._is_on = True  # ON = Chauffage, OFF = Climatisation
+
+    async def async_added_to_hass(self):
+        """Restaurer l'état d'avant le redémarrage"""
+        await super().async_added_to_hass()
+        # La saison automatique peut changer à chaque cycle du coordinateur
+        self.async_on_remove(self._coordinator.async_add_listener(self.async_write_ha_state))
+        # Moyenne glissante et durée minimale de la saison automatique
+        extra_data = await self.async_get_last_extra_data()
+        selector = self._coordinator.season_selector
+        if extra_data is not None and selector is not None:
+            selector.restore(extra_data.as_dict(), dt_util.utcnow())
+        last_state = await self.async_get_last_state()
+        if last_state is None or last_state.state not in (STATE_ON, STATE_OFF):
+            return
+        self._runtime.season = SEASON_CHAUFFAGE if last_state.state == STATE_ON else SEASON_CLIMATISATION
+        self._runtime.season_override = bool(last_state.attributes.get("forcage_manuel"))
+
+    @property
+    def extra_restore_state_data(self):
+        """Échantillons de la saison automatique, conservés hors de l'historique"""
+        selector = self._coordinator.season_selector
+        return None if selector is None else RestoredExtraData(selector.as_dict())
+
+    @property
+    def _is_on(self):
+        """ON = Chauffage, OFF = Climatisation"""
+        return self._runtime.season == SEASON_CHAUFFAGE
 
     @property
     def is_on(self):
@@ -120,20 +186,35 @@ class SmartMinisplitSeasonSwitch(SwitchEntity):
     @property
     def extra_state_attributes(self):
         """Attributs supplémentaires"""
-        return {
+        attributes = {
             "description": "Sélectionne le mode Chauffage ou Climatisation",
             "saison_actuelle": SEASON_CHAUFFAGE if self._is_on else SEASON_CLIMATISATION,
             "mode": "Chauffage" if self._is_on else "Climatisation"
         }
+        selector = self._coordinator.season_selector
+        if selector is not None:
+            mean = selector.mean
+            attributes["saison_automatique"] = "Forcée manuellement" if self._runtime.season_override else "Active"
+            attributes["forcage_manuel"] = self._runtime.season_override
+            attributes["moyenne_exterieure"] = None if mean is None else round(mean, 1)
+        return attributes
+
+    def _set_season(self, season):
+        """Choix manuel : prioritaire sur la saison automatique"""
+        self._runtime.season = season
+        if self._coordinator.season_selector is not None:
+            self._runtime.season_override = True
 
     async def async_turn_on(self, **kwargs):
         """Passer en mode Chauffage"""
-        self._is_on = True
+        self._set_season(SEASON_CHAUFFAGE)
         self.async_write_ha_state()
+        await self._coordinator.async_request_refresh()
         _LOGGER.info("Mode Chauffage sélectionné")
 
     async def async_turn_off(self, **kwargs):
         """Passer en mode Climatisation"""
-        self._is_on = False
+        self._set_season(SEASON_CLIMATISATION)
         self.async_write_ha_state()
+        await self._coordinator.async_request_refresh()
         _LOGGER.info("Mode Climatisation sélectionné")
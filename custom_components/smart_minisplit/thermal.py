@@ -0,0 +1,153 @@
+"""Modèle thermique appris en ligne pour HA Smart Minisplit
+
+Modèle du premier ordre (circuit RC) d'une pièce :
+
+    dT/dt = a·(T_ext − T) + b_chauffe·u_chauffe − b_clim·u_clim + c
+
+avec T en °C et t en heures. `a` est l'inverse de la constante de temps de
+la pièce, `b_chauffe` et `b_clim` les vitesses apportées par le compresseur
+et `c` les apports internes. Les paramètres sont estimés par moindres carrés
+récursifs avec oubli : mémoire constante, un pas de calcul par échantillon.
+"""
+
+from __future__ import annotations
+
+import math
+from datetime import datetime
+
+# Intervalle minimal entre deux échantillons (en heures), pour que la pente
+# mesurée ne soit pas dominée par la résolution du capteur
+MIN_SAMPLE_HOURS = 5 / 60
+# Au-delà, l'échantillon précédent est trop ancien pour être utilisé
+MAX_SAMPLE_HOURS = 2.0
+# Facteur d'oubli : les anciens échantillons perdent du poids progressivement
+FORGETTING_FACTOR = 0.999
+# Nombre d'échantillons avant d'utiliser le modèle pour décider
+MIN_SAMPLES = 24
+
+PARAMETERS = ("a", "b_chauffe", "b_clim", "c")
+_INITIAL_THETA = (0.1, 1.0, 1.0, 0.0)
+_INITIAL_COVARIANCE = 100.0
+
+
+def rate(theta, t_in, t_ext, heating=False, cooling=False):
+    """Vitesse d'évolution prévue de la température (°C/h) pour des paramètres donnés"""
+    a, b_chauffe, b_clim, c = theta
+    return a * (t_ext - t_in) + b_chauffe * heating - b_clim * cooling + c
+
+
+def predict(theta, t_in, t_ext, hours, heating=False, cooling=False):
+    """Température prévue après `hours` heures à commande constante"""
+    a = theta[0]
+    forcing = rate(theta, t_in, t_ext, heating, cooling) + a * t_in
+    if a <= 1e-6:
+        return t_in + (forcing - a * t_in) * hours
+    equilibrium = forcing / a
+    return equilibrium + (t_in - equilibrium) * math.exp(-a * hours)
+
+
+def time_to_reach(theta, t_in, t_target, t_ext, heating=False, cooling=False):
+    """Durée (h) pour atteindre `t_target` à commande constante, None si jamais"""
+    slope = rate(theta, t_in, t_ext, heating, cooling)
+    if (t_target - t_in) * slope <= 0:
+        return 0.0 if t_target == t_in else None
+
+    a = theta[0]
+    forcing = slope + a * t_in
+    if a <= 1e-6:
+        return (t_target - t_in) / (forcing - a * t_in)
+
+    equilibrium = forcing / a
+    ratio = (t_target - equilibrium) / (t_in - equilibrium)
+    if ratio <= 0:
+        return None
+    return -math.log(ratio) / a
+
+
+class ThermalModel:
+    """Modèle thermique d'une zone, mis à jour à chaque mesure"""
+
+    def __init__(self, theta=None, samples=0, covariance=_INITIAL_COVARIANCE):
+        size = len(PARAMETERS)
+        self.theta = list(theta or _INITIAL_THETA)
+        self.samples = samples
+        # Une faible covariance initiale fige davantage des paramètres déjà ajustés
+        self._covariance = [
+            [covariance if i == j else 0.0 for j in range(size)]
+            for i in range(size)
+        ]
+        # Échantillon précédent : (instant, T, T_ext, u_chauffe, u_clim)
+        self._previous = None
+
+    @property
+    def a(self):
+        """Inverse de la constante de temps de la pièce (1/h)"""
+        return self.theta[0]
+
+    @property
+    def ready(self):
+        """Vrai quand le modèle est assez appris et physiquement plausible"""
+        return self.samples >= MIN_SAMPLES and self.a > 0
+
+    def update(self, now: datetime, t_in, t_ext, heating, cooling):
+        """Ajouter une mesure ; la pente est calculée depuis la précédente"""
+        if t_in is None or t_ext is None:
+            return
+
+        sample = (now, t_in, t_ext, 1.0 if heating else 0.0, 1.0 if cooling else 0.0)
+        previous = self._previous
+        if previous is None:
+            self._previous = sample
+            return
+
+        hours = (now - previous[0]).total_seconds() / 3600
+        if hours < MIN_SAMPLE_HOURS:
+            return
+        self._previous = sample
+        if hours > MAX_SAMPLE_HOURS:
+            return
+
+        _, prev_in, prev_ext, prev_heat, prev_cool = previous
+        slope = (t_in - prev_in) / hours
+        self._learn((prev_ext - prev_in, prev_heat, -prev_cool, 1.0), slope)
+
+    def _learn(self, phi, y):
+        """Un pas de moindres carrés récursifs"""
+        size = len(phi)
+        p = self._covariance
+        p_phi = [sum(p[i][j] * phi[j] for j in range(size)) for i in range(size)]
+        denominator = FORGETTING_FACTOR + sum(phi[i] * p_phi[i] for i in range(size))
+        gain = [value / denominator for value in p_phi]
+        error = y - sum(self.theta[i] * phi[i] for i in range(size))
+
+        self.theta = [self.theta[i] + gain[i] * error for i in range(size)]
+        # P symétrique : phiᵀP = (P phi)ᵀ
+        self._covariance = [
+            [(p[i][j] - gain[i] * p_phi[j]) / FORGETTING_FACTOR for j in range(size)]
+            for i in range(size)
+        ]
+        self.samples += 1
+
+    def rate(self, t_in, t_ext, heating=False, cooling=False):
+        """Vitesse d'évolution prévue de la température (°C/h)"""
+        return rate(self.theta, t_in, t_ext, heating, cooling)
+
+    def predict(self, t_in, t_ext, hours, heating=False, cooling=False):
+        """Température prévue après `hours` heures à commande constante"""
+        return predict(self.theta, t_in, t_ext, hours, heating, cooling)
+
+    def time_to_reach(self, t_in, t_target, t_ext, heating=False, cooling=False):
+        """Durée (h) pour atteindre `t_target` à commande constante, None si jamais"""
+        return time_to_reach(self.theta, t_in, t_target, t_ext, heating, cooling)
+
+    @classmethod
+    def from_fit(cls, theta, samples):
+        """Modèle initialisé avec des paramètres ajustés hors ligne"""
+        return cls(theta, samples, covariance=1.0)
+
+    def as_dict(self):
+        """Paramètres du modèle pour les attributs et la sauvegarde"""
+        return {
+            **{name: round(value, 4) for name, value in zip(PARAMETERS, self.theta)},
+            "echantillons": self.samples,
+        }
@@ -0,0 +1,233 @@
+"""Réglage automatique de l'hystérésis et de l'offset pour HA Smart Minisplit
+
+Chaque couple (hystérésis, offset) d'une grille couvrant les plages du
+formulaire d'options est évalué par simulation (`simulation.run_simulation`)
+d'une pièce : modèle thermique appris de la zone, température extérieure et
+présences rejouées depuis l'historique. Les candidats sont simulés en
+parallèle (tous les cœurs en ligne de commande, `service_workers` processus
+depuis Home Assistant) et classés par un score qui additionne
+l'énergie, les démarrages du compresseur et l'inconfort en présence,
+exprimés en kWh équivalents.
+
+    python -m custom_components.smart_minisplit.tuning --jours 7
+    python -m custom_components.smart_minisplit.tuning --trace salon.csv
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import copy
+import dataclasses
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+from homeassistant.const import STATE_ON
+
+from .const import (
+    SEASON_CHAUFFAGE,
+    CONF_HYSTERESIS,
+    CONF_OFFSET,
+    CONF_TEMP_PIECE,
+    CONF_TEMP_EXT,
+    CONF_PRESENCE_MAISON,
+    CONF_PRESENCE_PIECE,
+)
+from .replay import ROLES, ROLE_SEASON, load_trace
+from .simulation import (
+    FakeClimateEntity,
+    RoomModel,
+    Scenario,
+    SimulationReport,
+    Trace,
+    default_scenario,
+    run_simulation,
+)
+from .thermal import PARAMETERS
+
+# Processus du service dans Home Assistant : la moitié des cœurs, 4 au plus
+SERVICE_MAX_WORKERS = 4
+
+# Plages du formulaire d'options
+HYSTERESIS_RANGE = (0.5, 5.0)
+OFFSET_RANGE = (0.5, 3.0)
+GRID_STEP = 0.5
+
+# Écart fixe sous (ou au-dessus) du confort compté comme inconfort, le même
+# pour tous les candidats pour qu'une grande hystérésis ne se juge pas elle-même
+COMFORT_BAND = 1.0
+# Pénalités en kWh équivalents
+CYCLE_PENALTY = 0.05  # par démarrage du compresseur (usure, surconsommation au démarrage)
+COMFORT_PENALTY = 1.0  # par heure d'inconfort en présence
+
+
+@dataclass
+class TuningResult:
+    """Résultat de la simulation d'un candidat"""
+
+    hysteresis: float
+    offset: float
+    score: float
+    report: SimulationReport
+
+    def as_dict(self):
+        """Représentation renvoyée par le service"""
+        return {
+            CONF_HYSTERESIS: self.hysteresis,
+            CONF_OFFSET: self.offset,
+            "score": round(self.score, 3),
+            "energie": round(self.report.energy_kwh, 3),
+            "cycles": self.report.compressor_cycles,
+            "inconfort_minutes": round(self.report.comfort_violation_minutes),
+            "appels": self.report.service_calls,
+        }
+
+
+def score(report: SimulationReport):
+    """Coût d'un candidat en kWh équivalents (plus bas = meilleur)"""
+    return (
+        report.energy_kwh
+        + CYCLE_PENALTY * report.compressor_cycles
+        + COMFORT_PENALTY * report.comfort_violation_minutes / 60
+    )
+
+
+def _steps(low, high, step):
+    """Valeurs de `low` à `high` inclus, au pas `step`"""
+    count = int(round((high - low) / step))
+    return [round(low + index * step, 2) for index in range(count + 1)]
+
+
+def candidates(hysteresis_step=GRID_STEP, offset_step=GRID_STEP):
+    """Grille des couples (hystérésis, offset) à évaluer"""
+    return [
+        (hysteresis, offset)
+        for hysteresis in _steps(*HYSTERESIS_RANGE, hysteresis_step)
+        for offset in _steps(*OFFSET_RANGE, offset_step)
+    ]
+
+
+def room_from_model(model, temperature=19.0):
+    """Pièce simulée avec les paramètres d'un modèle thermique appris, None s'il ne l'est pas"""
+    if not model.ready:
+        return None
+    return RoomModel(temperature, **dict(zip(PARAMETERS, model.theta)))
+
+
+def scenario_from_trace(trace, room=None, season=None):
+    """Scénario rejouant l'extérieur et les présences d'une trace enregistrée"""
+    if not trace.events:
+        raise ValueError(f"{trace.name} : historique vide")
+    start = trace.events[0][0]
+    end = trace.events[-1][0]
+    series = {role: [] for role in ROLES}
+    for instant, index, value in trace.events:
+        if value is not None:
+            series[ROLES[index]].append(((instant - start).total_seconds() / 3600, value))
+    if not series[CONF_TEMP_EXT]:
+        raise ValueError(f"{trace.name} : température extérieure absente de l'historique")
+
+    room = room or RoomModel()
+    if series[CONF_TEMP_PIECE]:
+        room.temperature = series[CONF_TEMP_PIECE][0][1]
+    if season is None:
+        season = series[ROLE_SEASON][-1][1] if series[ROLE_SEASON] else SEASON_CHAUFFAGE
+    return Scenario(
+        start=start,
+        days=(end - start).total_seconds() / 86400,
+        outdoor=Trace(series[CONF_TEMP_EXT], interpolate=True),
+        presence_maison=Trace(series[CONF_PRESENCE_MAISON] or [(0, STATE_ON)]),
+        presence_piece=Trace(series[CONF_PRESENCE_PIECE]) if series[CONF_PRESENCE_PIECE] else None,
+        season=season,
+        room=room,
+    )
+
+
+def _evaluate(job):
+    """Simuler un candidat (dans un processus du pool)"""
+    scenario, config, hysteresis, offset = job
+    # La pièce simulée évolue en place : chaque candidat repart du même état
+    scenario = copy.deepcopy(scenario)
+    report = asyncio.run(
+        run_simulation(
+            scenario,
+            {**config, CONF_HYSTERESIS: hysteresis, CONF_OFFSET: offset},
+            FakeClimateEntity(latency=0.0),
+        )
+    )
+    return TuningResult(hysteresis, offset, score(report), report)
+
+
+def service_workers():
+    """Taille du pool utilisé depuis Home Assistant, pour lui laisser des cœurs"""
+    return max(1, min(SERVICE_MAX_WORKERS, (os.cpu_count() or 2) // 2))
+
+
+def tuning_pool(workers=None):
+    """Pool de processus du réglage, tous les cœurs si `workers` est None"""
+    # spawn : pas de fork d'un processus Home Assistant multi-thread
+    context = multiprocessing.get_context("spawn")
+    return ProcessPoolExecutor(max_workers=workers, mp_context=context)
+
+
+def tune(scenario: Scenario, config=None, grid=None, workers=None, pool=None):
+    """Évaluer la grille en parallèle, résultats du meilleur au moins bon
+
+    `pool` permet de réutiliser un pool pour plusieurs zones ; sinon un pool de
+    `workers` processus est créé pour cet appel.
+    """
+    if scenario.comfort_band is None:
+        scenario = dataclasses.replace(scenario, comfort_band=COMFORT_BAND)
+    config = dict(config or {})
+    jobs = [(scenario, config, hysteresis, offset) for hysteresis, offset in grid or candidates()]
+
+    if pool is not None:
+        results = list(pool.map(_evaluate, jobs))
+    else:
+        with tuning_pool(workers) as pool:
+            results = list(pool.map(_evaluate, jobs))
+    return sorted(results, key=lambda result: result.score)
+
+
+def main():
+    """Point d'entrée en ligne de commande"""
+    parser = argparse.ArgumentParser(description="Réglage automatique Smart Minisplit")
+    parser.add_argument("--jours", type=float, default=7.0, help="durée du scénario type")
+    parser.add_argument("--trace", help="historique CSV ou Parquet (extérieur et présences)")
+    parser.add_argument(
+        "--modele", type=float, nargs=len(PARAMETERS), metavar=PARAMETERS,
+        help="paramètres du modèle thermique de la pièce",
+    )
+    parser.add_argument("--pas-hysteresis", type=float, default=GRID_STEP)
+    parser.add_argument("--pas-offset", type=float, default=GRID_STEP)
+    parser.add_argument("--processus", type=int, default=None, help="taille du pool (défaut : tous les cœurs)")
+    args = parser.parse_args()
+
+    room = RoomModel(**dict(zip(PARAMETERS, args.modele))) if args.modele else None
+    try:
+        if args.trace:
+            scenario = scenario_from_trace(load_trace(args.trace), room)
+        else:
+            scenario = default_scenario(args.jours)
+            if room is not None:
+                scenario.room = room
+    except (OSError, ValueError) as err:
+        parser.error(str(err))
+
+    results = tune(scenario, grid=candidates(args.pas_hysteresis, args.pas_offset), workers=args.processus)
+
+    print(f"{'hyst.':>5} {'offset':>6} {'score':>7} {'kWh':>7} {'cycles':>6} {'inconfort min':>13}")
+    for result in results[:10]:
+        report = result.report
+        print(
+            f"{result.hysteresis:>5} {result.offset:>6} {result.score:>7.2f} {report.energy_kwh:>7.2f} "
+            f"{report.compressor_cycles:>6} {report.comfort_violation_minutes:>13.0f}"
+        )
+    best = results[0]
+    print(f"Recommandé : hystérésis {best.hysteresis}, offset {best.offset}")
+
+
+if __name__ == "__main__":
+    main()
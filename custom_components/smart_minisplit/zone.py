@@ -0,0 +1,824 @@
+"""Contrôleur d'une zone (pièce + mini-split) pour HA Smart Minisplit"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import random
+import time
+from collections import deque
+from datetime import timedelta
+from functools import partial
+
+from homeassistant.components.climate.const import HVACMode, ClimateEntityFeature
+from homeassistant.const import STATE_UNAVAILABLE, STATE_UNKNOWN
+from homeassistant.core import Context, callback
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers.event import async_call_later
+from homeassistant.util import dt as dt_util
+
+from .commands import CircuitBreaker, CommandCache, same_command
+from .const import (
+    DOMAIN,
+    MODE_ABSENCE,
+    MODE_ECO,
+    MODE_CONFORT,
+    MODE_REPLI,
+    SEASON_CHAUFFAGE,
+    SEASON_CLIMATISATION,
+    CONF_MINI_SPLIT,
+    CONF_TEMP_PIECE,
+    CONF_PRESENCE_PIECE,
+    CONF_ZONE_NAME,
+    CONF_HYSTERESIS,
+    CONF_OFFSET,
+    CONF_NON_BLOCKING,
+    CONF_ANTICIPATION,
+    CONF_MIN_ON_TIME,
+    CONF_MIN_OFF_TIME,
+    CONF_MIN_HOLD_TIME,
+    CONF_COMMAND_TIMEOUT,
+    CONF_SCHEDULE,
+    CONF_POWER_SENSOR,
+    CONF_RUNNING_POWER,
+    CONF_IDLE_POWER,
+    CONF_TEMP_FILTER,
+    CONF_FILTER_WINDOW,
+    CONF_FILTER_MAX_RATE,
+    CONF_TEMP_WEIGHTS,
+    CONF_STALE_AFTER,
+    CONF_ROOM_GRACE,
+    CONF_CONSIGNE_ABSENCE_CHAUFFAGE,
+    CONF_CONSIGNE_ECO_CHAUFFAGE,
+    CONF_CONSIGNE_CONFORT_CHAUFFAGE,
+    CONF_CONSIGNE_ABSENCE_CLIMATISATION,
+    CONF_CONSIGNE_ECO_CLIMATISATION,
+    CONF_CONSIGNE_CONFORT_CLIMATISATION,
+    DEFAULT_NAME,
+    DEFAULT_CONSIGNES,
+    DEFAULT_NON_BLOCKING,
+    DEFAULT_ANTICIPATION,
+    DEFAULT_MIN_ON_TIME,
+    DEFAULT_MIN_OFF_TIME,
+    DEFAULT_MIN_HOLD_TIME,
+    DEFAULT_COMMAND_TIMEOUT,
+    DEFAULT_RUNNING_POWER,
+    DEFAULT_IDLE_POWER,
+    DEFAULT_TEMP_FILTER,
+    DEFAULT_FILTER_WINDOW,
+    DEFAULT_FILTER_MAX_RATE,
+    DEFAULT_STALE_AFTER,
+    DEFAULT_ROOM_GRACE,
+    COMMAND_REASSERT_TTL,
+    SETTLING_WINDOW,
+    COMMAND_RETRIES,
+    RETRY_BASE_DELAY,
+    BREAKER_THRESHOLD,
+    BREAKER_COOLDOWN,
+)
+from .energy import EnergyMeter
+from .filters import TemperatureFusion, build_filter, parse_weights
+from .kernel import (
+    REASON_DISABLED,
+    REASON_HOUSE_EMPTY,
+    REASON_FAIL_SAFE,
+    REASON_RESUME,
+    REASON_SETBACK,
+    REASON_ANTICIPATION,
+    REASON_MODE_CHANGE,
+    KernelInputs,
+    KernelSettings,
+    KernelState,
+    decide,
+)
+from .metrics import ZoneMetrics
+from .models import Decision
+from .presence import PresenceGrace
+from .protection import ShortCycleGuard
+from .schedule import WeeklySchedule
+from .thermal import ThermalModel
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def compressor_state(mode, action):
+    """(chauffe, refroidit) d'après hvac_action, ou le mode à défaut"""
+    if action is not None:
+        return action == "heating", action == "cooling"
+    return mode == "heat", mode == "cool"
+
+
+def build_setpoints(config):
+    """Table des consignes par (saison, mode), compilée une fois par configuration"""
+    options = {
+        (SEASON_CHAUFFAGE, MODE_ABSENCE): CONF_CONSIGNE_ABSENCE_CHAUFFAGE,
+        (SEASON_CHAUFFAGE, MODE_ECO): CONF_CONSIGNE_ECO_CHAUFFAGE,
+        (SEASON_CHAUFFAGE, MODE_CONFORT): CONF_CONSIGNE_CONFORT_CHAUFFAGE,
+        (SEASON_CLIMATISATION, MODE_ABSENCE): CONF_CONSIGNE_ABSENCE_CLIMATISATION,
+        (SEASON_CLIMATISATION, MODE_ECO): CONF_CONSIGNE_ECO_CLIMATISATION,
+        (SEASON_CLIMATISATION, MODE_CONFORT): CONF_CONSIGNE_CONFORT_CLIMATISATION,
+    }
+    return {
+        (season, mode): config.get(option, DEFAULT_CONSIGNES[mode][season])
+        for (season, mode), option in options.items()
+    }
+
+
+class SmartMinisplitZone:
+    """État et logique de décision d'une zone"""
+
+    def __init__(self, hass, entry_id, zone_id, config):
+        self.hass = hass
+        self.zone_id = zone_id
+        self._entry_id = entry_id
+        self._config = config
+        self.name = config.get(CONF_ZONE_NAME, DEFAULT_NAME)
+
+        # État interne du contrôleur
+        self._target_temperature = None
+        self._hvac_mode = HVACMode.OFF
+        self._season = SEASON_CHAUFFAGE
+        self._mode_actuel = MODE_ABSENCE
+        self._manual_mode = False
+        self._last_action = "Initialisation"
+
+        # Modèle thermique de la pièce, appris à chaque cycle
+        self.thermal_model = ThermalModel()
+
+        # Commande demandée par la décision du cycle en cours
+        self._command_requested = False
+
+        # Commande envoyée sans attente, confirmée par le changement d'état
+        self.pending_command = None
+
+        # Dernière commande acquittée, pour ne pas renvoyer l'état déjà en place
+        self._command_cache = CommandCache(COMMAND_REASSERT_TTL)
+
+        # Contextes de nos dernières commandes et instant du dernier envoi,
+        # pour ne pas prendre leurs effets pour une action de l'utilisateur
+        self._command_contexts = deque(maxlen=8)
+        self._last_command_at = None
+
+        # Suspend les commandes si le mini-split ne répond plus
+        self.circuit_breaker = CircuitBreaker(BREAKER_THRESHOLD, BREAKER_COOLDOWN)
+
+        # Durées et décisions récentes, pour les diagnostics
+        self.metrics = ZoneMetrics()
+        self._cycle_started = None
+
+        # Capteurs de la pièce fusionnés ; sans mesure récente, la commande est maintenue
+        self.temperature_fusion = None
+        self._fusion_settings = None
+        self.fail_safe = False
+
+        # Filtre de la température de la pièce, une mesure à la fois
+        self._temp_filter = None
+        self._filter_settings = None
+        self._temp_sample = None
+        self._temp_filtered = None
+
+        # Durées et énergie cumulées à chaque changement d'état
+        self.energy = None
+
+        # Durées minimales de marche, d'arrêt et de maintien de consigne
+        self._cycle_guard = None
+
+        # Commande reportée : appliquée par un nouveau cycle à l'expiration du minuteur
+        self.deferred_until = None
+        self.commands_deferred = 0
+        self._release_timer = None
+        self.call_later = partial(async_call_later, hass)
+        # Appelé quand un minuteur de la zone demande un nouveau cycle
+        self.on_cycle_requested = None
+
+        # Absence de la pièce retenue après un délai de grâce (un minuteur)
+        self.presence_grace = PresenceGrace(
+            timedelta(minutes=config.get(CONF_ROOM_GRACE, DEFAULT_ROOM_GRACE)),
+            lambda delay, action: self.call_later(delay, action),
+            self._request_cycle,
+        )
+
+        # Programme horaire, compilé une fois ; un seul minuteur vers le prochain changement
+        self.schedule = None
+        self.scheduled_mode = None
+        self.next_schedule_change = None
+        self._schedule_timer = None
+        self._schedule_text = None
+
+        # Paramètres réglables depuis les options
+        self.apply_settings(config)
+
+    def apply_settings(self, config, now=None):
+        """Appliquer la configuration, à la création ou à chaud quand les options changent"""
+        self._config = config
+
+        # Paramètres
+        self.hysteresis = config.get(CONF_HYSTERESIS, 2.0)
+        self.offset = config.get(CONF_OFFSET, 1.0)
+        self._non_blocking = config.get(CONF_NON_BLOCKING, DEFAULT_NON_BLOCKING)
+        self._anticipation = config.get(CONF_ANTICIPATION, DEFAULT_ANTICIPATION)
+        self._command_timeout = config.get(CONF_COMMAND_TIMEOUT, DEFAULT_COMMAND_TIMEOUT)
+        self.presence_grace.configure(timedelta(minutes=config.get(CONF_ROOM_GRACE, DEFAULT_ROOM_GRACE)))
+
+        # Consignes compilées en une table (saison, mode), remplacée d'un bloc
+        self._setpoints = build_setpoints(config)
+
+        # Fusion recréée si ses réglages changent, reremplie au cycle suivant
+        fusion_settings = (
+            config.get(CONF_TEMP_WEIGHTS),
+            config.get(CONF_STALE_AFTER, DEFAULT_STALE_AFTER),
+        )
+        if fusion_settings != self._fusion_settings:
+            self._fusion_settings = fusion_settings
+            try:
+                weights = parse_weights(self.temp_piece_entities, fusion_settings[0])
+            except ValueError:
+                _LOGGER.error(f"[{self.name}] Poids des capteurs invalides, poids égaux utilisés")
+                weights = parse_weights(self.temp_piece_entities, None)
+            self.temperature_fusion = TemperatureFusion(weights, timedelta(minutes=fusion_settings[1]))
+
+        # Filtre conservé, avec son historique, tant que ses réglages ne changent pas
+        filter_settings = (
+            config.get(CONF_TEMP_FILTER, DEFAULT_TEMP_FILTER),
+            config.get(CONF_FILTER_WINDOW, DEFAULT_FILTER_WINDOW),
+            config.get(CONF_FILTER_MAX_RATE, DEFAULT_FILTER_MAX_RATE),
+        )
+        if filter_settings != self._filter_settings:
+            self._filter_settings = filter_settings
+            self._temp_filter = build_filter(*filter_settings)
+            self._temp_sample = None
+            self._temp_filtered = None
+
+        running_power = config.get(CONF_RUNNING_POWER, DEFAULT_RUNNING_POWER)
+        idle_power = config.get(CONF_IDLE_POWER, DEFAULT_IDLE_POWER)
+        if self.energy is None:
+            self.energy = EnergyMeter(running_power, idle_power)
+        else:
+            self.energy.set_power_model(now, running_power, idle_power)
+
+        durations = (
+            timedelta(minutes=config.get(CONF_MIN_ON_TIME, DEFAULT_MIN_ON_TIME)),
+            timedelta(minutes=config.get(CONF_MIN_OFF_TIME, DEFAULT_MIN_OFF_TIME)),
+            timedelta(minutes=config.get(CONF_MIN_HOLD_TIME, DEFAULT_MIN_HOLD_TIME)),
+        )
+        if self._cycle_guard is None:
+            self._cycle_guard = ShortCycleGuard(*durations)
+        else:
+            self._cycle_guard.set_durations(*durations)
+
+        # Programme recompilé seulement si son texte change
+        schedule_text = config.get(CONF_SCHEDULE) or ""
+        if schedule_text != self._schedule_text:
+            self._schedule_text = schedule_text
+            if self._schedule_timer is not None:
+                self._schedule_timer()
+                self._schedule_timer = None
+            self.schedule = None
+            self.scheduled_mode = None
+            self.next_schedule_change = None
+            if schedule_text:
+                try:
+                    self.schedule = WeeklySchedule.parse(schedule_text)
+                except ValueError as err:
+                    _LOGGER.error(f"[{self.name}] Programme horaire invalide ({err}), ignoré")
+            if now is not None:
+                self.async_start_schedule(now)
+
+        self._kernel_settings = KernelSettings(
+            self.hysteresis, self.offset, self._setpoints, self.schedule is not None
+        )
+
+    @property
+    def mini_split_entity(self):
+        """Entité climate du mini-split piloté"""
+        return self._config.get(CONF_MINI_SPLIT)
+
+    @property
+    def temp_piece_entities(self):
+        """Capteurs de température de la pièce (un seul dans les anciennes entrées)"""
+        entities = self._config.get(CONF_TEMP_PIECE) or []
+        return [entities] if isinstance(entities, str) else list(entities)
+
+    @property
+    def temp_piece_entity(self):
+        """Capteur de température principal de la pièce"""
+        entities = self.temp_piece_entities
+        return entities[0] if entities else None
+
+    @property
+    def presence_piece_entity(self):
+        """Capteur de présence de la pièce"""
+        return self._config.get(CONF_PRESENCE_PIECE)
+
+    @property
+    def power_sensor_entity(self):
+        """Compteur de puissance du mini-split, optionnel"""
+        return self._config.get(CONF_POWER_SENSOR)
+
+    def unique_id(self, suffix):
+        """Identifiant unique d'une entité de la zone"""
+        if self.zone_id is None:
+            return f"{DOMAIN}_{self._entry_id}_{suffix}"
+        return f"{DOMAIN}_{self._entry_id}_{self.zone_id}_{suffix}"
+
+    def entity_name(self, suffix):
+        """Nom d'une entité de la zone"""
+        if self.zone_id is None:
+            return f"{DEFAULT_NAME} {suffix}"
+        return f"{DEFAULT_NAME} {self.name} {suffix}"
+
+    @property
+    def storage_key(self):
+        """Clé de la zone dans les données enregistrées"""
+        return self.zone_id or "principale"
+
+    @property
+    def command_stats(self):
+        """Compteurs de commandes envoyées, supprimées et reportées"""
+        return {
+            **self._command_cache.as_dict(),
+            "commandes_reportees": self.commands_deferred,
+        }
+
+    @property
+    def last_command(self):
+        """Dernière commande acquittée par le mini-split"""
+        cache = self._command_cache
+        if cache.acknowledged_at is None:
+            return None
+        return {
+            "hvac_mode": cache.hvac_mode,
+            "temperature": cache.temperature,
+            "instant": cache.acknowledged_at.isoformat(),
+        }
+
+    def restore(self, mode_actuel, hvac_mode, target_temperature, manual_mode, last_command=None):
+        """Reprendre l'état du contrôleur enregistré avant le redémarrage"""
+        if mode_actuel is not None:
+            self._mode_actuel = mode_actuel
+        if hvac_mode is not None:
+            self._hvac_mode = hvac_mode
+        self._target_temperature = target_temperature
+        self._manual_mode = manual_mode
+        self._last_action = "État restauré après redémarrage"
+
+        # La commande déjà en place n'est pas renvoyée au démarrage
+        if last_command is not None:
+            hvac_mode, temperature, acknowledged_at = last_command
+            self._command_cache.acknowledge(hvac_mode, temperature, acknowledged_at)
+            self._cycle_guard.record(hvac_mode, temperature, acknowledged_at)
+
+    @property
+    def accounting_mode(self):
+        """Mode compté dans les durées : celui de la zone, ou repli si le mini-split tient la consigne abaissée"""
+        if self._mode_actuel != MODE_ABSENCE and self._hvac_mode != HVACMode.OFF:
+            # Consigne réellement en place : dans la bande, le noyau remet la consigne du
+            # mode sans envoyer de commande et le mini-split garde celle du repli
+            applied = self._applied_temperature()
+            if applied is not None and applied != self._get_consigne():
+                return MODE_REPLI
+        return self._mode_actuel
+
+    def _applied_temperature(self):
+        """Consigne envoyée au mini-split (en attente de confirmation ou acquittée)"""
+        if self.pending_command is not None and "temperature" in self.pending_command:
+            return self.pending_command["temperature"]
+        if self._command_cache.acknowledged_at is not None:
+            return self._command_cache.temperature
+        return self._target_temperature
+
+    def filter_temperature(self, measured_at, raw):
+        """Température filtrée de la pièce ; chaque mesure n'est intégrée qu'une fois"""
+        if self._temp_filter is None or raw is None:
+            return raw
+        # Un cycle sans nouvelle mesure (minuteur, autre entrée) réutilise la valeur filtrée
+        if (measured_at, raw) != self._temp_sample:
+            self._temp_sample = (measured_at, raw)
+            self._temp_filtered = round(self._temp_filter.update(measured_at, raw), 2)
+        return self._temp_filtered
+
+    def record_unit_state(self, state):
+        """Compter l'état du compresseur publié par le mini-split"""
+        if state.state in (STATE_UNAVAILABLE, STATE_UNKNOWN):
+            return
+        heating, cooling = compressor_state(state.state, state.attributes.get("hvac_action"))
+        self.energy.set_unit_state(state.last_updated, heating or cooling, state.state != HVACMode.OFF)
+
+    def decision(self):
+        """Figer l'état courant du contrôleur"""
+        return Decision(
+            mode_actuel=self._mode_actuel,
+            hvac_mode=self._hvac_mode,
+            target_temperature=self._target_temperature,
+            manual_mode=self._manual_mode,
+            last_action=self._last_action,
+        )
+
+    def handle_minisplit_state(self, new_state, old_state=None):
+        """Traiter un changement d'état du mini-split, vrai si la décision change"""
+        # Récupérer l'état actuel du mini-split
+        minisplit_mode = new_state.state
+        minisplit_temp = new_state.attributes.get("temperature")
+
+        # Confirmer une commande envoyée sans attente
+        if self.pending_command is not None and self._confirms_pending(new_state):
+            _LOGGER.debug(f"[{self.name}] Commande confirmée par le mini-split : {self.pending_command}")
+            self._command_cache.acknowledge(
+                self.pending_command["hvac_mode"],
+                self.pending_command.get("temperature"),
+                new_state.last_updated,
+            )
+            self.pending_command = None
+            return False
+
+        # Effet de nos propres commandes, ou mini-split indisponible
+        if self._is_echo(new_state) or minisplit_mode in (STATE_UNAVAILABLE, STATE_UNKNOWN):
+            return False
+
+        # Seul un changement de mode ou de consigne peut venir de l'utilisateur
+        if (
+            old_state is not None
+            and old_state.state == minisplit_mode
+            and old_state.attributes.get("temperature") == minisplit_temp
+        ):
+            return False
+
+        # Comparer à la dernière commande connue, pas à la décision pas encore appliquée
+        reference = self.pending_command or {
+            "hvac_mode": self._command_cache.hvac_mode,
+            "temperature": self._command_cache.temperature,
+        }
+        expected_mode = reference["hvac_mode"]
+        expected_temp = reference.get("temperature")
+        if expected_mode is None or same_command(
+            expected_mode, expected_temp, minisplit_mode, minisplit_temp
+        ):
+            return False
+
+        # Détecter si l'utilisateur a modifié manuellement
+        self._manual_mode = True
+        self._command_cache.invalidate()
+        self.pending_command = None
+        if minisplit_mode != expected_mode:
+            self._last_action = f"Mode manuel détecté - Mode modifié de {expected_mode} à {minisplit_mode}"
+        else:
+            self._last_action = f"Mode manuel détecté - Consigne modifiée de {expected_temp}°C à {minisplit_temp}°C"
+        _LOGGER.info(f"[{self.name}] {self._last_action}")
+        return True
+
+    def _is_echo(self, new_state):
+        """Vrai si le changement d'état provient de nos commandes"""
+        context = new_state.context
+        if context is not None:
+            if context.id in self._command_contexts or context.parent_id in self._command_contexts:
+                return True
+            # Une action depuis l'interface porte l'utilisateur qui l'a faite
+            if context.user_id is not None:
+                return False
+
+        # États intermédiaires d'un mini-split lent, juste après une commande
+        return (
+            self._last_command_at is not None
+            and new_state.last_updated - self._last_command_at <= SETTLING_WINDOW
+        )
+
+    def evaluate(self, snapshot):
+        """Logique de décision complète à partir de l'instantané, sans I/O"""
+        self._cycle_started = time.perf_counter()
+        self._command_requested = False
+        self._season = snapshot.season
+
+        # Apprendre la réponse thermique de la pièce
+        heating, cooling = compressor_state(snapshot.minisplit_mode, snapshot.minisplit_action)
+        self.energy.set_unit_state(
+            snapshot.read_at, heating or cooling, snapshot.minisplit_mode not in (None, HVACMode.OFF)
+        )
+        self.thermal_model.update(
+            snapshot.read_at, snapshot.temp_piece, snapshot.temp_ext, heating, cooling
+        )
+
+        # Mode, consigne et hystérésis : décidés par le noyau pur
+        model = self.thermal_model
+        previous = KernelState(
+            self._mode_actuel,
+            self._hvac_mode,
+            self._target_temperature,
+            self._manual_mode,
+            self.fail_safe,
+        )
+        decision = decide(
+            self._kernel_settings,
+            KernelInputs(
+                season=snapshot.season,
+                presence_maison=snapshot.presence_maison,
+                presence_piece=snapshot.presence_piece,
+                automation_enabled=snapshot.automation_enabled,
+                use_presence_piece=snapshot.use_presence_piece,
+                temp_piece=snapshot.temp_piece,
+                temp_ext=snapshot.temp_ext,
+                scheduled_mode=self.scheduled_mode,
+                theta=tuple(model.theta) if self._anticipation and model.ready else None,
+            ),
+            previous,
+        )
+        self._apply_decision(previous, decision, snapshot.temp_piece)
+
+    def _apply_decision(self, previous, decision, temp_piece):
+        """Reprendre l'état décidé par le noyau, journaliser et mettre à jour le message"""
+        state = decision.state
+        self._mode_actuel = state.mode
+        self._hvac_mode = state.hvac_mode
+        self._target_temperature = state.target_temperature
+        self._manual_mode = state.manual_mode
+        self.fail_safe = state.fail_safe
+        self._command_requested = decision.command
+        if decision.hold:
+            self._cancel_deferred()
+
+        if decision.manual_cleared:
+            _LOGGER.info(f"[{self.name}] Mode manuel désactivé - Maison vide détectée")
+        if previous.fail_safe and not state.fail_safe and decision.reason != REASON_HOUSE_EMPTY:
+            _LOGGER.info(f"[{self.name}] Température de la pièce de nouveau disponible")
+
+        message = self._describe(decision.reason, temp_piece)
+        if message is None:
+            return
+        self._last_action = message
+        if decision.reason == REASON_FAIL_SAFE and not previous.fail_safe:
+            _LOGGER.warning(f"[{self.name}] {message}")
+        elif decision.reason == REASON_MODE_CHANGE:
+            _LOGGER.info(f"[{self.name}] {message}")
+
+    def _describe(self, reason, temp_piece):
+        """Message de la dernière action pour un motif du noyau, None pour garder le précédent"""
+        target = self._target_temperature
+        heating = self._season == SEASON_CHAUFFAGE
+        if reason == REASON_DISABLED:
+            return "Gestion automatique désactivée"
+        if reason == REASON_HOUSE_EMPTY:
+            return "Maison vide - Arrêt du mini-split"
+        if reason == REASON_FAIL_SAFE:
+            return "Sécurité - Aucune température de pièce récente, commande maintenue"
+        if reason == REASON_MODE_CHANGE:
+            return f"Passage en mode {self._mode_actuel.upper()} - Consigne: {target}°C"
+        if reason == REASON_RESUME:
+            if heating:
+                return f"Température {temp_piece}°C < consigne-hystérésis ({target-self.hysteresis}°C) - Chauffage activé à {target}°C"
+            return f"Température {temp_piece}°C > consigne+hystérésis ({target+self.hysteresis}°C) - Climatisation activée à {target}°C"
+        if reason == REASON_SETBACK:
+            sign = "+" if heating else "-"
+            return f"Consigne atteinte{sign}offset ({temp_piece}°C) - Repli à {target}°C pour économie d'énergie"
+        if reason == REASON_ANTICIPATION:
+            if heating:
+                return f"Reprise anticipée ({temp_piece}°C) - Le modèle thermique prévoit un passage sous {target-self.hysteresis}°C - Chauffage activé à {target}°C"
+            return f"Reprise anticipée ({temp_piece}°C) - Le modèle thermique prévoit un passage au-dessus de {target+self.hysteresis}°C - Climatisation activée à {target}°C"
+        return None
+
+    async def async_control(self, snapshot):
+        """Envoyer la commande décidée pendant ce cycle, s'il y en a une"""
+        sent_before = self._command_cache.sent
+        try:
+            # Une commande reportée n'est rejouée qu'à l'expiration de son minuteur
+            released = self.deferred_until is not None and self._release_timer is None
+            if self._command_requested or released:
+                self._command_requested = False
+                await self._control_minisplit(snapshot)
+        finally:
+            self._record_cycle(snapshot, self._command_cache.sent > sent_before)
+
+    def _record_cycle(self, snapshot, sent):
+        """Mesurer le cycle qui vient de se terminer"""
+        self.energy.set_mode(snapshot.read_at, self.accounting_mode)
+        started = self._cycle_started
+        if started is None:
+            return
+        self._cycle_started = None
+        self.metrics.record_cycle(
+            time.perf_counter() - started,
+            sent,
+            (
+                snapshot.read_at,
+                self._mode_actuel,
+                self._hvac_mode,
+                self._target_temperature,
+                sent,
+                self._last_action,
+            ),
+        )
+
+    def _get_consigne(self):
+        """Récupérer la consigne selon le mode et la saison"""
+        return self._setpoints[(self._season, self._mode_actuel)]
+
+    async def _control_minisplit(self, snapshot):
+        """Contrôler le mini-split réel"""
+        mini_split_entity = self.mini_split_entity
+        if not mini_split_entity:
+            return
+
+        # État du mini-split lu dans l'instantané du cycle
+        if snapshot.minisplit_mode is None:
+            return
+
+        # Conversion du mode
+        hvac_mode_map = {
+            HVACMode.OFF: "off",
+            HVACMode.HEAT: "heat",
+            HVACMode.COOL: "cool",
+            HVACMode.AUTO: "auto",
+        }
+
+        mini_split_mode = hvac_mode_map.get(self._hvac_mode, "auto")
+        temperature = None if self._hvac_mode == HVACMode.OFF else self._target_temperature
+
+        # Ne rien envoyer si la commande ne changerait rien
+        if not self._command_cache.should_send(
+            mini_split_mode,
+            temperature,
+            snapshot.minisplit_mode,
+            snapshot.minisplit_target,
+            snapshot.read_at,
+        ):
+            self._cancel_deferred()
+            return
+
+        # Mini-split en échec répété : attendre la fin de la pause
+        if self.circuit_breaker.is_open(snapshot.read_at):
+            # Nouvelle tentative à la fin de la pause, à la place d'un report en cours
+            self._defer_command(self.circuit_breaker.closes_at, snapshot.read_at, "disjoncteur ouvert")
+            return
+
+        # Protection anti-cycles courts : reporter la transition si trop tôt
+        release_at = self._cycle_guard.release_at(mini_split_mode, temperature, snapshot.read_at)
+        if release_at is not None:
+            self._defer_command(release_at, snapshot.read_at)
+            return
+        self._cancel_deferred()
+
+        # Arrêt du mini-split
+        if self._hvac_mode == HVACMode.OFF:
+            await self._async_send("set_hvac_mode", {"hvac_mode": "off"}, snapshot.read_at)
+            _LOGGER.info(f"[{self.name}] Mini-split arrêté")
+            self._command_sent(mini_split_mode, None, snapshot.read_at)
+            return
+
+        change_mode = snapshot.minisplit_mode != mini_split_mode
+        change_temperature = bool(temperature) and not same_command(
+            mini_split_mode, temperature, mini_split_mode, snapshot.minisplit_target
+        )
+
+        # Réaffirmation : l'état réel correspond déjà, tout renvoyer
+        if not change_mode and not change_temperature:
+            change_mode = True
+            change_temperature = bool(temperature)
+
+        # Mode et consigne en un seul appel si le mini-split le permet
+        if change_temperature and (
+            snapshot.minisplit_features & ClimateEntityFeature.TARGET_TEMPERATURE
+        ):
+            data = {"temperature": temperature}
+            if change_mode:
+                data["hvac_mode"] = mini_split_mode
+            await self._async_send("set_temperature", data, snapshot.read_at)
+            _LOGGER.info(f"[{self.name}] Consigne mini-split changée à {temperature}°C (mode {mini_split_mode})")
+            self._command_sent(mini_split_mode, temperature, snapshot.read_at)
+            return
+
+        # Sinon, appels séparés
+        if change_mode:
+            await self._async_send("set_hvac_mode", {"hvac_mode": mini_split_mode}, snapshot.read_at)
+            _LOGGER.info(f"[{self.name}] Mode mini-split changé vers {mini_split_mode}")
+
+        if change_temperature:
+            await self._async_send("set_temperature", {"temperature": temperature}, snapshot.read_at)
+            _LOGGER.info(f"[{self.name}] Consigne mini-split changée à {temperature}°C")
+
+        self._command_sent(mini_split_mode, temperature, snapshot.read_at)
+
+    async def _async_send(self, service, data, now):
+        """Envoyer une commande au mini-split, avec délai maximal et nouvelles tentatives"""
+        for attempt in range(COMMAND_RETRIES + 1):
+            # Contexte propre à la commande, repris par le changement d'état qu'elle provoque
+            context = Context()
+            self._command_contexts.append(context.id)
+            self._last_command_at = now
+            started = time.perf_counter()
+            try:
+                async with asyncio.timeout(self._command_timeout):
+                    await self.hass.services.async_call(
+                        "climate",
+                        service,
+                        {"entity_id": self.mini_split_entity, **data},
+                        blocking=not self._non_blocking,
+                        context=context,
+                    )
+            except (TimeoutError, HomeAssistantError) as err:
+                error = err
+            except Exception:
+                self.metrics.service_failures += 1
+                self.circuit_breaker.record_failure(now)
+                raise
+            else:
+                error = None
+            finally:
+                self.metrics.record_service(service, time.perf_counter() - started)
+
+            if error is None:
+                self.circuit_breaker.record_success()
+                self._command_cache.sent += 1
+                return
+
+            self.metrics.service_failures += 1
+            if attempt == COMMAND_RETRIES:
+                self.circuit_breaker.record_failure(now)
+                raise error
+
+            # Attente exponentielle avec gigue, pour ne pas synchroniser les zones
+            delay = RETRY_BASE_DELAY * 2 ** attempt * random.uniform(0.5, 1.5)
+            _LOGGER.warning(f"[{self.name}] Échec de {service} ({error!r}), nouvel essai dans {delay:.1f} s")
+            await asyncio.sleep(delay)
+
+    def _command_sent(self, hvac_mode, temperature, now):
+        """Acquitter la commande, ou attendre la confirmation du mini-split"""
+        self._cycle_guard.record(hvac_mode, temperature, now)
+        if not self._non_blocking:
+            self._command_cache.acknowledge(hvac_mode, temperature, now)
+            return
+
+        self.pending_command = {"hvac_mode": hvac_mode}
+        if temperature is not None:
+            self.pending_command["temperature"] = temperature
+
+    def _defer_command(self, release_at, now, cause="protection anti-cycles courts"):
+        """Programmer un nouveau cycle à la fin de la durée minimale ou de la pause"""
+        if self._release_timer is not None and self.deferred_until == release_at:
+            return
+        self._cancel_deferred()
+        self.deferred_until = release_at
+        self.commands_deferred += 1
+        self._release_timer = self.call_later(
+            (release_at - now).total_seconds(), self._release_deferred
+        )
+        _LOGGER.debug(f"[{self.name}] Commande reportée jusqu'à {release_at} ({cause})")
+
+    @callback
+    def _release_deferred(self, _now):
+        """Fin du report : redemander un cycle"""
+        self._release_timer = None
+        if self.on_cycle_requested is not None:
+            self.on_cycle_requested()
+
+    def _request_cycle(self):
+        """Demander un nouveau cycle (fin d'un délai d'absence)"""
+        if self.on_cycle_requested is not None:
+            self.on_cycle_requested()
+
+    def _cancel_deferred(self):
+        """Abandonner la commande reportée"""
+        if self._release_timer is not None:
+            self._release_timer()
+            self._release_timer = None
+        self.deferred_until = None
+
+    @callback
+    def async_start_schedule(self, now):
+        """Appliquer le programme horaire et armer le minuteur du prochain changement"""
+        if self.schedule is None:
+            return
+        local_now = dt_util.as_local(now)
+        self.scheduled_mode = self.schedule.mode_at(local_now)
+        self.next_schedule_change = self.schedule.next_transition(local_now)
+        if self.next_schedule_change is not None:
+            self._schedule_timer = self.call_later(
+                (self.next_schedule_change - now).total_seconds(), self._schedule_changed
+            )
+
+    @callback
+    def _schedule_changed(self, now):
+        """Changement de plage du programme : nouveau cycle si le mode change"""
+        self._schedule_timer = None
+        previous = self.scheduled_mode
+        self.async_start_schedule(now)
+        if self.scheduled_mode != previous:
+            _LOGGER.debug(f"[{self.name}] Programme horaire : {previous} → {self.scheduled_mode}")
+            if self.on_cycle_requested is not None:
+                self.on_cycle_requested()
+
+    @callback
+    def async_shutdown(self):
+        """Annuler les minuteurs de la zone"""
+        self._cancel_deferred()
+        self.presence_grace.cancel()
+        if self._schedule_timer is not None:
+            self._schedule_timer()
+            self._schedule_timer = None
+
+    def _confirms_pending(self, new_state):
+        """Vrai si l'état du mini-split reflète la commande en attente"""
+        command = self.pending_command
+        return same_command(
+            command["hvac_mode"],
+            command.get("temperature"),
+            new_state.state,
+            new_state.attributes.get("temperature"),
+        )
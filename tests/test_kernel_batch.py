@@ -0,0 +1,179 @@
+"""Équivalence du noyau NumPy (`kernel_batch`) et du noyau scalaire (`kernel`)"""
+
+import random
+
+import numpy as np
+import pytest
+
+from custom_components.smart_minisplit.kernel import (
+    KernelInputs,
+    KernelSettings,
+    KernelState,
+    decide,
+)
+from custom_components.smart_minisplit.kernel_batch import (
+    HVAC_MODES,
+    MODES,
+    NO_SCHEDULED_MODE,
+    REASONS,
+    SEASONS,
+    decide_batch,
+    decide_series,
+    setpoint_table,
+)
+from custom_components.smart_minisplit.const import SEASON_CHAUFFAGE
+from custom_components.smart_minisplit.zone import build_setpoints
+
+HYSTERESIS = 0.7
+OFFSET = 1.3
+SETPOINTS = build_setpoints({})
+THETAS = (None, (0.15, 6.0, 5.0, 0.2), (0.0, 3.0, 3.0, 0.5), (0.05, 1.0, 1.0, -0.3))
+
+
+def _temperature(rng, season):
+    """Température aléatoire, souvent exactement sur un bord de bande"""
+    if rng.random() < 0.05:
+        return None
+    if rng.random() < 0.5:
+        return round(rng.uniform(14, 30), 1)
+    consigne = SETPOINTS[(season, rng.choice(MODES))]
+    edge = rng.choice((-HYSTERESIS, HYSTERESIS, -OFFSET, OFFSET, 0.0))
+    return consigne + edge + rng.choice((-0.1, 0.0, 0.1))
+
+
+def _inputs(rng):
+    """Entrées aléatoires d'une évaluation"""
+    season = rng.choice(SEASONS)
+    presence_piece = rng.choice(("on", "off", None))
+    return KernelInputs(
+        season=season,
+        presence_maison="on" if rng.random() > 0.1 else "off",
+        presence_piece=presence_piece,
+        automation_enabled=rng.random() > 0.1,
+        use_presence_piece=rng.random() > 0.3,
+        temp_piece=_temperature(rng, season),
+        temp_ext=None if rng.random() < 0.05 else round(rng.uniform(-5, 35), 1),
+        scheduled_mode=rng.choice((None,) + MODES),
+        theta=rng.choice(THETAS),
+    )
+
+
+def _state(rng):
+    """État précédent aléatoire"""
+    return KernelState(
+        mode=rng.choice(MODES),
+        hvac_mode=rng.choice(HVAC_MODES),
+        target_temperature=rng.choice((None, 19.0, 22.0)),
+        manual_mode=rng.random() < 0.3,
+        fail_safe=rng.random() < 0.2,
+    )
+
+
+def _nan(value):
+    return np.nan if value is None else value
+
+
+def _arrays(inputs):
+    """Entrées au format de kernel_batch"""
+    return dict(
+        heating_season=np.array([item.season == SEASON_CHAUFFAGE for item in inputs]),
+        presence_maison=np.array([item.presence_maison != "off" for item in inputs]),
+        presence_piece=np.array([item.presence_piece != "off" for item in inputs]),
+        has_presence_piece=np.array([item.presence_piece is not None for item in inputs]),
+        temp_piece=np.array([_nan(item.temp_piece) for item in inputs], dtype=float),
+        temp_ext=np.array([_nan(item.temp_ext) for item in inputs], dtype=float),
+        automation_enabled=np.array([item.automation_enabled for item in inputs]),
+        use_presence_piece=np.array([item.use_presence_piece for item in inputs]),
+        scheduled_mode=np.array(
+            [NO_SCHEDULED_MODE if item.scheduled_mode is None else MODES.index(item.scheduled_mode) for item in inputs]
+        ),
+        theta=np.array([item.theta or (np.nan,) * 4 for item in inputs], dtype=float),
+    )
+
+
+def _as_tuple(batch, index):
+    """Décision d'un élément du lot, comparable à celle du noyau scalaire"""
+    target = batch.target_temperature[index]
+    return (
+        MODES[batch.mode[index]],
+        HVAC_MODES[batch.hvac_mode[index]],
+        None if np.isnan(target) else float(target),
+        bool(batch.manual_mode[index]),
+        bool(batch.fail_safe[index]),
+        bool(batch.command[index]),
+        bool(batch.hold[index]),
+        REASONS[batch.reason[index]],
+    )
+
+
+def _expected(decision):
+    state = decision.state
+    return (
+        state.mode,
+        state.hvac_mode,
+        state.target_temperature,
+        state.manual_mode,
+        state.fail_safe,
+        decision.command,
+        decision.hold,
+        decision.reason,
+    )
+
+
+@pytest.mark.parametrize("schedule", [False, True])
+def test_decide_batch_matches_decide(schedule):
+    rng = random.Random(1)
+    settings = KernelSettings(HYSTERESIS, OFFSET, SETPOINTS, schedule)
+    inputs = [_inputs(rng) for _ in range(5000)]
+    states = [_state(rng) for _ in inputs]
+
+    batch = decide_batch(
+        HYSTERESIS,
+        OFFSET,
+        setpoint_table(SETPOINTS),
+        **_arrays(inputs),
+        schedule=schedule,
+        mode=np.array([MODES.index(state.mode) for state in states]),
+        hvac_mode=np.array([HVAC_MODES.index(state.hvac_mode) for state in states]),
+        target_temperature=np.array([_nan(state.target_temperature) for state in states], dtype=float),
+        manual_mode=np.array([state.manual_mode for state in states]),
+        fail_safe=np.array([state.fail_safe for state in states]),
+    )
+
+    reasons = set()
+    for index, (item, state) in enumerate(zip(inputs, states)):
+        decision = decide(settings, item, state)
+        reasons.add(decision.reason)
+        assert _as_tuple(batch, index) == _expected(decision), (item, state)
+    # Le tirage couvre bien toutes les branches du noyau
+    assert reasons == set(REASONS)
+
+
+@pytest.mark.parametrize("schedule", [False, True])
+def test_decide_series_matches_decide_loop(schedule):
+    rng = random.Random(2)
+    settings = KernelSettings(HYSTERESIS, OFFSET, SETPOINTS, schedule)
+    inputs = [_inputs(rng) for _ in range(5000)]
+    initial = KernelState("eco", "heat", 21.0, True, False)
+
+    series = decide_series(
+        HYSTERESIS,
+        OFFSET,
+        setpoint_table(SETPOINTS),
+        **_arrays(inputs),
+        schedule=schedule,
+        mode=MODES.index(initial.mode),
+        hvac_mode=HVAC_MODES.index(initial.hvac_mode),
+        target_temperature=initial.target_temperature,
+        manual_mode=initial.manual_mode,
+        fail_safe=initial.fail_safe,
+    )
+
+    state = initial
+    mode_changes = 0
+    for index, item in enumerate(inputs):
+        decision = decide(settings, item, state)
+        mode_changes += decision.state.mode != state.mode
+        assert _as_tuple(series, index) == _expected(decision), (index, item, state)
+        state = decision.state
+    assert mode_changes > 100
@@ -0,0 +1,73 @@
+"""Mode compté dans les durées d'une zone (`accounting_mode`)"""
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from homeassistant.components.climate.const import ClimateEntityFeature
+from homeassistant.const import STATE_ON
+
+from custom_components.smart_minisplit.const import (
+    CONF_HYSTERESIS,
+    CONF_MINI_SPLIT,
+    CONF_OFFSET,
+    DEFAULT_HYSTERESIS,
+    DEFAULT_OFFSET,
+    MODE_CONFORT,
+    MODE_REPLI,
+    SEASON_CHAUFFAGE,
+)
+from custom_components.smart_minisplit.models import InputSnapshot
+from custom_components.smart_minisplit.simulation import FakeClimateEntity, SimulatedHass, VirtualTimers
+from custom_components.smart_minisplit.zone import SmartMinisplitZone
+
+START = datetime(2024, 1, 15, 12, 0, tzinfo=timezone.utc)
+
+
+def _snapshot(now, unit, temp_piece):
+    """Entrées d'un cycle : maison et pièce occupées, en chauffage"""
+    return InputSnapshot(
+        read_at=now,
+        temp_ext=5.0,
+        temp_piece=temp_piece,
+        temp_piece_raw=temp_piece,
+        presence_maison=STATE_ON,
+        presence_piece=STATE_ON,
+        automation_enabled=True,
+        use_presence_piece=True,
+        season=SEASON_CHAUFFAGE,
+        minisplit_mode=unit.hvac_mode,
+        minisplit_target=unit.target_temperature,
+        minisplit_features=int(ClimateEntityFeature.TARGET_TEMPERATURE),
+        minisplit_action=unit.hvac_action,
+    )
+
+
+async def _run(temperatures):
+    """Enchaîner un cycle par température, cinq minutes d'écart"""
+    now = START
+    unit = FakeClimateEntity(latency=0.0)
+    config = {CONF_HYSTERESIS: DEFAULT_HYSTERESIS, CONF_OFFSET: DEFAULT_OFFSET, CONF_MINI_SPLIT: unit.entity_id}
+    zone = SmartMinisplitZone(SimulatedHass(lambda: now, [unit]), "test", None, config)
+    zone.call_later = VirtualTimers(lambda: now).call_later
+    unit.listener = zone.handle_minisplit_state
+    modes = []
+    for temp_piece in temperatures:
+        snapshot = _snapshot(now, unit, temp_piece)
+        zone.evaluate(snapshot)
+        await zone.async_control(snapshot)
+        modes.append((zone.accounting_mode, unit.target_temperature))
+        now += timedelta(minutes=5)
+    return zone, modes
+
+
+def test_setback_still_counted_after_in_band_cycle():
+    zone, modes = asyncio.run(_run([20.0, 23.5, 22.5]))
+    consigne = zone._get_consigne()
+    setback = consigne - DEFAULT_OFFSET
+
+    # Sous la bande : chauffe à la consigne du confort
+    assert modes[0] == (MODE_CONFORT, consigne)
+    # Consigne + offset atteinte : repli
+    assert modes[1] == (MODE_REPLI, setback)
+    # Dans la bande, aucune commande : le mini-split reste au repli et il est compté comme tel
+    assert modes[2] == (MODE_REPLI, setback)